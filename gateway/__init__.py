@@ -0,0 +1,2 @@
+# Kisan Mitra WhatsApp Gateway Package
+# Infrastructure used by whatsapp_kisan_mitra.py (HTTP client, sessions, queues, media)
@@ -0,0 +1,76 @@
+"""
+Local Fake Twilio Messages API
+
+A minimal stand-in for the Twilio Messages REST endpoint, for exercising the
+gateway's async reply mode without a Twilio account. Point the gateway at it
+with TWILIO_API_BASE_URL=http://localhost:8002 and inspect what was sent via
+GET /fake/messages.
+
+Usage:
+    python -m gateway.fake_twilio [port]
+"""
+
+import itertools
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="Fake Twilio", version="1.0.0")
+
+sent_messages: List[Dict[str, Any]] = []
+_sid_counter = itertools.count(1)
+
+
+@app.post("/2010-04-01/Accounts/{account_sid}/Messages.json")
+async def create_message(account_sid: str, request: Request):
+    """Accept a message the way Twilio does and record it."""
+    form = await request.form()
+    if not form.get("To") or not (form.get("Body") or form.get("MediaUrl")):
+        return JSONResponse(
+            status_code=400,
+            content={"code": 21602, "message": "Message body is required.", "status": 400}
+        )
+
+    now = datetime.now(timezone.utc).strftime("%a, %d %b %Y %H:%M:%S +0000")
+    message = {
+        "sid": f"SM{next(_sid_counter):032x}",
+        "account_sid": account_sid,
+        "from": form.get("From"),
+        "to": form.get("To"),
+        "body": form.get("Body", ""),
+        "media_url": form.getlist("MediaUrl"),
+        "status": "queued",
+        "date_created": now,
+        "date_updated": now,
+        "num_segments": "1",
+        "num_media": str(len(form.getlist("MediaUrl"))),
+        "direction": "outbound-api",
+        "api_version": "2010-04-01",
+        "uri": f"/2010-04-01/Accounts/{account_sid}/Messages.json",
+    }
+    sent_messages.append(message)
+    return JSONResponse(status_code=201, content=message)
+
+
+@app.get("/fake/messages")
+async def list_sent_messages():
+    """Return every message accepted so far."""
+    return {"messages": sent_messages}
+
+
+@app.delete("/fake/messages")
+async def clear_sent_messages():
+    """Forget all recorded messages."""
+    sent_messages.clear()
+    return {"status": "cleared"}
+
+
+if __name__ == "__main__":
+    import sys
+
+    import uvicorn
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8002
+    uvicorn.run(app, host="0.0.0.0", port=port)
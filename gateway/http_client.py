@@ -0,0 +1,157 @@
+"""
+Shared Async HTTP Client for the WhatsApp Gateway
+
+One process-wide aiohttp session with keep-alive connection pooling, used for
+every outbound call the gateway makes (ADK API server, Twilio media and REST,
+voice providers). Webhook handlers await these calls instead of blocking the
+event loop, so concurrency is bounded by connections, not uvicorn workers.
+
+Configuration (environment variables):
+    GATEWAY_HTTP_MAX_CONNECTIONS           Total pooled connections (default 200)
+    GATEWAY_HTTP_MAX_CONNECTIONS_PER_HOST  Default per-host limit (default 50)
+    GATEWAY_HTTP_HOST_LIMITS               Per-host overrides, e.g.
+                                           "localhost:8001=100,api.twilio.com=20"
+    GATEWAY_HTTP_KEEPALIVE_SECONDS         Idle keep-alive timeout (default 30)
+"""
+
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("GATEWAY_HTTP_MAX_CONNECTIONS", "200"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("GATEWAY_HTTP_MAX_CONNECTIONS_PER_HOST", "50"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("GATEWAY_HTTP_KEEPALIVE_SECONDS", "30"))
+
+
+def _parse_host_limits(value: str) -> Dict[str, int]:
+    """Parse "host[:port]=limit,..." into a dict."""
+    limits = {}
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        host, limit = item.rsplit("=", 1)
+        try:
+            limits[host.strip().lower()] = int(limit)
+        except ValueError:
+            logger.warning(f"⚠️ Ignoring invalid host limit: {item}")
+    return limits
+
+
+HTTP_HOST_LIMITS = _parse_host_limits(os.getenv("GATEWAY_HTTP_HOST_LIMITS", ""))
+
+
+class GatewayHttpClient:
+    """Pooled keep-alive HTTP client with configurable per-host limits"""
+
+    def __init__(
+        self,
+        max_connections: int = HTTP_MAX_CONNECTIONS,
+        max_connections_per_host: int = HTTP_MAX_CONNECTIONS_PER_HOST,
+        host_limits: Optional[Dict[str, int]] = None,
+        keepalive_seconds: float = HTTP_KEEPALIVE_SECONDS,
+    ):
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.host_limits = HTTP_HOST_LIMITS if host_limits is None else host_limits
+        self.keepalive_seconds = keepalive_seconds
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    async def start(self) -> None:
+        """Create the pooled session (call from the app's startup hook)."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections_per_host,
+                keepalive_timeout=self.keepalive_seconds,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            logger.info(
+                f"🌐 HTTP pool ready: {self.max_connections} connections, "
+                f"{self.max_connections_per_host} per host, overrides: {self.host_limits or 'none'}"
+            )
+
+    async def close(self) -> None:
+        """Close the session and its pooled connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            raise RuntimeError("GatewayHttpClient is not started")
+        return self._session
+
+    def _host_semaphore(self, url: str) -> Optional[asyncio.Semaphore]:
+        """Return the limiter for hosts with an explicit connection limit."""
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower()
+        host_port = f"{host}:{parts.port}" if parts.port else host
+        limit = self.host_limits.get(host_port, self.host_limits.get(host))
+        if limit is None:
+            return None
+        semaphore = self._host_semaphores.get(host_port)
+        if semaphore is None:
+            semaphore = self._host_semaphores[host_port] = asyncio.Semaphore(limit)
+        return semaphore
+
+    @asynccontextmanager
+    async def request(
+        self, method: str, url: str, timeout: float = 30, **kwargs: Any
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        """Issue a pooled request; use as ``async with client.request(...) as resp``.
+
+        Raises:
+            asyncio.TimeoutError: If the request exceeds ``timeout`` seconds
+            aiohttp.ClientError: On connection failures
+        """
+        if self._session is None or self._session.closed:
+            await self.start()
+        semaphore = self._host_semaphore(url)
+        if semaphore is not None:
+            await semaphore.acquire()
+        try:
+            async with self.session.request(
+                method, url, timeout=aiohttp.ClientTimeout(total=timeout), **kwargs
+            ) as response:
+                yield response
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+    async def get_json(self, url: str, timeout: float = 10, **kwargs: Any) -> Tuple[int, Any]:
+        """GET a URL and return (status, parsed JSON or None)."""
+        async with self.request("GET", url, timeout=timeout, **kwargs) as response:
+            return response.status, await self._read_json(response)
+
+    async def post_json(self, url: str, payload: Any, timeout: float = 10, **kwargs: Any) -> Tuple[int, Any]:
+        """POST a JSON payload and return (status, parsed JSON or None)."""
+        async with self.request("POST", url, timeout=timeout, json=payload, **kwargs) as response:
+            return response.status, await self._read_json(response)
+
+    async def get_bytes(self, url: str, timeout: float = 30, **kwargs: Any) -> Tuple[int, bytes, str]:
+        """GET a URL and return (status, body bytes, content type)."""
+        async with self.request("GET", url, timeout=timeout, **kwargs) as response:
+            return response.status, await response.read(), response.headers.get("Content-Type", "")
+
+    @staticmethod
+    async def _read_json(response: aiohttp.ClientResponse) -> Any:
+        try:
+            return await response.json(content_type=None)
+        except ValueError:
+            text = await response.text()
+            logger.warning(f"⚠️ Non-JSON response ({response.status}): {text[:200]}")
+            return None
+
+
+# Global shared client instance
+http_client = GatewayHttpClient()
@@ -0,0 +1,187 @@
+"""
+Perceptual-Hash Cache for Crop Disease Photos
+
+During a pest or disease outbreak the same photo circulates between farmers,
+and farmers resend photos after a slow reply. Each copy is recompressed by
+WhatsApp, so byte hashes differ, but the 64-bit difference hash (dHash) of
+the picture barely changes. Recently analyzed photos are kept as dHashes in
+a compact array('Q') ring buffer. A new photo within IMAGE_CACHE_MAX_DISTANCE
+bits (Hamming distance) of a cached one, asked with the same question intent
+and reply language, gets the earlier diagnosis back immediately with an
+"already analyzed" note instead of another Gemini vision turn.
+
+Diagnoses are written with the farmer's profile (crops, soil, location) in
+context, so by default a diagnosis is reused only for the farmer who
+received it. Set IMAGE_CACHE_SCOPE=shared to reuse it for every farmer.
+
+Configuration (environment variables):
+    IMAGE_CACHE_ENABLED       Set to "false" to disable (default true)
+    IMAGE_CACHE_MAX_ENTRIES   Photos remembered (default 4096)
+    IMAGE_CACHE_TTL_SECONDS   How long a diagnosis is reused (default 21600, 6h)
+    IMAGE_CACHE_MAX_DISTANCE  Largest Hamming distance treated as the same photo (default 6)
+    IMAGE_CACHE_SCOPE         farmer or shared (default farmer)
+"""
+
+import asyncio
+import io
+import logging
+import os
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from gateway.media_fetch import FetchedMedia
+
+logger = logging.getLogger(__name__)
+
+IMAGE_CACHE_ENABLED = os.getenv("IMAGE_CACHE_ENABLED", "true").lower() == "true"
+IMAGE_CACHE_MAX_ENTRIES = int(os.getenv("IMAGE_CACHE_MAX_ENTRIES", "4096"))
+IMAGE_CACHE_TTL_SECONDS = int(os.getenv("IMAGE_CACHE_TTL_SECONDS", "21600"))
+IMAGE_CACHE_MAX_DISTANCE = int(os.getenv("IMAGE_CACHE_MAX_DISTANCE", "6"))
+IMAGE_CACHE_SCOPE = os.getenv("IMAGE_CACHE_SCOPE", "farmer").lower()
+
+# Question intent → keywords (Hindi, English, romanized Hindi). The first
+# matching intent wins; a photo with no question is a plain diagnosis.
+QUESTION_INTENTS = {
+    "treatment": (
+        "दवा", "दवाई", "इलाज", "उपचार", "उपाय", "स्प्रे", "छिड़काव", "कीटनाशक",
+        "treatment", "treat", "medicine", "spray", "pesticide", "fungicide", "cure", "control",
+        "dawa", "dawai", "ilaj", "upay",
+    ),
+    "prevention": ("बचाव", "रोकथाम", "रोकें", "prevent", "avoid", "bachav", "roktham"),
+    "cause": ("क्यों", "कारण", "why", "cause", "kyon", "kyu", "karan"),
+}
+DEFAULT_INTENT = "diagnosis"
+
+ALREADY_ANALYZED_NOTES = {
+    "hindi": "ℹ️ यह तस्वीर पहले ही जांची जा चुकी है। पिछला विश्लेषण:",
+    "english": "ℹ️ This photo was already analyzed. Here is the earlier diagnosis:",
+}
+
+# (question intent, reply language, farmer scope, diagnosis text, stored at)
+_Entry = Tuple[str, str, str, str, float]
+
+
+def detect_question_intent(text: Optional[str]) -> str:
+    """Classify the question sent with a photo."""
+    lowered = (text or "").lower()
+    for intent, keywords in QUESTION_INTENTS.items():
+        if any(keyword in lowered for keyword in keywords):
+            return intent
+    return DEFAULT_INTENT
+
+
+def dhash_image(data: bytes, hash_size: int = 8) -> int:
+    """64-bit difference hash: one bit per horizontally adjacent pixel pair."""
+    with Image.open(io.BytesIO(data)) as image:
+        # Let the JPEG decoder scale down; the hash only needs 9x8 pixels
+        image.draft("L", (hash_size * 8, hash_size * 8))
+        image = ImageOps.exif_transpose(image)
+        pixels = image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS).tobytes()
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] < pixels[offset + col + 1])
+    return value
+
+
+def already_analyzed_reply(diagnosis: str, language: str) -> str:
+    """Prefix a cached diagnosis with the note in the farmer's language."""
+    note = ALREADY_ANALYZED_NOTES.get(language, ALREADY_ANALYZED_NOTES["hindi"])
+    return f"{note}\n\n{diagnosis}"
+
+
+class PerceptualImageCache:
+    """Ring buffer of recent photo dHashes and their diagnoses.
+
+    Only used from the event loop, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = IMAGE_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = IMAGE_CACHE_TTL_SECONDS,
+        max_distance: int = IMAGE_CACHE_MAX_DISTANCE,
+        scope: str = IMAGE_CACHE_SCOPE,
+        enabled: bool = IMAGE_CACHE_ENABLED,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_distance = max_distance
+        self.scope = scope
+        self.enabled = enabled
+        self._hashes = array("Q")
+        self._entries: List[_Entry] = []
+        self._next = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _scope_key(self, phone_number: Optional[str]) -> str:
+        return (phone_number or "") if self.scope == "farmer" else ""
+
+    async def hash_media(self, media: FetchedMedia) -> Optional[int]:
+        """dHash of a downloaded photo, or None if disabled or undecodable."""
+        if not self.enabled or media.buffer is None:
+            return None
+        try:
+            return await asyncio.to_thread(dhash_image, media.buffer)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not hash image: {e}")
+            return None
+
+    def lookup(self, image_hash: Optional[int], intent: str, language: str,
+               phone_number: Optional[str] = None) -> Optional[str]:
+        """Return the diagnosis of the closest live match, if within the distance."""
+        if image_hash is None:
+            return None
+        scope_key = self._scope_key(phone_number)
+        cutoff = time.time() - self.ttl_seconds
+        best_distance = self.max_distance + 1
+        best = None
+        for cached_hash, entry in zip(self._hashes, self._entries):
+            # Hamming distance (int.bit_count needs Python 3.10)
+            distance = bin(image_hash ^ cached_hash).count("1")
+            if distance >= best_distance:
+                continue
+            entry_intent, entry_language, entry_scope, diagnosis, stored_at = entry
+            if entry_intent == intent and entry_language == language and entry_scope == scope_key and stored_at >= cutoff:
+                best_distance, best = distance, diagnosis
+                if distance == 0:
+                    break
+
+        if best is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        logger.info(f"♻️ Image cache hit ({intent}, {language}, distance {best_distance})")
+        return best
+
+    def add(self, image_hash: Optional[int], intent: str, language: str, diagnosis: str,
+            phone_number: Optional[str] = None) -> None:
+        """Remember a diagnosis, overwriting the oldest entry when full."""
+        if image_hash is None or not diagnosis:
+            return
+        entry = (intent, language, self._scope_key(phone_number), diagnosis, time.time())
+        if len(self._hashes) < self.max_entries:
+            self._hashes.append(image_hash)
+            self._entries.append(entry)
+        else:
+            self._hashes[self._next] = image_hash
+            self._entries[self._next] = entry
+            self._next = (self._next + 1) % self.max_entries
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._hashes),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Global perceptual image cache instance
+image_cache = PerceptualImageCache()
@@ -0,0 +1,200 @@
+"""
+Crop Photo Preprocessing for the WhatsApp Gateway
+
+Phone cameras send 3-12 MP photos, but the agent gains nothing from more
+than about a thousand pixels on the long edge. Before a photo is inlined
+into the ADK /run payload it is decoded, rotated upright from its EXIF
+orientation, downscaled to IMAGE_MAX_EDGE, and re-encoded as JPEG or WebP
+without metadata. That keeps the request small and cuts upload time and
+model token cost. Photos that are already small are passed through
+untouched. Decoding and encoding are CPU-bound, so they run in a process
+pool and the event loop stays free.
+
+Configuration (environment variables):
+    IMAGE_PREPROCESS_ENABLED   Set to "false" to send photos as downloaded (default true)
+    IMAGE_MAX_EDGE             Longest edge after downscaling, in pixels (default 1024)
+    IMAGE_FORMAT               JPEG or WEBP (default JPEG)
+    IMAGE_QUALITY              Encoder quality 1-95 (default 80)
+    IMAGE_SKIP_BYTES           Photos at most this size and within the max edge
+                               are sent as-is (default 150 KB)
+    IMAGE_PREPROCESS_WORKERS   Worker processes (default 2)
+
+Usage:
+    python -m gateway.image_preprocess [image ...]   # benchmark
+"""
+
+import asyncio
+import io
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from gateway.media_fetch import FetchedMedia
+
+logger = logging.getLogger(__name__)
+
+IMAGE_PREPROCESS_ENABLED = os.getenv("IMAGE_PREPROCESS_ENABLED", "true").lower() == "true"
+IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "1024"))
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "JPEG").upper()
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+IMAGE_SKIP_BYTES = int(os.getenv("IMAGE_SKIP_BYTES", str(150 * 1024)))
+IMAGE_PREPROCESS_WORKERS = int(os.getenv("IMAGE_PREPROCESS_WORKERS", "2"))
+
+_OUTPUT_CONTENT_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+def preprocess_image(
+    data: bytes,
+    content_type: str,
+    max_edge: int = IMAGE_MAX_EDGE,
+    output_format: str = IMAGE_FORMAT,
+    quality: int = IMAGE_QUALITY,
+    skip_bytes: int = IMAGE_SKIP_BYTES,
+) -> Tuple[bytes, str, Dict[str, Any]]:
+    """Downscale and re-encode one image (runs in a worker process).
+
+    Returns:
+        Tuple[bytes, str, Dict[str, Any]]: (image bytes, content type, info)
+        where info records the original and final size and dimensions. The
+        original bytes are returned when the image is already small or
+        re-encoding would not make it smaller.
+    """
+    if output_format not in _OUTPUT_CONTENT_TYPES:
+        raise ValueError(f"Unsupported IMAGE_FORMAT: {output_format}")
+
+    with Image.open(io.BytesIO(data)) as image:
+        # Image.open only reads the header, so this check is cheap
+        original_size = image.size
+        info = {"original_bytes": len(data), "original_size": original_size}
+        if len(data) <= skip_bytes and max(original_size) <= max_edge:
+            return data, content_type, {**info, "bytes": len(data), "size": original_size, "skipped": True}
+
+        # thumbnail() lets the JPEG decoder scale down while decoding
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "L"):
+            # Flatten transparency onto white; both outputs are sent as RGB
+            rgba = image.convert("RGBA")
+            image = Image.new("RGB", rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel("A"))
+
+        output = io.BytesIO()
+        # Nothing from image.info is passed on, so EXIF, GPS and ICC data are dropped
+        image.save(output, format=output_format, quality=quality, optimize=output_format == "JPEG")
+        encoded = output.getvalue()
+        final_size = image.size
+
+    if len(encoded) >= len(data) and max(original_size) <= max_edge:
+        return data, content_type, {**info, "bytes": len(data), "size": original_size, "skipped": True}
+    return encoded, _OUTPUT_CONTENT_TYPES[output_format], {
+        **info, "bytes": len(encoded), "size": final_size, "skipped": False
+    }
+
+
+class ImagePreprocessor:
+    """Runs preprocess_image in a lazily started process pool"""
+
+    def __init__(self, workers: int = IMAGE_PREPROCESS_WORKERS, enabled: bool = IMAGE_PREPROCESS_ENABLED):
+        self.workers = workers
+        self.enabled = enabled
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    async def process(self, media: FetchedMedia) -> FetchedMedia:
+        """Return a downscaled copy of the photo, or the photo itself on any failure."""
+        if not self.enabled or media.buffer is None:
+            return media
+
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            data, content_type, info = await loop.run_in_executor(
+                self._executor(), preprocess_image, media.buffer, media.content_type
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Image preprocessing failed, sending original: {e}")
+            return media
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if info["skipped"]:
+            logger.info(f"🖼️ Image kept as-is: {info['original_bytes']} bytes ({elapsed_ms:.0f} ms)")
+            return media
+        logger.info(
+            f"🖼️ Image {info['original_size'][0]}x{info['original_size'][1]} {info['original_bytes']} bytes → "
+            f"{info['size'][0]}x{info['size'][1]} {info['bytes']} bytes ({elapsed_ms:.0f} ms)"
+        )
+        # Keep the hash of the downloaded content for dedupe
+        return FetchedMedia(bytearray(data), content_type, media.sha256)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# Global image preprocessor instance
+image_preprocessor = ImagePreprocessor()
+
+
+def _sample_photo(width: int = 4000, height: int = 3000) -> bytes:
+    """A 12 MP noisy gradient JPEG, roughly as hard to compress as a field photo."""
+    noise = Image.effect_noise((width // 4, height // 4), 48).resize((width, height), Image.BILINEAR)
+    gradient = Image.linear_gradient("L").resize((width, height))
+    image = Image.merge("RGB", (gradient, noise, Image.blend(noise, gradient, 0.5)))
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=92)
+    return output.getvalue()
+
+
+if __name__ == "__main__":
+    import base64
+    import sys
+
+    # Typical rural 3G/4G uplink, used to estimate upload time
+    uplink_mbps = float(os.getenv("BENCHMARK_UPLINK_MBPS", "2"))
+
+    if len(sys.argv) > 1:
+        samples = []
+        for path in sys.argv[1:]:
+            with open(path, "rb") as image_file:
+                samples.append((os.path.basename(path), image_file.read()))
+    else:
+        samples = [("sample-12mp.jpg", _sample_photo())]
+
+    print(f"🖼️ max edge {IMAGE_MAX_EDGE}px, {IMAGE_FORMAT} q{IMAGE_QUALITY}, uplink {uplink_mbps} Mbps")
+    total_before = total_after = 0
+    for name, data in samples:
+        started = time.perf_counter()
+        processed, content_type, info = preprocess_image(data, "image/jpeg")
+        elapsed = time.perf_counter() - started
+        before = len(base64.b64encode(data))
+        after = len(base64.b64encode(processed))
+        total_before += before
+        total_after += after
+        upload_before = before * 8 / (uplink_mbps * 1_000_000)
+        upload_after = after * 8 / (uplink_mbps * 1_000_000)
+        print(
+            f"  {name}: {info['original_size'][0]}x{info['original_size'][1]} → {info['size'][0]}x{info['size'][1]}, "
+            f"payload {before / 1024:.0f} KB → {after / 1024:.0f} KB ({100 * (1 - after / before):.0f}% smaller), "
+            f"upload {upload_before:.2f}s → {upload_after:.2f}s + {elapsed * 1000:.0f} ms preprocessing"
+        )
+
+    async def _throughput(rounds: int = 8) -> float:
+        preprocessor = ImagePreprocessor()
+        media = [FetchedMedia(bytearray(data), "image/jpeg", "") for _, data in samples] * rounds
+        started = time.perf_counter()
+        await asyncio.gather(*(preprocessor.process(item) for item in media))
+        preprocessor.shutdown()
+        return len(media) / (time.perf_counter() - started)
+
+    rate = asyncio.run(_throughput())
+    print(f"✅ Payload {total_before / 1024:.0f} KB → {total_after / 1024:.0f} KB; "
+          f"pool of {IMAGE_PREPROCESS_WORKERS} workers: {rate:.1f} images/s")
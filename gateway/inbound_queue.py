@@ -0,0 +1,241 @@
+"""
+Durable Inbound Message Queue for the WhatsApp Gateway
+
+Inbound WhatsApp messages are written to an embedded SQLite database before
+Twilio is acknowledged, so a gateway restart (e.g. stop_system.sh) never loses
+a message. The MessageSid is unique, which makes Twilio's webhook retries
+no-ops instead of second agent runs. Messages from the same phone number are
+handed out strictly in arrival order, one at a time, while different farmers
+are processed in parallel.
+
+Messages still marked as processing when the gateway stopped are put back in
+the queue on startup (at-least-once delivery).
+
+In sync reply mode messages are recorded as processing while they are
+answered inline and marked done together with the reply. Twilio only
+retries a webhook whose response it never got, so a retry of a finished
+message is answered with the stored reply and a retry of an unfinished one
+is answered again. Finished messages are pruned periodically in both modes.
+
+Configuration (environment variables):
+    WHATSAPP_QUEUE_DB               SQLite file (default data/whatsapp_inbound.db)
+    WHATSAPP_QUEUE_MAX_ATTEMPTS     Delivery attempts before a message is failed (default 3)
+    WHATSAPP_QUEUE_RETENTION_HOURS  How long finished MessageSids are kept for dedupe (default 24)
+    WHATSAPP_QUEUE_PRUNE_SECONDS    Interval between prunes of finished messages (default 3600)
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+QUEUE_DB_PATH = os.getenv("WHATSAPP_QUEUE_DB", "data/whatsapp_inbound.db")
+QUEUE_MAX_ATTEMPTS = int(os.getenv("WHATSAPP_QUEUE_MAX_ATTEMPTS", "3"))
+QUEUE_RETENTION_HOURS = float(os.getenv("WHATSAPP_QUEUE_RETENTION_HOURS", "24"))
+QUEUE_PRUNE_SECONDS = int(os.getenv("WHATSAPP_QUEUE_PRUNE_SECONDS", "3600"))
+
+STATUS_PENDING = "pending"
+STATUS_PROCESSING = "processing"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+class InboundMessageQueue:
+    """SQLite-backed FIFO-per-farmer queue with MessageSid dedupe"""
+
+    def __init__(self, db_path: str = QUEUE_DB_PATH, max_attempts: int = QUEUE_MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database lazily and make sure the schema exists."""
+        if self._conn is None:
+            db_dir = os.path.dirname(self.db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS inbound_messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    message_sid TEXT NOT NULL UNIQUE,
+                    phone TEXT NOT NULL,
+                    payload_json TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    reply_json TEXT,
+                    received_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_inbound_status_phone
+                    ON inbound_messages (status, phone, id);
+                """
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def enqueue(self, message: Dict[str, Any], status: str = STATUS_PENDING) -> bool:
+        """Persist an inbound message.
+
+        Args:
+            message: Twilio webhook fields (Body, From, MessageSid, media fields)
+            status: Initial status; STATUS_PROCESSING records a message being
+                answered inline (see find() and complete())
+
+        Returns:
+            bool: True if the message is new, False if its MessageSid was seen before
+        """
+        message_sid = message.get("MessageSid") or f"local-{uuid.uuid4().hex}"
+        phone = (message.get("From") or "").replace("whatsapp:", "")
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(
+                """
+                INSERT OR IGNORE INTO inbound_messages
+                    (message_sid, phone, payload_json, status, received_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (message_sid, phone, json.dumps(message, ensure_ascii=False), status, now, now)
+            )
+            conn.commit()
+            return cursor.rowcount > 0
+
+    def claim_next(self) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """Claim the oldest pending message of a farmer with nothing in flight.
+
+        Returns:
+            Optional[Tuple[int, Dict[str, Any]]]: (queue id, message), or None if
+            no message is currently eligible
+        """
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                """
+                SELECT m.id, m.payload_json FROM inbound_messages m
+                WHERE m.status = 'pending'
+                  AND m.id = (SELECT MIN(q.id) FROM inbound_messages q
+                              WHERE q.phone = m.phone AND q.status = 'pending')
+                  AND NOT EXISTS (SELECT 1 FROM inbound_messages p
+                                  WHERE p.phone = m.phone AND p.status = 'processing')
+                ORDER BY m.id
+                LIMIT 1
+                """
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE inbound_messages SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (STATUS_PROCESSING, time.time(), row[0])
+            )
+            conn.commit()
+            return row[0], json.loads(row[1])
+
+    def find(self, message_sid: str) -> Optional[Tuple[int, str, Optional[Dict[str, Any]]]]:
+        """Look up a message by MessageSid.
+
+        Returns:
+            Optional[Tuple[int, str, Optional[Dict[str, Any]]]]: (queue id,
+            status, stored inline reply or None), or None if unknown
+        """
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT id, status, reply_json FROM inbound_messages WHERE message_sid = ?", (message_sid,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2]) if row[2] else None
+
+    def complete(self, queue_id: int, reply: Optional[Dict[str, Any]] = None) -> None:
+        """Mark a message as delivered, storing the reply of an inline answer."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "UPDATE inbound_messages SET status = ?, reply_json = ?, updated_at = ? WHERE id = ?",
+                (STATUS_DONE, json.dumps(reply, ensure_ascii=False) if reply is not None else None,
+                 time.time(), queue_id)
+            )
+            conn.commit()
+
+    def fail(self, queue_id: int, error: str, retry: bool = True) -> bool:
+        """Record a failed attempt.
+
+        Args:
+            queue_id: Message to fail
+            error: Error text kept with the message
+            retry: Put the message back unless it has used up its attempts;
+                False marks it failed right away (inline answers)
+
+        Returns:
+            bool: True if the message was put back for another attempt, False
+            if it is marked failed
+        """
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT attempts FROM inbound_messages WHERE id = ?", (queue_id,)).fetchone()
+            retry = retry and row is not None and row[0] < self.max_attempts
+            conn.execute(
+                "UPDATE inbound_messages SET status = ?, last_error = ?, updated_at = ? WHERE id = ?",
+                (STATUS_PENDING if retry else STATUS_FAILED, error[:500], time.time(), queue_id)
+            )
+            conn.commit()
+            return retry
+
+    def recover(self) -> int:
+        """Return messages left in flight by a previous run to the queue."""
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(
+                "UPDATE inbound_messages SET status = ?, updated_at = ? WHERE status = ?",
+                (STATUS_PENDING, time.time(), STATUS_PROCESSING)
+            )
+            conn.commit()
+            return cursor.rowcount
+
+    def prune(self, retention_hours: float = QUEUE_RETENTION_HOURS) -> int:
+        """Delete finished messages older than the dedupe retention window."""
+        cutoff = time.time() - retention_hours * 3600
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(
+                "DELETE FROM inbound_messages WHERE status IN (?, ?) AND updated_at < ?",
+                (STATUS_DONE, STATUS_FAILED, cutoff)
+            )
+            conn.commit()
+            return cursor.rowcount
+
+    async def periodic_prune(self, interval_seconds: int = QUEUE_PRUNE_SECONDS) -> None:
+        """Prune finished messages forever (run as a background task)."""
+        while True:
+            try:
+                pruned = await asyncio.to_thread(self.prune)
+                if pruned:
+                    logger.info(f"🧹 Pruned {pruned} finished messages")
+            except Exception as e:
+                logger.error(f"❌ Inbound queue prune failed: {e}")
+            await asyncio.sleep(interval_seconds)
+
+    def pending_count(self) -> int:
+        """Return the number of messages waiting or in flight."""
+        with self._lock:
+            return self._connection().execute(
+                "SELECT COUNT(*) FROM inbound_messages WHERE status IN (?, ?)",
+                (STATUS_PENDING, STATUS_PROCESSING)
+            ).fetchone()[0]
+
+
+# Global inbound queue instance
+inbound_queue = InboundMessageQueue()
@@ -0,0 +1,142 @@
+"""
+Farmer Language Resolution for the WhatsApp Gateway
+
+Determines the reply language for an inbound message without an LLM turn:
+the farmer's stored profile (personal_info.primary_language) wins, then a
+lightweight script detector over the message body, then the configured
+default language. A farmer without a stored profile is never answered in
+the default profile's language. Profile lookups are cached in-process per
+phone number.
+
+Configuration (environment variables):
+    KISAN_MITRA_DEFAULT_LANGUAGE   Reply language when neither the profile nor the
+                                   message tells (voice notes, media; default hindi)
+    LANGUAGE_CACHE_TTL_SECONDS     How long a profile language is cached (default 600)
+    LANGUAGE_CACHE_MAX_ENTRIES     Maximum cached phone numbers (default 50000)
+"""
+
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from tools.profile_store import get_profile_store
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LANGUAGE = os.getenv("KISAN_MITRA_DEFAULT_LANGUAGE", "hindi").strip().lower()
+LANGUAGE_CACHE_TTL_SECONDS = float(os.getenv("LANGUAGE_CACHE_TTL_SECONDS", "600"))
+LANGUAGE_CACHE_MAX_ENTRIES = int(os.getenv("LANGUAGE_CACHE_MAX_ENTRIES", "50000"))
+
+# Unicode script blocks → language names used by the voice processor
+SCRIPT_RANGES = [
+    (0x0900, 0x097F, "hindi"),      # Devanagari
+    (0x0980, 0x09FF, "bengali"),
+    (0x0A00, 0x0A7F, "punjabi"),    # Gurmukhi
+    (0x0A80, 0x0AFF, "gujarati"),
+    (0x0B00, 0x0B7F, "odia"),
+    (0x0B80, 0x0BFF, "tamil"),
+    (0x0C00, 0x0C7F, "telugu"),
+    (0x0C80, 0x0CFF, "kannada"),
+    (0x0D00, 0x0D7F, "malayalam"),
+    (0x0600, 0x06FF, "urdu"),       # Arabic script
+]
+
+# Frequent romanized Hindi words, so Hinglish is not mistaken for English
+HINGLISH_MARKERS = {
+    "hai", "hain", "kya", "ka", "ki", "ke", "ko", "mera", "meri", "mere", "nahi", "nahin",
+    "kaise", "kab", "kitna", "kitne", "bhav", "bhaw", "fasal", "kheti", "mausam", "aaj",
+    "kal", "bataiye", "batao", "kaun", "kahan", "mein", "bhai", "ji", "dawa", "khad",
+}
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+def detect_language_from_text(text: str) -> Optional[str]:
+    """Guess the language of a message from its script.
+
+    Returns:
+        Optional[str]: Language name (e.g. "hindi", "punjabi", "english"), or
+        None if the text has no letters
+    """
+    counts = {}
+    latin = 0
+    for ch in text or "":
+        code = ord(ch)
+        if code < 0x80:
+            if ch.isalpha():
+                latin += 1
+            continue
+        for start, end, language in SCRIPT_RANGES:
+            if start <= code <= end:
+                counts[language] = counts.get(language, 0) + 1
+                break
+
+    if counts:
+        language, count = max(counts.items(), key=lambda item: item[1])
+        if count >= latin:
+            return language
+
+    if latin:
+        words = _WORD_RE.findall(text.lower())
+        if any(word in HINGLISH_MARKERS for word in words):
+            return "hindi"
+        return "english"
+
+    return None
+
+
+def _profile_language(profile_data) -> Optional[str]:
+    language = profile_data.get("farmer_details", {}).get("personal_info", {}).get("primary_language")
+    return language.strip().lower() if isinstance(language, str) and language.strip() else None
+
+
+class FarmerLanguageResolver:
+    """Per-farmer reply language with an in-process TTL/LRU cache"""
+
+    def __init__(self, ttl_seconds: float = LANGUAGE_CACHE_TTL_SECONDS, max_entries: int = LANGUAGE_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # phone → (profile language or None, cached_at)
+        self._cache: "OrderedDict[str, Tuple[Optional[str], float]]" = OrderedDict()
+
+    def _stored_profile_language(self, phone_number: str) -> Optional[str]:
+        now = time.monotonic()
+        entry = self._cache.get(phone_number)
+        if entry is not None and now - entry[1] <= self.ttl_seconds:
+            self._cache.move_to_end(phone_number)
+            return entry[0]
+
+        language = None
+        try:
+            profile_data = get_profile_store().get(phone_number)
+            if profile_data is not None:
+                language = _profile_language(profile_data)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read profile language for {phone_number}: {e}")
+
+        self._cache[phone_number] = (language, now)
+        self._cache.move_to_end(phone_number)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return language
+
+    def resolve(self, phone_number: Optional[str], message_body: str = "") -> str:
+        """Return the language to reply in for a farmer's message."""
+        if phone_number:
+            language = self._stored_profile_language(phone_number)
+            if language:
+                return language
+
+        # Voice notes and media-only messages have no text to detect from
+        return detect_language_from_text(message_body) or DEFAULT_LANGUAGE
+
+    def invalidate(self, phone_number: str) -> None:
+        """Drop a cached language (e.g. after the farmer's profile changed)."""
+        self._cache.pop(phone_number, None)
+
+
+# Global language resolver instance
+farmer_languages = FarmerLanguageResolver()
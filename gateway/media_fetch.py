@@ -0,0 +1,133 @@
+"""
+Streaming Media Fetcher for the WhatsApp Gateway
+
+Downloads Twilio media (crop photos, voice notes) in chunks into a single
+growing buffer (preallocated from Content-Length when known) instead of materializing
+the whole response and copying it around. A per-content-type size cap is
+enforced from Content-Length up front and again while streaming, and a
+SHA-256 of the content is computed on the fly for dedupe. Images are
+base64-encoded exactly once, straight from the buffer, into ASCII bytes that
+are written into the ADK request body without further copies.
+
+Configuration (environment variables):
+    MEDIA_MAX_IMAGE_BYTES   Largest accepted image (default 5 MB, WhatsApp's limit)
+    MEDIA_MAX_AUDIO_BYTES   Largest accepted voice note (default 16 MB)
+    MEDIA_MAX_OTHER_BYTES   Largest accepted other media (default 5 MB)
+"""
+
+import base64
+import hashlib
+import logging
+import os
+from typing import Any, Optional
+
+from gateway.http_client import GatewayHttpClient, http_client
+
+logger = logging.getLogger(__name__)
+
+MEDIA_MAX_IMAGE_BYTES = int(os.getenv("MEDIA_MAX_IMAGE_BYTES", str(5 * 1024 * 1024)))
+MEDIA_MAX_AUDIO_BYTES = int(os.getenv("MEDIA_MAX_AUDIO_BYTES", str(16 * 1024 * 1024)))
+MEDIA_MAX_OTHER_BYTES = int(os.getenv("MEDIA_MAX_OTHER_BYTES", str(5 * 1024 * 1024)))
+MEDIA_CHUNK_BYTES = 64 * 1024
+# Multiple of 3 so slices encode without padding except at the end
+_BASE64_SLICE_BYTES = 3 * MEDIA_CHUNK_BYTES
+
+
+class MediaFetchError(Exception):
+    """Media could not be downloaded"""
+
+
+class MediaTooLargeError(MediaFetchError):
+    """Media exceeds the size limit for its content type"""
+
+
+def max_bytes_for(content_type: Optional[str]) -> int:
+    """Size limit for a content type."""
+    main_type = (content_type or "").split("/", 1)[0].lower()
+    if main_type == "image":
+        return MEDIA_MAX_IMAGE_BYTES
+    if main_type == "audio":
+        return MEDIA_MAX_AUDIO_BYTES
+    return MEDIA_MAX_OTHER_BYTES
+
+
+class FetchedMedia:
+    """Downloaded media held in one buffer"""
+
+    __slots__ = ("buffer", "content_type", "sha256", "size")
+
+    def __init__(self, buffer: bytearray, content_type: str, sha256: str):
+        self.buffer: Optional[bytearray] = buffer
+        self.content_type = content_type
+        self.sha256 = sha256
+        self.size = len(buffer)
+
+    def to_bytes(self) -> bytes:
+        """Return the content as bytes (one copy)."""
+        return bytes(self.buffer)
+
+    def to_base64(self, release: bool = True) -> bytearray:
+        """Base64-encode the content once (ASCII bytes), optionally freeing the raw buffer.
+
+        Encodes slice by slice into a preallocated output, so peak memory is
+        the raw buffer plus the encoded size with no intermediate copies.
+        """
+        view = memoryview(self.buffer)
+        encoded = bytearray(4 * ((self.size + 2) // 3))
+        out = 0
+        for start in range(0, self.size, _BASE64_SLICE_BYTES):
+            piece = base64.b64encode(view[start:start + _BASE64_SLICE_BYTES])
+            encoded[out:out + len(piece)] = piece
+            out += len(piece)
+        view.release()
+        if release:
+            self.buffer = None
+        return encoded
+
+
+async def fetch_media(
+    url: str,
+    content_type: Optional[str] = None,
+    timeout: float = 30,
+    client: GatewayHttpClient = http_client,
+    **kwargs: Any,
+) -> FetchedMedia:
+    """Stream a media URL into memory with a size cap.
+
+    Args:
+        url: Media URL (e.g. Twilio MediaUrl0)
+        content_type: Declared content type (e.g. MediaContentType0); the
+            response header is used when not given
+        timeout: Total request timeout in seconds
+        client: Pooled HTTP client to use
+        **kwargs: Passed to the request (e.g. auth)
+
+    Raises:
+        MediaTooLargeError: If the media exceeds the limit for its type
+        MediaFetchError: If the download fails
+    """
+    async with client.request("GET", url, timeout=timeout, **kwargs) as response:
+        if response.status != 200:
+            raise MediaFetchError(f"Media download failed: {response.status}")
+
+        content_type = content_type or response.headers.get("Content-Type", "application/octet-stream")
+        limit = max_bytes_for(content_type)
+        if response.content_length is not None and response.content_length > limit:
+            raise MediaTooLargeError(f"{content_type} of {response.content_length} bytes exceeds {limit}")
+
+        # Preallocate when the size is known so the buffer never reallocates
+        buffer = bytearray(response.content_length or 0)
+        size = 0
+        digest = hashlib.sha256()
+        async for chunk in response.content.iter_chunked(MEDIA_CHUNK_BYTES):
+            end = size + len(chunk)
+            if end > limit:
+                raise MediaTooLargeError(f"{content_type} exceeds {limit} bytes")
+            buffer[size:end] = chunk
+            size = end
+            digest.update(chunk)
+        if size < len(buffer):
+            del buffer[size:]
+
+    logger.info(f"📥 Fetched {content_type}: {size} bytes, sha256 {digest.hexdigest()[:12]}")
+    return FetchedMedia(buffer, content_type, digest.hexdigest())
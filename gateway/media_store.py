@@ -0,0 +1,230 @@
+"""
+Media Store for Generated Voice Replies
+
+Generated audio (MP3/OGG) is written once to a content-addressed directory
+and served from /media/<id> so Twilio can fetch it as a TwiML <Media> URL.
+Identical replies share one file. Responses support HTTP range requests and
+long-lived cache headers (content-addressed files never change), and files
+are removed once they are older than the TTL.
+
+Configuration (environment variables):
+    MEDIA_STORE_DIR          Directory for generated media (default data/media)
+    MEDIA_TTL_SECONDS        Lifetime of a generated file (default 86400)
+    MEDIA_CLEANUP_SECONDS    Interval between expiry sweeps (default 600)
+    PUBLIC_BASE_URL          Public base URL of the gateway (e.g. the ngrok URL);
+                             defaults to the base URL of the incoming webhook
+                             when that is https on a public host
+"""
+
+import asyncio
+import hashlib
+import ipaddress
+import logging
+import os
+import re
+import tempfile
+import time
+from email.utils import formatdate
+from typing import Optional, Tuple
+from urllib.parse import urlsplit
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+
+logger = logging.getLogger(__name__)
+
+MEDIA_STORE_DIR = os.getenv("MEDIA_STORE_DIR", "data/media")
+MEDIA_TTL_SECONDS = int(os.getenv("MEDIA_TTL_SECONDS", "86400"))
+MEDIA_CLEANUP_SECONDS = int(os.getenv("MEDIA_CLEANUP_SECONDS", "600"))
+PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL")
+
+MEDIA_EXTENSIONS = {
+    "audio/mpeg": ".mp3",
+    "audio/ogg": ".ogg",
+}
+_CONTENT_TYPES = {extension: content_type for content_type, extension in MEDIA_EXTENSIONS.items()}
+_MEDIA_ID_RE = re.compile(r"^[0-9a-f]{40}\.(mp3|ogg)$")
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class MediaStore:
+    """Content-addressed media files with TTL expiry"""
+
+    def __init__(self, media_dir: str = MEDIA_STORE_DIR, ttl_seconds: int = MEDIA_TTL_SECONDS):
+        self.media_dir = media_dir
+        self.ttl_seconds = ttl_seconds
+
+    def _path(self, media_id: str) -> str:
+        return os.path.join(self.media_dir, media_id[:2], media_id)
+
+    def put(self, data: bytes, content_type: str = "audio/mpeg") -> str:
+        """Store media bytes and return the media id.
+
+        Raises:
+            ValueError: If the content type is not supported
+        """
+        extension = MEDIA_EXTENSIONS.get(content_type)
+        if not extension:
+            raise ValueError(f"Unsupported media type: {content_type}")
+
+        media_id = hashlib.sha256(data).hexdigest()[:40] + extension
+        path = self._path(media_id)
+        if os.path.exists(path):
+            # Same content already stored; restart its TTL
+            os.utime(path)
+            return media_id
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return media_id
+
+    def locate(self, media_id: str) -> Optional[Tuple[str, str]]:
+        """Return (path, content type) for a live media id, or None."""
+        if not _MEDIA_ID_RE.match(media_id):
+            return None
+        path = self._path(media_id)
+        try:
+            age = time.time() - os.path.getmtime(path)
+        except FileNotFoundError:
+            return None
+        if age > self.ttl_seconds:
+            return None
+        return path, _CONTENT_TYPES[os.path.splitext(media_id)[1]]
+
+    def cleanup(self) -> int:
+        """Delete expired media files. Returns the number removed."""
+        if not os.path.isdir(self.media_dir):
+            return 0
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        for root, _, files in os.walk(self.media_dir):
+            for file_name in files:
+                path = os.path.join(root, file_name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    continue
+        return removed
+
+    async def periodic_cleanup(self, interval_seconds: int = MEDIA_CLEANUP_SECONDS) -> None:
+        """Sweep expired files forever (run as a background task)."""
+        while True:
+            try:
+                removed = await asyncio.to_thread(self.cleanup)
+                if removed:
+                    logger.info(f"🧹 Removed {removed} expired media files")
+            except Exception as e:
+                logger.error(f"❌ Media cleanup failed: {e}")
+            await asyncio.sleep(interval_seconds)
+
+
+def _is_public_https(base_url: str) -> bool:
+    """True for an https URL on a host Twilio can reach (not localhost or a private address)."""
+    parts = urlsplit(base_url)
+    host = (parts.hostname or "").lower()
+    if parts.scheme != "https" or not host:
+        return False
+    if host == "localhost" or host.endswith((".localhost", ".local", ".internal")):
+        return False
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return "." in host  # a bare name like "gateway" only resolves locally
+    return address.is_global
+
+
+def media_url(media_id: str, request_base_url: Optional[str] = None) -> Optional[str]:
+    """Public URL of a media file, or None if no public base URL is known.
+
+    Without PUBLIC_BASE_URL the incoming webhook's base URL is only used if
+    it is https on a public host; behind a tunnel or proxy it is usually
+    http://localhost, which Twilio cannot fetch.
+    """
+    base_url = PUBLIC_BASE_URL
+    if not base_url:
+        if not request_base_url or not _is_public_https(request_base_url):
+            logger.warning(
+                f"⚠️ No public URL for media (request base URL {request_base_url!r}); set PUBLIC_BASE_URL"
+            )
+            return None
+        base_url = request_base_url
+    return f"{base_url.rstrip('/')}/media/{media_id}"
+
+
+def _read_file(path: str, start: int = 0, length: int = -1) -> bytes:
+    with open(path, "rb") as file:
+        file.seek(start)
+        return file.read(length)
+
+
+def _parse_range(range_header: str, size: int) -> Tuple[int, int]:
+    """Parse a single "bytes=" range into inclusive (start, end).
+
+    Raises:
+        ValueError: If the range is malformed or not satisfiable
+    """
+    match = _RANGE_RE.match(range_header.strip())
+    if not match or not (match.group(1) or match.group(2)):
+        raise ValueError(range_header)
+    if match.group(1):
+        start = int(match.group(1))
+        end = int(match.group(2)) if match.group(2) else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(size - int(match.group(2)), 0)
+        end = size - 1
+    end = min(end, size - 1)
+    if start > end:
+        raise ValueError(range_header)
+    return start, end
+
+
+# Global media store instance
+media_store = MediaStore()
+
+media_router = APIRouter()
+
+
+@media_router.get("/media/{media_id}")
+async def serve_media(media_id: str, request: Request):
+    """Serve a generated media file with range and cache support"""
+    located = media_store.locate(media_id)
+    if located is None:
+        raise HTTPException(status_code=404, detail="Media not found")
+    path, content_type = located
+
+    stat = os.stat(path)
+    size = stat.st_size
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Cache-Control": f"public, max-age={media_store.ttl_seconds}, immutable",
+        "ETag": f'"{media_id}"',
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+    }
+
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if not range_header:
+        content = await asyncio.to_thread(_read_file, path)
+        return Response(content=content, media_type=content_type, headers=headers)
+
+    try:
+        start, end = _parse_range(range_header, size)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    content = await asyncio.to_thread(_read_file, path, start, end - start + 1)
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return Response(content=content, status_code=206, media_type=content_type, headers=headers)
@@ -0,0 +1,196 @@
+"""
+Out-of-Band WhatsApp Replies for the WhatsApp Gateway
+
+In async reply mode the webhook only persists the inbound message to the
+durable inbound queue (gateway/inbound_queue.py) and acknowledges Twilio
+with an empty TwiML response. A pool of background workers runs the agent
+pipeline and delivers the reply through the Twilio Messages REST API, so
+slow turns (media, STT, agent, TTS) neither hit Twilio's webhook timeout nor
+hold a request worker.
+
+Configuration (environment variables):
+    WHATSAPP_ASYNC_REPLIES      Enable async reply mode (default false)
+    WHATSAPP_REPLY_WORKERS      Background workers (default 8)
+    WHATSAPP_REPLY_POLL_SECONDS Idle re-check interval for the queue (default 1)
+    TWILIO_API_BASE_URL         Override the Twilio API base URL, e.g. the
+                                local fake at http://localhost:8002
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from twilio.base import values
+from twilio.http.async_http_client import AsyncTwilioHttpClient
+from twilio.rest import Client
+
+from gateway.inbound_queue import InboundMessageQueue, inbound_queue
+
+logger = logging.getLogger(__name__)
+
+ASYNC_REPLIES_ENABLED = os.getenv("WHATSAPP_ASYNC_REPLIES", "false").lower() in ("1", "true", "yes")
+REPLY_WORKERS = int(os.getenv("WHATSAPP_REPLY_WORKERS", "8"))
+REPLY_POLL_SECONDS = float(os.getenv("WHATSAPP_REPLY_POLL_SECONDS", "1"))
+TWILIO_API_BASE_URL = os.getenv("TWILIO_API_BASE_URL")
+
+EMPTY_TWIML = """<?xml version="1.0" encoding="UTF-8"?>
+<Response></Response>"""
+
+
+def whatsapp_address(number: str) -> str:
+    """Return a number in Twilio's "whatsapp:+91..." address form."""
+    number = (number or "").strip()
+    return number if number.startswith("whatsapp:") else f"whatsapp:{number}"
+
+
+class TwilioReplySender:
+    """Sends WhatsApp messages through the Twilio Messages API (async client)"""
+
+    def __init__(
+        self,
+        account_sid: Optional[str],
+        auth_token: Optional[str],
+        from_number: Optional[str],
+        base_url: Optional[str] = TWILIO_API_BASE_URL,
+    ):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_number = from_number
+        self.base_url = base_url
+        self._client: Optional[Client] = None
+
+    def _get_client(self) -> Client:
+        if self._client is None:
+            if not (self.account_sid and self.auth_token and self.from_number):
+                raise RuntimeError("TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN and TWILIO_PHONE_NUMBER are required")
+            client = Client(self.account_sid, self.auth_token, http_client=AsyncTwilioHttpClient())
+            if self.base_url:
+                client.api.base_url = self.base_url.rstrip("/")
+            self._client = client
+        return self._client
+
+    async def send(self, to: str, body: Optional[str] = None, media_url: Optional[str] = None) -> str:
+        """Send a WhatsApp message and return its Twilio message SID.
+
+        Raises:
+            RuntimeError: If Twilio credentials are not configured
+            twilio.base.exceptions.TwilioRestException: If Twilio rejects the message
+        """
+        message = await self._get_client().messages.create_async(
+            from_=whatsapp_address(self.from_number),
+            to=whatsapp_address(to),
+            body=body or values.unset,
+            media_url=[media_url] if media_url else values.unset,
+        )
+        return message.sid
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.http_client.close()
+            self._client = None
+
+
+class ReplyWorkerPool:
+    """Background workers draining the durable inbound message queue"""
+
+    def __init__(
+        self,
+        queue: InboundMessageQueue = inbound_queue,
+        workers: int = REPLY_WORKERS,
+        poll_seconds: float = REPLY_POLL_SECONDS,
+    ):
+        self.queue = queue
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._tasks: List["asyncio.Task[None]"] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self, handler: Callable[[Dict[str, Any]], Awaitable[None]]) -> None:
+        """Start the workers; ``handler`` processes one message and sends its reply.
+
+        Messages left in flight by a previous run are re-queued first.
+        """
+        if self._tasks:
+            return
+        recovered = self.queue.recover()
+        if recovered:
+            logger.info(f"♻️ Re-queued {recovered} messages interrupted by the last shutdown")
+
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker(handler), name=f"whatsapp-reply-{i}")
+            for i in range(self.workers)
+        ]
+        self._wakeup.set()
+        logger.info(f"🧵 Started {self.workers} WhatsApp reply workers ({self.queue.pending_count()} pending)")
+
+    def enqueue(self, message: Dict[str, Any]) -> bool:
+        """Persist a message for the workers.
+
+        Returns:
+            bool: True if queued, False if its MessageSid is a duplicate
+        """
+        queued = self.queue.enqueue(message)
+        if queued and self._wakeup is not None:
+            self._wakeup.set()
+        return queued
+
+    async def _worker(self, handler: Callable[[Dict[str, Any]], Awaitable[None]]) -> None:
+        while not self._stopping:
+            # Clear before claiming so an enqueue after the claim still wakes us
+            self._wakeup.clear()
+            claimed = self.queue.claim_next()
+            if claimed is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            queue_id, message = claimed
+            try:
+                await handler(message)
+                self.queue.complete(queue_id)
+            except asyncio.CancelledError:
+                # Left as processing; recover() re-queues it on the next start
+                raise
+            except Exception as e:
+                retry = self.queue.fail(queue_id, str(e))
+                logger.error(
+                    f"❌ Reply worker failed for {message.get('MessageSid')}: {e}"
+                    f"{' (will retry)' if retry else ' (giving up)'}"
+                )
+            # The farmer's next message (or a retry) may now be claimable
+            self._wakeup.set()
+
+    async def stop(self, drain_timeout: float = 10) -> None:
+        """Let in-flight messages finish, then stop the workers.
+
+        Pending messages stay in the queue for the next start.
+        """
+        if not self._tasks:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        _, still_running = await asyncio.wait(self._tasks, timeout=drain_timeout)
+        if still_running:
+            logger.warning(f"⚠️ Stopping {len(still_running)} reply workers mid-message; they will be retried")
+        for task in still_running:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._wakeup = None
+        self._stopping = False
+
+    def qsize(self) -> int:
+        return self.queue.pending_count()
+
+
+# Global reply worker pool instance
+reply_workers = ReplyWorkerPool()
@@ -0,0 +1,114 @@
+"""
+ADK Session Registry for the WhatsApp Gateway
+
+Maps each farmer's phone number to a live ADK session id so conversations keep
+their context across turns and the gateway does not create a new session on
+every message. Entries expire after a sliding idle TTL and the least recently
+used entries are evicted once the registry is full. Concurrent first messages
+from the same farmer share a single session-creation call.
+
+Configuration (environment variables):
+    ADK_SESSION_TTL_SECONDS   Idle time before a session is replaced (default 1800)
+    ADK_SESSION_MAX_ENTRIES   Maximum tracked sessions (default 50000)
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ADK_SESSION_TTL_SECONDS = float(os.getenv("ADK_SESSION_TTL_SECONDS", "1800"))
+ADK_SESSION_MAX_ENTRIES = int(os.getenv("ADK_SESSION_MAX_ENTRIES", "50000"))
+
+
+class AdkSessionRegistry:
+    """Phone number → ADK session id with TTL expiry and LRU eviction"""
+
+    def __init__(self, ttl_seconds: float = ADK_SESSION_TTL_SECONDS, max_entries: int = ADK_SESSION_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._sessions: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._creating: Dict[str, "asyncio.Future[Optional[str]]"] = {}
+
+    def get(self, user_id: str) -> Optional[str]:
+        """Return a live session id for a user and refresh its idle timer."""
+        entry = self._sessions.get(user_id)
+        if entry is None:
+            return None
+        session_id, last_used = entry
+        now = time.monotonic()
+        if now - last_used > self.ttl_seconds:
+            del self._sessions[user_id]
+            logger.info(f"⌛ ADK session expired for {user_id}: {session_id}")
+            return None
+        self._sessions[user_id] = (session_id, now)
+        self._sessions.move_to_end(user_id)
+        return session_id
+
+    def put(self, user_id: str, session_id: str) -> None:
+        """Register a session id for a user, evicting the LRU entry if full."""
+        self._sessions[user_id] = (session_id, time.monotonic())
+        self._sessions.move_to_end(user_id)
+        while len(self._sessions) > self.max_entries:
+            evicted_user, (evicted_session, _) = self._sessions.popitem(last=False)
+            logger.info(f"🧹 Evicted ADK session for {evicted_user}: {evicted_session}")
+
+    def invalidate(self, user_id: str, session_id: Optional[str] = None) -> None:
+        """Forget a user's session (e.g. after the ADK server returned 404).
+
+        When ``session_id`` is given, only that session is dropped, so a
+        session created concurrently by another turn survives.
+        """
+        entry = self._sessions.get(user_id)
+        if entry is not None and (session_id is None or entry[0] == session_id):
+            del self._sessions[user_id]
+
+    async def get_or_create(
+        self, user_id: str, create: Callable[[], Awaitable[Optional[str]]]
+    ) -> Optional[str]:
+        """Return the user's live session, creating it at most once concurrently.
+
+        Args:
+            user_id: Farmer's phone number (ADK userId)
+            create: Coroutine factory that creates a session and returns its id
+
+        Returns:
+            Optional[str]: Session id, or None if creation failed
+        """
+        session_id = self.get(user_id)
+        if session_id:
+            return session_id
+
+        pending = self._creating.get(user_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._creating[user_id] = future
+        try:
+            session_id = await create()
+            if session_id:
+                self.put(user_id, session_id)
+            future.set_result(session_id)
+            return session_id
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            del self._creating[user_id]
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+# Global session registry instance
+adk_sessions = AdkSessionRegistry()
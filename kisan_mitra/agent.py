@@ -26,6 +26,7 @@ from tools import (
     get_farmer_mandi_prices,     # Today's mandi prices for farmer location
     get_mandi_prices_for_date,   # Specific date mandi prices
     get_commodity_price_info,    # Specific commodity price information
+    get_commodity_price_history, # Recorded price trend of a commodity
     # Voice Processing Tools (NEW)
     process_voice_input,         # Process voice input from users
     generate_voice_response,     # Generate voice responses in farmer's language
@@ -70,6 +71,7 @@ You are *Kisan Mitra* (किसान मित्र) - a *Senior Indian Agron
 - **For today's prices**: Use get_farmer_mandi_prices() to get current prices for farmer's location
 - **For specific date**: Use get_mandi_prices_for_date(date) with DD-Mon-YYYY format (e.g., "25-Dec-2024")
 - **For specific commodity**: Use get_commodity_price_info(commodity_name) for detailed commodity prices
+- **For price trends**: Use get_commodity_price_history(commodity_name, days) for the last N days of recorded prices
 - **AUTOMATIC LOCATION**: All tools automatically use farmer's location from profile
 - **RESPOND IN HINDI**: Always provide mandi price information in Hindi
 
@@ -77,6 +79,7 @@ You are *Kisan Mitra* (किसान मित्र) - a *Senior Indian Agron
 - "आज के मंडी भाव क्या हैं?" → Use get_farmer_mandi_prices(), respond entirely in Hindi
 - "गेहूं का रेट क्या है?" → Use get_commodity_price_info("Wheat"), respond in Hindi
 - "15-जनवरी के भाव बताइए" → Use get_mandi_prices_for_date("15-Jan-2025"), respond in Hindi
+- "पिछले महीने गेहूं का भाव कैसा रहा?" → Use get_commodity_price_history("Wheat", 30), respond in Hindi
 - **Always start with**: "आपके क्षेत्र के मंडी भाव की जानकारी..." and continue in Hindi
 
 ### *CRITICAL: LOCATION CONTEXT - NEVER ASK FOR LOCATION*
@@ -185,6 +188,7 @@ When the user sends queries (in any language), you must:
 - get_farmer_mandi_prices(): **TODAY'S mandi prices for farmer's location**
 - get_mandi_prices_for_date(date): **Specific date mandi prices (DD-Mon-YYYY format)**
 - get_commodity_price_info(commodity): **Specific commodity price information**
+- get_commodity_price_history(commodity, days): **Recorded price trend over the last N days**
 - **Built-in Vision**: Direct image analysis for disease detection and crop diagnosis
 - **Voice Processing Tools (NEW)**:
   - process_voice_input(audio_data, source, farmer_language): Process voice input from users
@@ -248,6 +252,7 @@ root_agent = Agent(
         get_farmer_mandi_prices,          # Today's mandi prices for farmer location
         get_mandi_prices_for_date,        # Specific date mandi prices
         get_commodity_price_info,         # Specific commodity price information
+        get_commodity_price_history,      # Recorded price trend of a commodity
         
         # Farmer Context Tools for Personalization
         load_farmer_profile,
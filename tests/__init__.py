@@ -0,0 +1,2 @@
+# Kisan Mitra Tests
+# Run with: python -m unittest discover tests
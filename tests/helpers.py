@@ -0,0 +1,42 @@
+"""Shared test doubles for the cache tests"""
+
+import threading
+from typing import Any, Callable, List
+
+
+class CountingStub:
+    """Stands in for an upstream call: counts calls and returns ``result`` or raises ``error``
+
+    ``result`` may be a callable taking the call number, e.g. to tell builds apart.
+    """
+
+    def __init__(self, result: Any = None, error: BaseException = None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self) -> Any:
+        with self._lock:
+            self.calls += 1
+            calls = self.calls
+        if self.error is not None:
+            raise self.error
+        return self.result(calls) if callable(self.result) else self.result
+
+
+def run_concurrently(callers: int, call: Callable[[], Any]) -> List[Any]:
+    """Run ``call`` in ``callers`` threads released together by a barrier; return their results."""
+    barrier = threading.Barrier(callers)
+    results = []
+
+    def caller():
+        barrier.wait(5)
+        results.append(call())
+
+    threads = [threading.Thread(target=caller) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
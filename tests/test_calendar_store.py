@@ -0,0 +1,103 @@
+"""Tests for the indexed farming calendar store (tools.calendar_store)"""
+
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from tools.calendar_store import FarmingCalendarStore
+
+DATASET = {
+    "crop_database": {
+        "wheat": {"hindi_name": "गेहूं", "regional_names": {"punjabi": ["ਕਣਕ"]}, "season": "rabi"},
+        "rice": {"hindi_name": "धान", "regional_names": {"tamil": "நெல்"}, "season": "kharif"},
+        "tomato": {"hindi_name": "टमाटर", "season": "all"},
+    },
+    "farming_calendar": {
+        "month_1": {
+            "month_name": "January",
+            "crops": {
+                "rabi": [{"crop_name": "Wheat", "growth_stage": "tillering", "activities": ["irrigate"]}],
+                "vegetables": [{"crop_name": "Tomato"}, {"crop_name": "Marigold"}],
+            },
+            "pest_disease_watch": {"major_pests": ["Aphid"], "diseases": ["Yellow Rust"]},
+        },
+        "month_11": {
+            "month_name": "November",
+            "crops": {"rabi": [{"crop_name": "Wheat", "growth_stage": "sowing"}]},
+            "pest_disease_watch": {"major_pests": ["Termite"], "diseases": []},
+        },
+    },
+    "pest_disease_database": [
+        {"pest_name": "Aphid", "affected_crops": ["Wheat", "Mustard"], "control": "neem oil"},
+    ],
+}
+
+
+class FarmingCalendarStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dataset_path = os.path.join(self.tmp.name, "calendar.json")
+        self._write(DATASET)
+        self.store = FarmingCalendarStore(self.dataset_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, data):
+        with open(self.dataset_path, "w", encoding="utf-8") as dataset_file:
+            json.dump(data, dataset_file, ensure_ascii=False)
+
+    def test_dataset_names_resolve_to_the_crop_key(self):
+        names = {"wheat": "wheat", "Wheat": "wheat", "गेहूं": "wheat", "ਕਣਕ": "wheat", "धान": "rice", "நெல்": "rice"}
+        for name, crop in names.items():
+            with self.subTest(name=name):
+                self.assertEqual(self.store.resolve_crop(name), crop)
+
+    def test_transliterations_and_spelling_variants_resolve(self):
+        for name in ("gehun", "gehoon", "GEHU", "गेहूँ", "kanak"):
+            with self.subTest(name=name):
+                self.assertEqual(self.store.resolve_crop(name), "wheat")
+        for name in ("dhan", "dhaan", "paddy", "chawal", "chaval"):
+            with self.subTest(name=name):
+                self.assertEqual(self.store.resolve_crop(name), "rice")
+
+    def test_plurals_resolve_and_unknown_names_do_not(self):
+        self.assertEqual(self.store.resolve_crop("tomatoes"), "tomato")
+        self.assertEqual(self.store.resolve_crop("tamatar"), "tomato")
+        self.assertIsNone(self.store.resolve_crop("dragon fruit"))
+        # Aliases of crops missing from the dataset are not registered
+        self.assertIsNone(self.store.resolve_crop("bajra"))
+
+    def test_crop_entry_carries_record_and_monthly_calendar(self):
+        entry = self.store.lookup_crop("gehun")
+        self.assertEqual(entry["record"]["season"], "rabi")
+        self.assertEqual([month["month_number"] for month in entry["monthly_calendar"]], [1, 11])
+        self.assertEqual(entry["monthly_calendar"][1]["details"]["growth_stage"], "sowing")
+
+    def test_calendar_only_crops_are_indexed(self):
+        entry = self.store.lookup_crop("marigold")
+        self.assertIsNone(entry["record"])
+        self.assertEqual(entry["monthly_calendar"][0]["category"], "vegetables")
+
+    def test_pests_combine_watch_months_and_database_details(self):
+        aphid = self.store.get_pest("aphid")
+        self.assertEqual(aphid["watch_months"], [1])
+        self.assertEqual(aphid["affected_crops"], ["Wheat", "Mustard"])
+        self.assertEqual(aphid["control"], "neem oil")
+        self.assertEqual(self.store.get_pest("Yellow Rust")["watch_months"], [1])
+
+    def test_dataset_is_reloaded_when_the_file_changes(self):
+        self.assertIsNone(self.store.resolve_crop("bajra"))
+        data = json.loads(json.dumps(DATASET))
+        data["crop_database"]["pearl millet"] = {"hindi_name": "बाजरा"}
+        time.sleep(0.01)
+        self._write(data)
+        os.utime(self.dataset_path, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+        self.assertEqual(self.store.resolve_crop("bajra"), "pearl millet")
+
+
+if __name__ == "__main__":
+    unittest.main()
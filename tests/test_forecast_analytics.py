@@ -0,0 +1,129 @@
+"""Tests for the NumPy forecast indices (tools.forecast_analytics)"""
+
+import unittest
+
+import numpy as np
+
+from tools.forecast_analytics import (
+    SLOT_HOURS,
+    analyze_forecast,
+    forecast_arrays,
+    forecast_indices,
+    spray_scores,
+    stack_forecast_arrays,
+)
+
+IST = 19800
+# 2025-01-15 00:00 IST
+START = 1736879400
+SLOT = SLOT_HOURS * 3600
+
+
+def _slot(index, temp=22.0, humidity=60.0, wind=2.0, gust=3.0, rain=0.0, pop=0.0):
+    return {
+        "dt": START + index * SLOT,
+        "main": {"temp": temp, "humidity": humidity},
+        "wind": {"speed": wind, "gust": gust},
+        "rain": {"3h": rain},
+        "pop": pop,
+        "weather": [{"description": "clear sky" if rain == 0 else "light rain"}],
+    }
+
+
+def _forecast(slots):
+    return {"city": {"timezone": IST}, "list": slots}
+
+
+def _clear_days(days=5, **overrides):
+    return [_slot(index, **overrides) for index in range(days * 8)]
+
+
+class SprayScoreTest(unittest.TestCase):
+
+    def _scores(self, slots):
+        return spray_scores(forecast_arrays(_forecast(slots)))
+
+    def test_only_daylight_slots_are_sprayable(self):
+        scores = self._scores(_clear_days(days=1))
+        # 06:00-09:00, 09:00-12:00, 12:00-15:00, 15:00-18:00 IST
+        self.assertEqual(list(np.flatnonzero(scores)), [2, 3, 4, 5])
+
+    def test_wind_temperature_and_humidity_limits(self):
+        for overrides in ({"wind": 0.2}, {"wind": 6.0}, {"gust": 9.0}, {"temp": 34.0},
+                          {"temp": 8.0}, {"humidity": 30.0}, {"humidity": 95.0}):
+            with self.subTest(**overrides):
+                self.assertFalse(self._scores(_clear_days(days=1, **overrides)).any())
+
+    def test_rain_in_the_following_hours_blocks_spraying(self):
+        slots = _clear_days(days=1)
+        slots[4] = _slot(4, rain=2.0, pop=0.9)
+        scores = self._scores(slots)
+        # 12:00 has rain; 06:00 and 09:00 have it within the next 6 hours
+        self.assertEqual(list(np.flatnonzero(scores)), [5])
+
+    def test_calmer_milder_slots_score_higher(self):
+        slots = _clear_days(days=1)
+        slots[3] = _slot(3, wind=3.5, temp=29.0)
+        scores = self._scores(slots)
+        self.assertGreater(scores[2], scores[3])
+        self.assertTrue(((scores >= 0) & (scores <= 1)).all())
+
+
+class AnalyzeForecastTest(unittest.TestCase):
+
+    def test_rain_totals_degree_days_and_stress_hours(self):
+        slots = _clear_days()
+        slots[1] = _slot(1, rain=4.0, humidity=95.0)
+        slots[10] = _slot(10, rain=6.0)
+        slots[30] = _slot(30, temp=37.0)
+        result = analyze_forecast(_forecast(slots), now=START)
+
+        self.assertEqual(result["slots"], 40)
+        self.assertEqual(result["rain_next_24h_mm"], 4.0)
+        self.assertEqual(result["rain_next_72h_mm"], 10.0)
+        self.assertEqual(result["rain_5_days_mm"], 10.0)
+        self.assertEqual(result["leaf_wetness_hours"], 6)
+        self.assertEqual(result["heat_stress_hours"], 3)
+        # 39 slots at 22°C and one at 37°C over base 10°C
+        self.assertAlmostEqual(result["growing_degree_days"], round((39 * 12 + 27) * SLOT_HOURS / 24, 1))
+        self.assertEqual(len(result["daily"]), 5)
+        self.assertEqual(result["daily"][0]["rain_mm"], 4.0)
+
+    def test_spray_windows_join_consecutive_slots(self):
+        result = analyze_forecast(_forecast(_clear_days(days=2)), now=START)
+        windows = result["best_spray_windows"]
+        self.assertEqual(len(windows), 2)
+        self.assertEqual((windows[0]["start"], windows[0]["end"], windows[0]["hours"]),
+                         ("2025-01-15 06:00", "2025-01-15 18:00", 12))
+
+    def test_slots_that_have_ended_are_dropped(self):
+        slots = _clear_days(days=2)
+        for index in range(3):
+            slots[index] = _slot(index, rain=20.0)
+        # 10:30 on the first day: the 09:00-12:00 slot is still running
+        now = START + 10 * 3600 + 1800
+        result = analyze_forecast(_forecast(slots), now=now)
+
+        self.assertEqual(result["slots"], 16 - 3)
+        self.assertEqual(result["rain_5_days_mm"], 0.0)
+        self.assertEqual(result["best_spray_windows"][0]["start"], "2025-01-15 09:00")
+        self.assertGreater(result["spray_score_now"], 0)
+
+    def test_forecast_entirely_in_the_past_gives_no_analytics(self):
+        self.assertIsNone(analyze_forecast(_forecast(_clear_days(days=1)), now=START + 2 * 86400))
+        self.assertIsNone(analyze_forecast(None))
+        self.assertIsNone(analyze_forecast({"list": []}))
+
+    def test_stacked_forecasts_match_single_forecasts(self):
+        wet = _clear_days()
+        wet[5] = _slot(5, rain=3.0)
+        single = [forecast_arrays(_forecast(slots)) for slots in (_clear_days(), wet)]
+        stacked = forecast_indices(stack_forecast_arrays(single))
+        for cell, arrays in enumerate(single):
+            indices = forecast_indices(arrays)
+            np.testing.assert_allclose(stacked["spray_score"][cell], indices["spray_score"])
+            self.assertEqual(stacked["rain_total_mm"][cell], indices["rain_total_mm"])
+
+
+if __name__ == "__main__":
+    unittest.main()
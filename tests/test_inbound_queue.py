@@ -0,0 +1,98 @@
+"""Tests for the durable inbound WhatsApp message queue (gateway.inbound_queue)"""
+
+import os
+import tempfile
+import time
+import unittest
+
+from gateway.inbound_queue import STATUS_DONE, STATUS_FAILED, STATUS_PROCESSING, InboundMessageQueue
+
+
+def _message(sid, phone="+911234567890", body="namaste"):
+    return {"MessageSid": sid, "From": f"whatsapp:{phone}", "Body": body}
+
+
+class InboundMessageQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "inbound.db")
+        self.queue = InboundMessageQueue(self.db_path, max_attempts=2)
+
+    def tearDown(self):
+        if self.queue._conn is not None:
+            self.queue._conn.close()
+        self.tmp.cleanup()
+
+    def test_duplicate_message_sid_is_ignored(self):
+        self.assertTrue(self.queue.enqueue(_message("SM1")))
+        self.assertFalse(self.queue.enqueue(_message("SM1")))
+        self.assertEqual(self.queue.pending_count(), 1)
+
+    def test_messages_of_one_farmer_are_claimed_in_order_one_at_a_time(self):
+        self.queue.enqueue(_message("SM1", body="first"))
+        self.queue.enqueue(_message("SM2", body="second"))
+        self.queue.enqueue(_message("SM3", phone="+919999999999", body="other farmer"))
+
+        first_id, first = self.queue.claim_next()
+        other_id, other = self.queue.claim_next()
+        self.assertEqual(first["Body"], "first")
+        self.assertEqual(other["Body"], "other farmer")
+        self.assertIsNone(self.queue.claim_next())  # "second" waits for "first"
+
+        self.queue.complete(first_id)
+        _, second = self.queue.claim_next()
+        self.assertEqual(second["Body"], "second")
+
+    def test_failed_message_is_retried_until_attempts_run_out(self):
+        self.queue.enqueue(_message("SM1"))
+        queue_id, _ = self.queue.claim_next()
+        self.assertTrue(self.queue.fail(queue_id, "timeout"))
+        queue_id, _ = self.queue.claim_next()
+        self.assertFalse(self.queue.fail(queue_id, "timeout"))
+        self.assertEqual(self.queue.find("SM1")[1], STATUS_FAILED)
+        self.assertIsNone(self.queue.claim_next())
+
+    def test_inline_failure_is_not_retried(self):
+        self.queue.enqueue(_message("SM1"), status=STATUS_PROCESSING)
+        queue_id, _, _ = self.queue.find("SM1")
+        self.assertFalse(self.queue.fail(queue_id, "agent error", retry=False))
+        self.assertEqual(self.queue.find("SM1")[1], STATUS_FAILED)
+
+    def test_inline_reply_is_stored_for_webhook_retries(self):
+        self.assertTrue(self.queue.enqueue(_message("SM1"), status=STATUS_PROCESSING))
+        queue_id, status, reply = self.queue.find("SM1")
+        self.assertEqual((status, reply), (STATUS_PROCESSING, None))
+
+        self.queue.complete(queue_id, reply={"text": "गेहूं का भाव ₹2200", "voice_url": None})
+        self.assertFalse(self.queue.enqueue(_message("SM1"), status=STATUS_PROCESSING))
+        self.assertEqual(self.queue.find("SM1"), (queue_id, STATUS_DONE, {"text": "गेहूं का भाव ₹2200", "voice_url": None}))
+        self.assertIsNone(self.queue.find("SM-unknown"))
+
+    def test_recover_returns_in_flight_messages_to_the_queue(self):
+        self.queue.enqueue(_message("SM1"))
+        self.queue.claim_next()
+        restarted = InboundMessageQueue(self.db_path)
+        try:
+            self.assertEqual(restarted.recover(), 1)
+            self.assertIsNotNone(restarted.claim_next())
+        finally:
+            restarted._conn.close()
+
+    def test_prune_removes_only_old_finished_messages(self):
+        for sid in ("SM-old", "SM-new", "SM-pending"):
+            self.queue.enqueue(_message(sid, phone=sid))
+        for sid in ("SM-old", "SM-new"):
+            self.queue.complete(self.queue.find(sid)[0])
+        conn = self.queue._connection()
+        conn.execute("UPDATE inbound_messages SET updated_at = ? WHERE message_sid = 'SM-old'", (time.time() - 48 * 3600,))
+        conn.commit()
+
+        self.assertEqual(self.queue.prune(retention_hours=24), 1)
+        self.assertIsNone(self.queue.find("SM-old"))
+        self.assertIsNotNone(self.queue.find("SM-new"))
+        self.assertIsNotNone(self.queue.find("SM-pending"))
+
+
+if __name__ == "__main__":
+    unittest.main()
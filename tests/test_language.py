@@ -0,0 +1,52 @@
+"""Tests for the gateway's reply language resolution (gateway.language)"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from gateway import language
+from gateway.language import FarmerLanguageResolver, detect_language_from_text
+from tools.profile_store import FarmerProfileStore
+
+
+def _profile(primary_language):
+    return {"farmer_details": {"personal_info": {"name": "Ramesh", "primary_language": primary_language}}}
+
+
+class FarmerLanguageResolverTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = FarmerProfileStore(os.path.join(self.tmp.name, "profiles.db"))
+        self.store.put("+919876543210", _profile("Punjabi"))
+        patcher = mock.patch.object(language, "get_profile_store", return_value=self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.resolver = FarmerLanguageResolver()
+
+    def tearDown(self):
+        if self.store._conn is not None:
+            self.store._conn.close()
+        self.tmp.cleanup()
+
+    def test_stored_profile_language_wins(self):
+        self.assertEqual(self.resolver.resolve("+919876543210", "What is the wheat price?"), "punjabi")
+
+    def test_unknown_farmer_is_answered_in_the_message_language(self):
+        self.assertEqual(self.resolver.resolve("+919000000000", "ਕਣਕ ਦਾ ਭਾਅ ਕੀ ਹੈ?"), "punjabi")
+        self.assertEqual(self.resolver.resolve("+919000000000", "gehun ka bhav kya hai"), "hindi")
+
+    def test_unknown_farmer_without_text_gets_the_configured_default(self):
+        with mock.patch.object(language, "DEFAULT_LANGUAGE", "marathi"):
+            self.assertEqual(self.resolver.resolve("+919000000000", ""), "marathi")
+            self.assertEqual(self.resolver.resolve(None, ""), "marathi")
+
+    def test_detects_script_and_hinglish(self):
+        self.assertEqual(detect_language_from_text("ગુજરાતી"), "gujarati")
+        self.assertEqual(detect_language_from_text("What is the weather today?"), "english")
+        self.assertIsNone(detect_language_from_text("👍 123"))
+
+
+if __name__ == "__main__":
+    unittest.main()
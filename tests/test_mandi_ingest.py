@@ -0,0 +1,112 @@
+"""Tests for AgMarkNet price report ingestion (tools.mandi_ingest)"""
+
+import os
+import tempfile
+import unittest
+
+from tools.mandi_ingest import ingest_drop_dir, ingest_file, normalize_commodity, read_price_report, rows_from_html
+from tools.mandi_price_store import MandiPriceStore
+
+CSV_REPORT = """State,District Name,Market Name,Commodity,Variety,Grade,Min_x0020_Price,Max_x0020_Price,Modal_x0020_Price,Arrival_Date
+Uttar Pradesh,Allahabad,Allahabad,Wheat,Dara,FAQ,2200,2400,2300,15/01/2025
+UTTAR PRADESH,LUCKNOW,LUCKNOW,Paddy(Dhan)(Common),Common,FAQ,2100,2250,2183,15/01/2025
+Uttar Pradesh,Lucknow,Lucknow,Wheat,Lokwan,FAQ,2500,2700,2600,15/01/2025
+"""
+
+HTML_REPORT = """<html><body><table id="cphBody_GridPriceData">
+<tr><th>Sl no.</th><th>District Name</th><th>Market Name</th><th>Commodity</th><th>Variety</th>
+<th>Min Price (Rs./Quintal)</th><th>Max Price (Rs./Quintal)</th><th>Modal Price (Rs./Quintal)</th><th>Price Date</th></tr>
+<tr><td>1</td><td>Lucknow</td><td>Lucknow</td><td>Potato</td><td>Desi</td><td>1,000</td><td>1,200</td><td>1,100</td><td>15 Jan 2025</td></tr>
+<tr><th>Sl no.</th><th>District Name</th><th>Market Name</th><th>Commodity</th><th>Variety</th>
+<th>Min Price (Rs./Quintal)</th><th>Max Price (Rs./Quintal)</th><th>Modal Price (Rs./Quintal)</th><th>Price Date</th></tr>
+<tr><td>2</td><td>Lucknow</td><td>Banthara</td><td>Onion</td><td>Red</td><td>1500</td><td>1800</td><td>1650</td><td>15 Jan 2025</td></tr>
+</table></body></html>
+"""
+
+
+class ReadPriceReportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, content, mode="w"):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, mode) as report:
+            report.write(content)
+        return path
+
+    def test_csv_headers_names_and_varieties(self):
+        rows = list(read_price_report(self._write("report.csv", CSV_REPORT)))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["district"], "Prayagraj")  # old district name
+        self.assertEqual((rows[0]["variety"], rows[0]["modal_price"], rows[0]["date"]), ("Dara", "2300", "15/01/2025"))
+        self.assertEqual((rows[1]["state"], rows[1]["district"], rows[1]["market"]), ("Uttar Pradesh", "Lucknow", "Lucknow"))
+        self.assertEqual(rows[1]["commodity"], "Paddy")
+
+    def test_html_export_with_repeated_headers(self):
+        rows = list(read_price_report(self._write("report.xls", HTML_REPORT), default_state="Uttar Pradesh"))
+        self.assertEqual([(row["market"], row["commodity"], row["variety"]) for row in rows],
+                         [("Lucknow", "Potato", "Desi"), ("Banthara", "Onion", "Red")])
+        self.assertEqual((rows[0]["state"], rows[0]["min_price"], rows[0]["date"]), ("Uttar Pradesh", "1,000", "15 Jan 2025"))
+        self.assertEqual(list(rows_from_html(HTML_REPORT, default_state="Uttar Pradesh")), rows)
+
+    def test_file_without_a_price_header_raises(self):
+        with self.assertRaises(ValueError):
+            list(read_price_report(self._write("report.csv", "Name,Value\nfoo,1\n")))
+
+    def test_binary_xls_and_unknown_types_are_rejected(self):
+        with self.assertRaises(ValueError):
+            read_price_report(self._write("report.xls", b"\xd0\xcf\x11\xe0binary", mode="wb"))
+        with self.assertRaises(ValueError):
+            read_price_report(self._write("report.pdf", "%PDF"))
+
+    def test_commodity_aliases(self):
+        self.assertEqual(normalize_commodity("Bengal Gram(Gram)(Whole)"), "Gram")
+        self.assertEqual(normalize_commodity("  rapeseed &  mustard "), "Mustard")
+        self.assertEqual(normalize_commodity("BHINDI(LADIES FINGER)"), "Bhindi(Ladies Finger)")
+
+
+class IngestTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = MandiPriceStore(os.path.join(self.tmp.name, "mandi.db"))
+        self.drop_dir = os.path.join(self.tmp.name, "drop")
+        os.makedirs(self.drop_dir)
+
+    def tearDown(self):
+        if self.store._conn is not None:
+            self.store._conn.close()
+        self.tmp.cleanup()
+
+    def _drop(self, name, content):
+        path = os.path.join(self.drop_dir, name)
+        with open(path, "w", encoding="utf-8") as report:
+            report.write(content)
+        return path
+
+    def test_ingest_file_in_small_chunks(self):
+        path = self._drop("report.csv", CSV_REPORT)
+        self.assertEqual(ingest_file(path, self.store, chunk_rows=1), 3)
+        self.assertEqual(self.store.prices_on("Prayagraj", "Uttar Pradesh", "2025-01-15")[0]["market"], "Allahabad")
+        self.assertEqual(len(self.store.prices_on("Lucknow", "Uttar Pradesh", "2025-01-15")), 2)
+
+    def test_drop_dir_moves_loaded_and_failed_files(self):
+        self._drop("good.csv", CSV_REPORT)
+        self._drop("no_header.csv", "Name,Value\nfoo,1\n")
+        self._drop("notes.txt", "ignored")
+
+        result = ingest_drop_dir(self.drop_dir, self.store)
+        self.assertEqual([item["file"] for item in result["files_loaded"]], ["good.csv"])
+        self.assertEqual([item["file"] for item in result["files_failed"]], ["no_header.csv"])
+        self.assertEqual(result["rows"], 3)
+        self.assertEqual(os.listdir(os.path.join(self.drop_dir, "processed")), ["good.csv"])
+        self.assertEqual(os.listdir(os.path.join(self.drop_dir, "failed")), ["no_header.csv"])
+        self.assertTrue(os.path.exists(os.path.join(self.drop_dir, "notes.txt")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""Tests for the local mandi price history (tools.mandi_price_store)"""
+
+import os
+import tempfile
+import unittest
+from datetime import date
+
+from tools.mandi_price_store import MandiPriceStore, parse_price_date
+
+
+def _row(day="2025-01-15", market="Lucknow", commodity="Wheat", variety="", low=2000, high=2300, modal=2200, **extra):
+    row = {"date": day, "state": "Uttar Pradesh", "district": "Lucknow", "market": market, "commodity": commodity,
+           "variety": variety, "min_price": low, "max_price": high, "modal_price": modal}
+    row.update(extra)
+    return row
+
+
+class ParsePriceDateTest(unittest.TestCase):
+
+    def test_formats_used_by_tools_and_exports(self):
+        for text in ("2025-01-15", "15-Jan-2025", "15/01/2025", "15-01-2025", "15 Jan 2025", "15-January-2025"):
+            with self.subTest(text=text):
+                self.assertEqual(parse_price_date(text), date(2025, 1, 15))
+
+    def test_unrecognized_date_raises(self):
+        with self.assertRaises(ValueError):
+            parse_price_date("Jan 15th")
+
+
+class MandiPriceStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = MandiPriceStore(os.path.join(self.tmp.name, "mandi.db"))
+
+    def tearDown(self):
+        if self.store._conn is not None:
+            self.store._conn.close()
+        self.tmp.cleanup()
+
+    def test_varieties_are_combined_per_market_and_day(self):
+        self.store.append_prices([
+            _row(variety="Dara", low=2000, high=2300, modal=2200),
+            _row(variety="Lokwan", low=2400, high=2900, modal=2600),
+            _row(market="Mohanlalganj", variety="Dara", low=2100, high=2250, modal=2150),
+        ])
+        prices = self.store.prices_on("Lucknow", "Uttar Pradesh", "15-Jan-2025")
+        self.assertEqual(prices, [
+            {"commodity": "Wheat", "market": "Lucknow", "min_price": 2000.0, "max_price": 2900.0, "modal_price": 2400.0},
+            {"commodity": "Wheat", "market": "Mohanlalganj", "min_price": 2100.0, "max_price": 2250.0, "modal_price": 2150.0},
+        ])
+        history = self.store.price_history("wheat", "LUCKNOW", "uttar pradesh", days=3, end_date="2025-01-16")
+        self.assertEqual([(row["market"], row["max_price"]) for row in history], [("Lucknow", 2900.0), ("Mohanlalganj", 2250.0)])
+
+    def test_repeated_rows_replace_and_count_once(self):
+        stored = self.store.append_prices([
+            _row(variety="Dara", modal=2200),
+            _row(variety="dara", modal=2250),
+            _row(variety="Lokwan", modal=2600),
+        ])
+        self.assertEqual(stored, 2)
+        self.assertEqual(self.store.append_prices([_row(variety="Dara", modal=2300)]), 1)
+        self.assertEqual(self.store.stats()["rows"], 2)
+        self.assertEqual(self.store.prices_on("Lucknow", "Uttar Pradesh", "2025-01-15")[0]["modal_price"], 2450.0)
+
+    def test_incomplete_rows_are_skipped(self):
+        stored = self.store.append_prices([
+            _row(day="not a date"),
+            _row(market=""),
+            _row(low="-", high="NR", modal=None),
+            _row(low="1,950", high=None, modal=" 2,100 "),
+        ])
+        self.assertEqual(stored, 1)
+        self.assertEqual(self.store.prices_on("Lucknow", "Uttar Pradesh", "2025-01-15")[0]["min_price"], 1950.0)
+
+    def test_history_window_and_latest_date(self):
+        self.store.append_prices([_row(day=f"2025-01-{day:02d}", modal=2000 + day) for day in (1, 10, 14, 15)])
+        history = self.store.price_history("Wheat", "Lucknow", "Uttar Pradesh", days=5, end_date="2025-01-14")
+        self.assertEqual([row["date"] for row in history], ["2025-01-10", "2025-01-14"])
+        self.assertEqual(self.store.latest_date("Lucknow", "Uttar Pradesh"), "2025-01-15")
+        self.assertEqual(self.store.latest_date("Lucknow", "Uttar Pradesh", "2025-01-12"), "2025-01-10")
+        self.assertIsNone(self.store.latest_date("Kanpur Nagar", "Uttar Pradesh"))
+
+    def test_large_appends_span_several_batches(self):
+        rows = (_row(day="2025-01-15", market=f"Market {index}") for index in range(12000))
+        self.assertEqual(self.store.append_prices(rows, source="test"), 12000)
+        self.assertEqual(self.store.stats(), {"rows": 12000, "first_date": "2025-01-15", "last_date": "2025-01-15"})
+
+
+if __name__ == "__main__":
+    unittest.main()
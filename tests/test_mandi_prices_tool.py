@@ -0,0 +1,65 @@
+"""Tests for the mandi price tools reading the local price history (tools.mandi_prices_tool)"""
+
+import os
+import tempfile
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+
+from tools import mandi_prices_tool
+from tools.mandi_price_store import MandiPriceStore
+from tools.mandi_snapshot_cache import MandiSnapshotCache
+
+PROFILE = {"farmer_details": {"location_details": {"district": "Allahabad", "state": "Uttar Pradesh"}}}
+
+
+def _row(day, modal):
+    return {"date": day, "state": "Uttar Pradesh", "district": "Prayagraj", "market": "Naini", "commodity": "Wheat",
+            "variety": "Dara", "min_price": modal - 100, "max_price": modal + 100, "modal_price": modal}
+
+
+class RenamedDistrictTest(unittest.TestCase):
+    """Profiles may still carry a district's old name; prices are recorded under the current one"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = MandiPriceStore(os.path.join(self.tmp.name, "mandi.db"))
+        self.store.append_prices([_row("2025-01-14", 2200), _row("2025-01-15", 2300)])
+        self.cache = MandiSnapshotCache(ttl_seconds=900, max_entries=8)
+        for patcher in (
+            mock.patch.object(mandi_prices_tool, "mandi_price_store", self.store),
+            mock.patch.object(mandi_prices_tool, "mandi_snapshot_cache", self.cache),
+            mock.patch.object(mandi_prices_tool.mandi_scraper, "request"),
+            mock.patch.object(mandi_prices_tool, "load_profile_data", return_value=PROFILE),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        if self.store._conn is not None:
+            self.store._conn.close()
+        self.tmp.cleanup()
+
+    def test_local_store_is_read_under_the_current_name(self):
+        prices = mandi_prices_tool._try_local_store("15-Jan-2025", "Allahabad", "Uttar Pradesh")
+        self.assertEqual(prices["status"], "success")
+        self.assertEqual(prices["price_data"]["Wheat"]["markets"][0]["market_name"], "Naini")
+
+    def test_old_and_current_names_share_one_snapshot(self):
+        old = mandi_prices_tool._get_price_snapshot("15-Jan-2025", "Allahabad", "Uttar Pradesh")
+        current = mandi_prices_tool._get_price_snapshot("15-Jan-2025", "Prayagraj", "Uttar Pradesh")
+        self.assertEqual(old["price_date"], "15-Jan-2025")
+        self.assertEqual(old, current)
+        stats = self.cache.stats()
+        self.assertEqual((stats["entries"], stats["hits"]), (1, 1))
+
+    def test_price_history_uses_the_current_name(self):
+        yesterday = date.today() - timedelta(days=1)
+        self.store.append_prices([_row((yesterday - timedelta(days=1)).isoformat(), 2200), _row(yesterday.isoformat(), 2310)])
+        result = mandi_prices_tool.get_commodity_price_history("Wheat", 30)
+        self.assertEqual(result["status"], "success")
+        self.assertEqual((result["first_price"], result["latest_price"]), (2200, 2310))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+"""Tests for the per-district daily mandi price snapshot cache (tools.mandi_snapshot_cache)"""
+
+import time
+import unittest
+from datetime import date, timedelta
+
+from tests.helpers import CountingStub, run_concurrently
+from tools.mandi_snapshot_cache import MandiSnapshotCache
+
+DAY = date(2025, 1, 15)
+
+
+def _builder(price_date="15-Jan-2025", status="success", error=None):
+    """Counting snapshot builder; each build is numbered in its price data"""
+    return CountingStub(
+        lambda build: {"status": status, "price_date": price_date, "price_data": {"Wheat": {"build": build}}},
+        error=error,
+    )
+
+
+class MandiSnapshotCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = MandiSnapshotCache(ttl_seconds=900, max_entries=3)
+
+    def test_snapshot_is_shared_by_district_and_day(self):
+        build = _builder()
+        first = self.cache.get("Uttar Pradesh", "Lucknow", DAY, build)
+        second = self.cache.get(" uttar pradesh ", "LUCKNOW", DAY, build)
+        self.assertEqual(build.calls, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_callers_get_copies(self):
+        build = _builder()
+        self.cache.get("Uttar Pradesh", "Lucknow", DAY, build)["note"] = "for one farmer"
+        self.assertNotIn("note", self.cache.get("Uttar Pradesh", "Lucknow", DAY, build))
+
+    def test_concurrent_requests_wait_for_one_build(self):
+        build = _builder()
+        results = run_concurrently(8, lambda: self.cache.get("Bihar", "Patna", DAY, build))
+        self.assertEqual(build.calls, 1)
+        self.assertEqual(len(results), 8)
+        # Callers arriving after the build finished are hits; the others waited for it
+        stats = self.cache.stats()
+        self.assertEqual((stats["misses"], stats["coalesced"] + stats["hits"]), (1, 7))
+
+    def test_build_errors_reach_every_waiter_and_are_not_cached(self):
+        build = _builder(error=RuntimeError("store unavailable"))
+        with self.assertRaises(RuntimeError):
+            self.cache.get("Bihar", "Patna", DAY, build)
+        build.error = None
+        self.assertEqual(self.cache.get("Bihar", "Patna", DAY, build)["status"], "success")
+        self.assertEqual(build.calls, 2)
+
+    def test_unsuccessful_snapshots_are_not_cached(self):
+        build = _builder(status="error")
+        self.cache.get("Bihar", "Patna", DAY, build)
+        self.cache.get("Bihar", "Patna", DAY, build)
+        self.assertEqual(build.calls, 2)
+
+    def test_recorded_past_day_never_expires(self):
+        self.cache.ttl_seconds = 0
+        build = _builder(price_date="15-Jan-2025")
+        self.cache.get("Bihar", "Patna", DAY, build)
+        time.sleep(0.01)
+        self.cache.get("Bihar", "Patna", DAY, build)
+        self.assertEqual(build.calls, 1)
+
+    def test_today_and_stand_in_days_expire_after_ttl(self):
+        self.cache.ttl_seconds = 0
+        today = _builder(price_date=date.today().strftime("%d-%b-%Y"))
+        self.cache.get("Bihar", "Patna", date.today(), today)
+        time.sleep(0.01)
+        self.cache.get("Bihar", "Patna", date.today(), today)
+        self.assertEqual(today.calls, 2)
+
+        stand_in = _builder(price_date=(DAY - timedelta(days=1)).strftime("%d-%b-%Y"))
+        self.cache.get("Bihar", "Gaya", DAY, stand_in)
+        time.sleep(0.01)
+        self.cache.get("Bihar", "Gaya", DAY, stand_in)
+        self.assertEqual(stand_in.calls, 2)
+
+    def test_least_recently_used_snapshot_is_evicted(self):
+        builds = {district: _builder() for district in ("Patna", "Gaya", "Nalanda", "Muzaffarpur")}
+        for district in ("Patna", "Gaya", "Nalanda"):
+            self.cache.get("Bihar", district, DAY, builds[district])
+        self.cache.get("Bihar", "Patna", DAY, builds["Patna"])  # Gaya is now least recently used
+        self.cache.get("Bihar", "Muzaffarpur", DAY, builds["Muzaffarpur"])
+
+        self.assertEqual(self.cache.stats()["entries"], 3)
+        self.cache.get("Bihar", "Patna", DAY, builds["Patna"])
+        self.cache.get("Bihar", "Gaya", DAY, builds["Gaya"])
+        self.assertEqual(builds["Patna"].calls, 1)
+        self.assertEqual(builds["Gaya"].calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+"""Tests for the public media URLs of generated voice replies (gateway.media_store)"""
+
+import unittest
+from unittest import mock
+
+from gateway import media_store
+from gateway.media_store import media_url
+
+MEDIA_ID = "0123456789abcdef0123456789abcdef01234567.mp3"
+
+
+class MediaUrlTest(unittest.TestCase):
+
+    def test_public_base_url_wins(self):
+        with mock.patch.object(media_store, "PUBLIC_BASE_URL", "https://kisan.example.org/"):
+            self.assertEqual(
+                media_url(MEDIA_ID, "http://localhost:8000/"),
+                f"https://kisan.example.org/media/{MEDIA_ID}"
+            )
+
+    def test_public_https_request_url_is_used_without_configuration(self):
+        with mock.patch.object(media_store, "PUBLIC_BASE_URL", None):
+            self.assertEqual(
+                media_url(MEDIA_ID, "https://abcd.ngrok-free.app/"),
+                f"https://abcd.ngrok-free.app/media/{MEDIA_ID}"
+            )
+
+    def test_local_or_plain_http_request_url_is_refused(self):
+        with mock.patch.object(media_store, "PUBLIC_BASE_URL", None):
+            for base_url in (
+                "http://localhost:8000/", "https://localhost/", "https://127.0.0.1:8000/", "https://192.168.1.20/",
+                "https://gateway/", "http://abcd.ngrok-free.app/", None,
+            ):
+                with self.subTest(base_url=base_url), self.assertLogs(media_store.logger, "WARNING"):
+                    self.assertIsNone(media_url(MEDIA_ID, base_url))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+"""Tests for the multi-tenant farmer profile store (tools.profile_store)"""
+
+import json
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from tools import profile_store
+from tools.profile_store import (
+    FarmerProfileStore,
+    ProfileNotFoundError,
+    load_profile_data,
+    normalize_farmer_id,
+    thaw_profile,
+)
+
+
+def _profile(name, district, mobile=None):
+    personal_info = {"name": name}
+    if mobile:
+        personal_info["mobile_number"] = mobile
+    return {"farmer_details": {"personal_info": personal_info, "location_details": {"district": district, "state": "Uttar Pradesh"}}}
+
+
+class FarmerProfileStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = FarmerProfileStore(os.path.join(self.tmp.name, "profiles.db"))
+        patcher = mock.patch.object(profile_store, "_profile_store", self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        if self.store._conn is not None:
+            self.store._conn.close()
+        self.tmp.cleanup()
+
+    def test_phone_number_formats_share_one_key(self):
+        for farmer_id in ("whatsapp:+91 98765-43210", "+91-9876543210", "+919876543210"):
+            self.assertEqual(normalize_farmer_id(farmer_id), "+919876543210")
+
+    def test_each_farmer_gets_only_their_own_profile(self):
+        self.store.put("whatsapp:+919876543210", _profile("Ramesh", "Lucknow"))
+        self.store.put("+919812345678", _profile("Sita", "Varanasi"))
+
+        ramesh = load_profile_data(SimpleNamespace(user_id="whatsapp:+919876543210"))
+        sita = load_profile_data(SimpleNamespace(user_id="+91 98123 45678"))
+        self.assertEqual(ramesh["farmer_details"]["personal_info"]["name"], "Ramesh")
+        self.assertEqual(sita["farmer_details"]["location_details"]["district"], "Varanasi")
+
+    def test_unknown_farmer_never_gets_another_profile(self):
+        self.store.put("+919876543210", _profile("Ramesh", "Lucknow"))
+        with self.assertRaises(ProfileNotFoundError) as raised:
+            load_profile_data(SimpleNamespace(user_id="whatsapp:+919000000000"))
+        self.assertEqual(raised.exception.farmer_id, "whatsapp:+919000000000")
+
+    def test_local_adk_users_get_the_default_profile(self):
+        profile_path = os.path.join(self.tmp.name, "farmer_profile.json")
+        with open(profile_path, "w", encoding="utf-8") as profile_file:
+            json.dump(_profile("Default", "Lucknow"), profile_file)
+        for user_id in ("user", "default_user"):
+            profile = load_profile_data(SimpleNamespace(user_id=user_id), profile_path)
+            self.assertEqual(profile["farmer_details"]["personal_info"]["name"], "Default")
+
+    def test_default_profile_is_seeded_into_an_empty_store(self):
+        profile_path = os.path.join(self.tmp.name, "farmer_profile.json")
+        with open(profile_path, "w", encoding="utf-8") as profile_file:
+            json.dump(_profile("Default", "Lucknow", mobile="+91-9876543210"), profile_file)
+        profile_store._seed_default_profile(self.store, profile_path)
+        self.assertEqual(self.store.get("whatsapp:+919876543210")["farmer_details"]["personal_info"]["name"], "Default")
+
+        self.store.put("+919876543210", _profile("Ramesh", "Lucknow"))
+        profile_store._seed_default_profile(self.store, profile_path)
+        self.assertEqual(self.store.get("+919876543210")["farmer_details"]["personal_info"]["name"], "Ramesh")
+
+    def test_writes_from_another_process_are_seen(self):
+        self.store.put("+919876543210", _profile("Ramesh", "Lucknow"))
+        self.assertIsNone(self.store.get("+919812345678"))
+
+        other = FarmerProfileStore(self.store.db_path)
+        self.addCleanup(lambda: other._conn.close())
+        other.put("+919876543210", _profile("Ramesh", "Barabanki"))
+        other.put("+919812345678", _profile("Sita", "Varanasi"))
+
+        self.assertEqual(self.store.get("+919876543210")["farmer_details"]["location_details"]["district"], "Barabanki")
+        self.assertEqual(self.store.get("+919812345678")["farmer_details"]["personal_info"]["name"], "Sita")
+
+    def test_profiles_are_read_only_views(self):
+        self.store.put("+919876543210", _profile("Ramesh", "Lucknow"))
+        profile = self.store.get("+919876543210")
+        with self.assertRaises(TypeError):
+            profile["farmer_details"]["personal_info"]["name"] = "Someone else"
+        copy = thaw_profile(profile)
+        copy["farmer_details"]["personal_info"]["name"] = "Changed"
+        self.assertEqual(self.store.get("+919876543210")["farmer_details"]["personal_info"]["name"], "Ramesh")
+
+    def test_delete_removes_the_profile(self):
+        self.store.put("+919876543210", _profile("Ramesh", "Lucknow"))
+        self.assertTrue(self.store.delete("+919876543210"))
+        self.assertIsNone(self.store.get("+919876543210"))
+        self.assertFalse(self.store.delete("+919876543210"))
+
+    def test_import_directory_keys_profiles_by_mobile_number(self):
+        profiles_dir = os.path.join(self.tmp.name, "profiles")
+        os.makedirs(profiles_dir)
+        with open(os.path.join(profiles_dir, "ramesh.json"), "w", encoding="utf-8") as profile_file:
+            json.dump(_profile("Ramesh", "Lucknow", mobile="+91 98765 43210"), profile_file)
+        with open(os.path.join(profiles_dir, "919812345678.json"), "w", encoding="utf-8") as profile_file:
+            json.dump(_profile("Sita", "Varanasi"), profile_file)
+        with open(os.path.join(profiles_dir, "broken.json"), "w", encoding="utf-8") as profile_file:
+            json.dump({"name": "no farmer_details"}, profile_file)
+
+        result = self.store.import_directory(profiles_dir)
+        self.assertEqual((result["status"], result["imported"]), ("partial", 2))
+        self.assertEqual(result["errors"][0]["file"], "broken.json")
+        self.assertEqual(self.store.get("+919876543210")["farmer_details"]["personal_info"]["name"], "Ramesh")
+        self.assertEqual(self.store.get("919812345678")["farmer_details"]["personal_info"]["name"], "Sita")
+        self.assertEqual(self.store.count(), 2)
+
+    def test_iter_locations_reads_every_stored_location(self):
+        for index in range(5):
+            self.store.put(f"+9198765432{index:02d}", _profile(f"Farmer {index}", f"District {index}"))
+        locations = list(self.store.iter_locations(batch_size=2))
+        self.assertEqual(len(locations), 5)
+        self.assertEqual(locations[0][1]["district"], "District 0")
+
+
+if __name__ == "__main__":
+    unittest.main()
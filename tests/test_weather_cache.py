@@ -0,0 +1,110 @@
+"""Tests for the grid-cell weather cache (tools.weather_cache)"""
+
+import os
+import tempfile
+import time
+import unittest
+
+from tests.helpers import CountingStub, run_concurrently
+from tools.weather_cache import WEATHER_KIND_CURRENT, WEATHER_KIND_FORECAST, WeatherCellCache
+
+CELL = (266, 809)
+READING = {"main": {"temp": 30}}
+
+
+class WeatherCellCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "weather.db")
+        self.cache = self._cache()
+
+    def tearDown(self):
+        for cache in getattr(self, "_caches", []):
+            cache._refresh_executor.shutdown(wait=True)
+            if cache._conn is not None:
+                cache._conn.close()
+        self.tmp.cleanup()
+
+    def _cache(self, **overrides):
+        options = {
+            "ttl_seconds": {WEATHER_KIND_CURRENT: 600, WEATHER_KIND_FORECAST: 3600},
+            "max_stale_seconds": 3 * 3600,
+            "max_fallback_seconds": 24 * 3600,
+            "db_path": self.db_path,
+        }
+        options.update(overrides)
+        cache = WeatherCellCache(**options)
+        self._caches = getattr(self, "_caches", []) + [cache]
+        return cache
+
+    def _age_entry(self, kind, seconds):
+        """Backdate the cached entry in memory and in SQLite."""
+        data, fetched_at = self.cache._entries[(kind, CELL)]
+        self.cache._entries[(kind, CELL)] = (data, fetched_at - seconds)
+        conn = self.cache._connection()
+        conn.execute("UPDATE weather_cells SET fetched_at = fetched_at - ?", (seconds,))
+        conn.commit()
+
+    def test_cell_centre_is_shared_by_nearby_farmers(self):
+        self.assertEqual(self.cache.cell_for(26.62, 80.91), self.cache.cell_for(26.64, 80.93))
+        self.assertEqual(self.cache.cell_center(self.cache.cell_for(26.62, 80.91)), (26.6, 80.9))
+
+    def test_fresh_entry_is_served_without_upstream_call(self):
+        fetch = CountingStub(READING)
+        self.cache.get(WEATHER_KIND_CURRENT, CELL, fetch)
+        data, fetched_at = self.cache.get_entry(WEATHER_KIND_CURRENT, CELL, fetch)
+        self.assertEqual(fetch.calls, 1)
+        self.assertEqual(data, READING)
+        self.assertLess(time.time() - fetched_at, 5)
+
+    def test_concurrent_misses_share_one_upstream_call(self):
+        fetch = CountingStub(READING)
+        results = run_concurrently(8, lambda: self.cache.get(WEATHER_KIND_FORECAST, CELL, fetch))
+        self.assertEqual(fetch.calls, 1)
+        self.assertEqual(results, [READING] * 8)
+
+    def test_stale_entry_is_served_while_refreshing_in_background(self):
+        self.cache.get(WEATHER_KIND_CURRENT, CELL, CountingStub({"v": 1}))
+        self._age_entry(WEATHER_KIND_CURRENT, 1200)
+
+        refresh = CountingStub({"v": 2})
+        self.assertEqual(self.cache.get(WEATHER_KIND_CURRENT, CELL, refresh), {"v": 1})
+        deadline = time.time() + 5
+        while self.cache._entries[(WEATHER_KIND_CURRENT, CELL)][0] != {"v": 2} and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(refresh.calls, 1)
+        self.assertEqual(self.cache.get(WEATHER_KIND_CURRENT, CELL, refresh), {"v": 2})
+
+    def test_upstream_failure_serves_old_entry_with_its_age(self):
+        self.cache.get(WEATHER_KIND_CURRENT, CELL, CountingStub({"v": 1}))
+        self._age_entry(WEATHER_KIND_CURRENT, 5 * 3600)
+
+        data, fetched_at = self.cache.get_entry(WEATHER_KIND_CURRENT, CELL, CountingStub(error=ConnectionError("down")))
+        self.assertEqual(data, {"v": 1})
+        self.assertGreaterEqual(time.time() - fetched_at, 5 * 3600)
+
+    def test_upstream_failure_does_not_serve_entry_past_fallback_age(self):
+        self.cache.get(WEATHER_KIND_CURRENT, CELL, CountingStub({"v": 1}))
+        self._age_entry(WEATHER_KIND_CURRENT, 25 * 3600)
+
+        with self.assertRaises(ConnectionError):
+            self.cache.get(WEATHER_KIND_CURRENT, CELL, CountingStub(error=ConnectionError("down")))
+
+    def test_entries_are_shared_through_sqlite(self):
+        self.cache.refresh(WEATHER_KIND_FORECAST, CELL, CountingStub({"list": []}))
+        other_process = self._cache()
+        fetch = CountingStub(READING)
+        self.assertEqual(other_process.get(WEATHER_KIND_FORECAST, CELL, fetch), {"list": []})
+        self.assertEqual(fetch.calls, 0)
+
+    def test_is_fresh_accounts_for_remaining_time(self):
+        self.assertFalse(self.cache.is_fresh(WEATHER_KIND_FORECAST, CELL))
+        self.cache.refresh(WEATHER_KIND_FORECAST, CELL, CountingStub(READING))
+        self._age_entry(WEATHER_KIND_FORECAST, 3000)
+        self.assertTrue(self.cache.is_fresh(WEATHER_KIND_FORECAST, CELL))
+        self.assertFalse(self.cache.is_fresh(WEATHER_KIND_FORECAST, CELL, min_remaining_seconds=1800))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -18,7 +18,8 @@ from .farmer_context_tools import (
 from .mandi_prices_tool import (
     get_farmer_mandi_prices,
     get_mandi_prices_for_date,
-    get_commodity_price_info
+    get_commodity_price_info,
+    get_commodity_price_history
 )
 # Voice Processing Tools (NEW)
 from .voice_processing_tool import (
@@ -55,6 +56,7 @@ __all__ = [
     'get_farmer_mandi_prices',      # Today's mandi prices for farmer location
     'get_mandi_prices_for_date',    # Specific date mandi prices
     'get_commodity_price_info',     # Specific commodity price information
+    'get_commodity_price_history',  # Recorded price trend of a commodity
     
     # Voice Processing Tools (NEW)
     'process_voice_input',              # Process voice input for ADK
@@ -7,12 +7,16 @@ All functions have NO parameters to be ADK LLM compatible.
 """
 
 import json
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+
+from google.adk.tools import ToolContext
+
+from .profile_store import ProfileNotFoundError, load_profile_data
 
 # Conversion factor from acres to hectares
 ACRE_TO_HECTARE = 0.404686
 
-def get_relevant_schemes_for_farmer() -> Dict[str, Any]:
+def get_relevant_schemes_for_farmer(tool_context: Optional[ToolContext] = None) -> Dict[str, Any]:
     """Analyzes a farmer's profile to find relevant, unenrolled agricultural schemes.
     ADK Compatible - No parameters required.
 
@@ -24,13 +28,11 @@ def get_relevant_schemes_for_farmer() -> Dict[str, Any]:
         Dict[str, Any]: A dictionary containing the farmer's name and a list of
                         recommended schemes, including benefits and application process.
     """
-    profile_path = "context/farmer_profile.json"
     schemes_path = "context/agriculture_schemes.json"
     
     try:
-        # Load farmer profile and available schemes
-        with open(profile_path, 'r', encoding='utf-8') as f:
-            farmer_data = json.load(f)
+        # Load the current farmer's profile and available schemes
+        farmer_data = load_profile_data(tool_context)
         
         with open(schemes_path, 'r', encoding='utf-8') as f:
             all_schemes = json.load(f)
@@ -39,6 +41,11 @@ def get_relevant_schemes_for_farmer() -> Dict[str, Any]:
         if not farmer_profile:
             raise KeyError("'farmer_details' not found in profile JSON.")
 
+    except ProfileNotFoundError:
+        return {
+            "status": "error",
+            "error_message": "No farmer profile is registered for this number. Use list_all_available_schemes() instead."
+        }
     except FileNotFoundError as e:
         return {
             "status": "error",
@@ -0,0 +1,232 @@
+"""
+Audio Format Helpers for Kisan Mitra Speech
+
+Byte-level audio handling for both directions of a voice conversation:
+
+- Speech-to-text: identifies the container/codec and sample rate of a voice
+  note from its header bytes (and the Content-Type as a hint), so speech
+  recognition can be configured correctly on the first call instead of
+  guessing encodings. Supported: OGG/Opus (WhatsApp voice notes), WebM/Opus
+  (browsers), MP3, WAV (PCM / mu-law), AMR, AMR-WB and FLAC.
+- Text-to-speech: concat_mp3() joins the MP3 clips of a reply synthesized
+  in chunks into one stream, using the same MP3 frame header parsing.
+"""
+
+import struct
+from typing import Any, Dict, List, Optional
+
+# Sample rates Google Speech-to-Text accepts for Opus streams
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+# Content-Type (without parameters) → format name
+CONTENT_TYPE_FORMATS = {
+    "audio/ogg": "OGG_OPUS",
+    "audio/opus": "OGG_OPUS",
+    "application/ogg": "OGG_OPUS",
+    "audio/webm": "WEBM_OPUS",
+    "video/webm": "WEBM_OPUS",
+    "audio/mpeg": "MP3",
+    "audio/mp3": "MP3",
+    "audio/mpeg3": "MP3",
+    "audio/wav": "LINEAR16",
+    "audio/x-wav": "LINEAR16",
+    "audio/wave": "LINEAR16",
+    "audio/vnd.wave": "LINEAR16",
+    "audio/amr": "AMR",
+    "audio/amr-wb": "AMR_WB",
+    "audio/flac": "FLAC",
+    "audio/x-flac": "FLAC",
+}
+
+_MP3_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),   # MPEG-1
+    2: (22050, 24000, 16000),   # MPEG-2
+    0: (11025, 12000, 8000),    # MPEG-2.5
+}
+
+_WAV_ENCODINGS = {1: "LINEAR16", 7: "MULAW"}
+
+
+def _audio_format(encoding: str, sample_rate_hertz: Optional[int], channels: Optional[int] = None) -> Dict[str, Any]:
+    return {"encoding": encoding, "sample_rate_hertz": sample_rate_hertz, "channels": channels}
+
+
+def _opus_rate(rate: Optional[int]) -> int:
+    """Opus decodes at 48 kHz unless the original rate is one STT accepts."""
+    return rate if rate in OPUS_SAMPLE_RATES else 48000
+
+
+def _sniff_ogg(data: bytes) -> Optional[Dict[str, Any]]:
+    head = data.find(b"OpusHead", 0, 512)
+    if head < 0 or len(data) < head + 16:
+        # Vorbis/Speex in Ogg are not supported by speech recognition
+        return None
+    channels = data[head + 9]
+    input_rate = struct.unpack_from("<I", data, head + 12)[0]
+    return _audio_format("OGG_OPUS", _opus_rate(input_rate), channels)
+
+
+def _sniff_webm(data: bytes) -> Dict[str, Any]:
+    window = data[:4096]
+    rate = None
+    # SamplingFrequency element (0xB5) as an 8- or 4-byte float
+    pos = window.find(b"\xb5\x88")
+    if 0 <= pos <= len(window) - 10:
+        rate = int(struct.unpack_from(">d", window, pos + 2)[0])
+    else:
+        pos = window.find(b"\xb5\x84")
+        if 0 <= pos <= len(window) - 6:
+            rate = int(struct.unpack_from(">f", window, pos + 2)[0])
+    channels = None
+    pos = window.find(b"\x9f\x81")  # Channels element, 1-byte value
+    if 0 <= pos <= len(window) - 3:
+        channels = window[pos + 2]
+    return _audio_format("WEBM_OPUS", _opus_rate(rate), channels)
+
+
+def _sniff_mp3_frame(data: bytes, offset: int) -> Optional[Dict[str, Any]]:
+    """Parse the first MPEG audio frame header at or after ``offset``."""
+    end = min(len(data) - 4, offset + 4096)
+    for pos in range(offset, end):
+        if data[pos] != 0xFF or (data[pos + 1] & 0xE0) != 0xE0:
+            continue
+        version = (data[pos + 1] >> 3) & 0x03
+        layer = (data[pos + 1] >> 1) & 0x03
+        rate_index = (data[pos + 2] >> 2) & 0x03
+        if version == 1 or layer == 0 or rate_index == 3:
+            continue
+        channel_mode = (data[pos + 3] >> 6) & 0x03
+        return _audio_format("MP3", _MP3_SAMPLE_RATES[version][rate_index], 1 if channel_mode == 3 else 2)
+    return None
+
+
+def _sniff_mp3(data: bytes) -> Optional[Dict[str, Any]]:
+    offset = 0
+    if data[:3] == b"ID3" and len(data) >= 10:
+        # Tag size is a 28-bit synchsafe integer
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        offset = 10 + size
+    return _sniff_mp3_frame(data, offset)
+
+
+def _sniff_wav(data: bytes) -> Optional[Dict[str, Any]]:
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        chunk_size = struct.unpack_from("<I", data, pos + 4)[0]
+        if chunk_id == b"fmt " and pos + 16 <= len(data):
+            audio_format, channels, sample_rate = struct.unpack_from("<HHI", data, pos + 8)
+            encoding = _WAV_ENCODINGS.get(audio_format)
+            return _audio_format(encoding, sample_rate, channels) if encoding else None
+        pos += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+
+def _sniff_flac(data: bytes) -> Optional[Dict[str, Any]]:
+    # STREAMINFO follows the 4-byte marker and a 4-byte block header
+    if len(data) < 22:
+        return _audio_format("FLAC", None)
+    sample_rate = (data[18] << 12) | (data[19] << 4) | (data[20] >> 4)
+    channels = ((data[20] >> 1) & 0x07) + 1
+    return _audio_format("FLAC", sample_rate or None, channels)
+
+
+def content_type_format(content_type: Optional[str]) -> Optional[str]:
+    """Map a Content-Type header to an encoding name, if known."""
+    if not content_type:
+        return None
+    return CONTENT_TYPE_FORMATS.get(content_type.split(";")[0].strip().lower())
+
+
+def sniff_audio_format(audio_data: bytes, content_type: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Detect the encoding and sample rate of an audio clip.
+
+    Args:
+        audio_data: Raw audio bytes (only the first few KB are inspected)
+        content_type: Optional Content-Type of the download, used when the
+            header alone is not conclusive
+
+    Returns:
+        Optional[Dict[str, Any]]: {"encoding", "sample_rate_hertz", "channels"}
+        with encoding named after Google's RecognitionConfig.AudioEncoding,
+        or None if the format could not be determined
+    """
+    data = audio_data[:8192]
+
+    if data[:4] == b"OggS":
+        return _sniff_ogg(data)
+    if data[:4] == b"\x1a\x45\xdf\xa3":
+        return _sniff_webm(data)
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return _sniff_wav(data)
+    if data[:9] == b"#!AMR-WB\n":
+        return _audio_format("AMR_WB", 16000, 1)
+    if data[:6] == b"#!AMR\n":
+        return _audio_format("AMR", 8000, 1)
+    if data[:4] == b"fLaC":
+        return _sniff_flac(data)
+    if data[:3] == b"ID3" or content_type_format(content_type) == "MP3":
+        # Bare MPEG frames have no magic number, so only trust a frame
+        # sync when the tag or the Content-Type says MP3. ID3 tags (cover
+        # art) can be large, so scan past them in the full buffer.
+        return _sniff_mp3(audio_data)
+    return None
+
+
+def order_candidates(candidates: List[Dict[str, Any]], content_type: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Put the candidates matching the Content-Type hint first."""
+    hinted = content_type_format(content_type)
+    if not hinted:
+        return list(candidates)
+    return sorted(candidates, key=lambda candidate: candidate["encoding"] != hinted)
+
+
+# Layer III bitrates (kbps) by MPEG version: MPEG-1, and MPEG-2/2.5
+_MP3_BITRATES_V1 = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+_MP3_BITRATES_V2 = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+
+
+def _strip_id3(data: bytes) -> bytes:
+    """Remove a leading ID3v2 tag and a trailing ID3v1 tag."""
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        footer = 10 if data[5] & 0x10 else 0
+        data = data[10 + size + footer:]
+    if len(data) >= 128 and data[-128:-125] == b"TAG":
+        data = data[:-128]
+    return data
+
+
+def _mp3_frame_length(header: bytes) -> Optional[int]:
+    """Byte length of a Layer III frame from its 4-byte header."""
+    if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return None
+    version = (header[1] >> 3) & 0x03
+    layer = (header[1] >> 1) & 0x03
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0x03
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    padding = (header[2] >> 1) & 0x01
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    if version == 3:
+        return 144000 * _MP3_BITRATES_V1[bitrate_index] // sample_rate + padding
+    return 72000 * _MP3_BITRATES_V2[bitrate_index] // sample_rate + padding
+
+
+def _strip_vbr_info_frame(data: bytes) -> bytes:
+    """Drop a leading Xing/Info/VBRI frame, whose frame count describes only this chunk."""
+    frame_length = _mp3_frame_length(data[:4])
+    if frame_length and any(marker in data[:min(frame_length, 64)] for marker in (b"Xing", b"Info", b"VBRI")):
+        return data[frame_length:]
+    return data
+
+
+def concat_mp3(chunks: List[bytes]) -> bytes:
+    """Join independently encoded MP3 clips into one playable stream.
+
+    ID3 tags and Xing/Info frames describe a single clip, so they are removed
+    from every clip; players would otherwise stop or mis-seek at the chunk
+    boundaries.
+    """
+    return b"".join(_strip_vbr_info_frame(_strip_id3(chunk)) for chunk in chunks if chunk)
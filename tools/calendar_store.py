@@ -0,0 +1,343 @@
+"""
+Farming Calendar Store for Kisan Mitra
+
+Keeps the farming calendar dataset resident in memory with prebuilt indexes
+(month → crops by category, crop → months, pest → affected crops) so the
+calendar tools answer with dictionary lookups instead of re-parsing the file.
+Crop names are resolved through an inverted alias index covering English,
+Hindi, regional and transliterated names.
+The dataset is reloaded automatically when its mtime changes on disk.
+"""
+
+import json
+import os
+import re
+import threading
+import unicodedata
+from typing import Dict, Any, List, Optional
+
+DEFAULT_DATASET_PATH = "context/farming_calendar_dataset.json"
+
+# Common transliterated, colloquial and regional names for crops in the
+# dataset, mapped to their crop_database key. Hindi names and regional_names
+# from the dataset itself are indexed automatically at load time.
+CROP_NAME_ALIASES = {
+    "wheat": ["gehun", "gehu", "gahu", "गेहूँ", "kanak", "ਕਣਕ"],
+    "rice": ["dhan", "paddy", "chawal", "धान", "ਝੋਨਾ", "ধান", "நெல்", "వరి"],
+    "maize": ["makka", "makki", "corn", "bhutta", "ਮੱਕੀ"],
+    "barley": ["jau", "jaun"],
+    "pearl millet": ["bajra", "bajri", "sajje", "kambu"],
+    "finger millet": ["ragi", "nachni", "mandua", "मंडुआ"],
+    "foxtail millet": ["kangni", "kakun", "navane"],
+    "sorghum": ["jowar", "jwar", "jola", "cholam"],
+    "oats": ["jai"],
+    "chickpea": ["chana", "gram", "bengal gram", "channa"],
+    "lentil": ["masoor", "masur"],
+    "black gram": ["urad", "urd", "उरद"],
+    "green gram": ["moong", "mung", "मूँग"],
+    "pigeon pea": ["arhar", "tur", "toor", "tuar", "तुअर", "तूर"],
+    "field pea": ["dry pea", "sukha matar"],
+    "cowpea": ["lobia", "lobiya", "chawli"],
+    "horse gram": ["kulthi", "kulath"],
+    "moth bean": ["moth", "matki"],
+    "groundnut": ["moongphali", "mungfali", "peanut", "shengdana"],
+    "mustard": ["sarson", "rai", "raya", "राई", "toria", "तोरिया", "ਸਰ੍ਹੋਂ"],
+    "sesame": ["til", "gingelly"],
+    "sunflower": ["surajmukhi"],
+    "safflower": ["kusum", "kardi"],
+    "castor": ["arandi", "erandi"],
+    "linseed": ["alsi", "flax", "flaxseed"],
+    "soybean": ["soyabean", "soya"],
+    "cotton": ["kapas", "narma", "ਨਰਮਾ", "ਕਪਾਹ"],
+    "sugarcane": ["ganna", "ikh", "ईख", "ਗੰਨਾ"],
+    "tobacco": ["tambaku"],
+    "turmeric": ["haldi"],
+    "coriander": ["dhania", "dhaniya"],
+    "cumin": ["jeera", "zeera"],
+    "fenugreek": ["methi"],
+    "chili": ["chilli", "mirch", "mirchi", "मिर्ची"],
+    "garlic": ["lahsun", "lehsun"],
+    "ginger": ["adrak"],
+    "cardamom": ["elaichi", "ilaichi"],
+    "black pepper": ["kali mirch", "pepper"],
+    "fennel": ["saunf"],
+    "tomato": ["tamatar"],
+    "potato": ["aloo", "alu", "batata"],
+    "onion": ["pyaz", "pyaj", "kanda", "प्याज़"],
+    "cabbage": ["patta gobhi", "band gobhi", "बंद गोभी"],
+    "cauliflower": ["phool gobhi", "gobhi", "गोभी"],
+    "brinjal": ["baingan", "eggplant", "vangi"],
+    "okra": ["bhindi", "lady finger", "ladyfinger", "भिंडी"],
+    "carrot": ["gajar"],
+    "spinach": ["palak"],
+    "pea": ["matar", "green pea", "hara matar"],
+    "bottle gourd": ["lauki", "ghiya", "dudhi"],
+    "bitter gourd": ["karela"],
+    "pumpkin": ["kaddu", "sitaphal"],
+    "mango": ["aam"],
+    "banana": ["kela"],
+    "citrus": ["santra", "kinnow", "mosambi", "नींबू", "nimbu"],
+    "grapes": ["angoor", "angur"],
+    "apple": ["seb"],
+    "pomegranate": ["anar"],
+    "guava": ["amrood", "amrud"],
+    "papaya": ["papita"],
+    "arecanut": ["supari"],
+    "coconut": ["nariyal"],
+    "lucerne": ["alfalfa", "rijka"],
+}
+
+_DEVANAGARI_FOLDS = {
+    "\u0901": "\u0902",  # chandrabindu -> anusvara
+    "\u093c": "",        # drop nukta
+}
+
+_LATIN_FOLDS = [
+    ("ee", "i"),
+    ("oo", "u"),
+    ("w", "v"),
+    ("ph", "f"),
+]
+
+
+def _normalize_name(name: str) -> str:
+    """Normalize a crop or pest name for index lookups.
+
+    Lowercases, unifies Devanagari spelling variants and folds common
+    romanization variants ("gehoon" / "gehun", "chawal" / "chaval") so
+    transliterated input lands on the same key.
+    """
+    text = unicodedata.normalize("NFC", str(name)).lower()
+    for variant, canonical in _DEVANAGARI_FOLDS.items():
+        text = text.replace(variant, canonical)
+    text = re.sub(r"[()\[\],.;:/\\_'\"-]+", " ", text)
+    text = " ".join(text.split())
+
+    if text.isascii():
+        for variant, canonical in _LATIN_FOLDS:
+            text = text.replace(variant, canonical)
+        # Collapse doubled letters ("makka" / "maka", "dhaan" / "dhan")
+        text = re.sub(r"([a-z])\1+", r"\1", text)
+    return text
+
+
+class FarmingCalendarStore:
+    """Process-wide, indexed view of the farming calendar dataset"""
+
+    def __init__(self, dataset_path: str = DEFAULT_DATASET_PATH):
+        self.dataset_path = dataset_path
+        self._lock = threading.Lock()
+        self._mtime_ns = None
+
+        self.data: Dict[str, Any] = {}
+        self.months: Dict[int, Dict[str, Any]] = {}
+        self.crops_by_month: Dict[int, Dict[str, List[Dict[str, Any]]]] = {}
+        self.crop_aliases: Dict[str, str] = {}
+        self.crop_index: Dict[str, Dict[str, Any]] = {}
+        self.pests: Dict[str, Dict[str, Any]] = {}
+
+    def _ensure_loaded(self) -> None:
+        """(Re)load the dataset if it has never been loaded or its mtime changed.
+
+        Raises:
+            FileNotFoundError: If the dataset file does not exist
+            json.JSONDecodeError: If the dataset file is not valid JSON
+        """
+        mtime_ns = os.stat(self.dataset_path).st_mtime_ns
+        if mtime_ns == self._mtime_ns:
+            return
+
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock
+            mtime_ns = os.stat(self.dataset_path).st_mtime_ns
+            if mtime_ns == self._mtime_ns:
+                return
+
+            with open(self.dataset_path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+
+            self._build_indexes(data)
+            self.data = data
+            self._mtime_ns = mtime_ns
+
+    def _build_indexes(self, data: Dict[str, Any]) -> None:
+        """Build all lookup indexes for a freshly parsed dataset."""
+        months = {}
+        crops_by_month = {}
+        crop_aliases = {}
+        crop_index = {}
+        pests = {}
+
+        def add_alias(alias: Any, canonical: str) -> None:
+            key = _normalize_name(alias)
+            if key:
+                # First registration wins, so dataset names beat loose aliases
+                crop_aliases.setdefault(key, canonical)
+
+        # Crop database entries: canonical key, Hindi name, regional names
+        crop_database = data.get("crop_database", {})
+        for crop_key, record in crop_database.items():
+            crop_index[crop_key] = {
+                "crop_name": crop_key,
+                "record": record,
+                "monthly_calendar": []
+            }
+            add_alias(crop_key, crop_key)
+        for crop_key, record in crop_database.items():
+            if record.get("hindi_name"):
+                add_alias(record["hindi_name"], crop_key)
+        for crop_key, record in crop_database.items():
+            regional_names = record.get("regional_names") or {}
+            if isinstance(regional_names, dict):
+                regional_names = regional_names.values()
+            for names in regional_names:
+                for name in names if isinstance(names, list) else [names]:
+                    add_alias(name, crop_key)
+
+        for month_key, month_data in data.get("farming_calendar", {}).items():
+            try:
+                month = int(month_key.split("_")[-1])
+            except ValueError:
+                continue
+            months[month] = month_data
+
+            crops_by_category = {}
+            for category, crops in month_data.get("crops", {}).items():
+                crops_by_category[category] = []
+                for crop in crops:
+                    crops_by_category[category].append({
+                        "crop_name": crop["crop_name"],
+                        "varieties": crop.get("varieties", []),
+                        "growth_stage": crop.get("growth_stage", ""),
+                        "activities": crop.get("activities", []),
+                        "fertilizer_schedule": crop.get("fertilizer_schedule", ""),
+                        "expected_yield": crop.get("expected_yield_per_acre", "")
+                    })
+
+                    # Calendar-only crops get their own index entry
+                    canonical = crop_aliases.get(_normalize_name(crop["crop_name"]))
+                    if canonical is None:
+                        canonical = crop["crop_name"].lower()
+                        crop_index[canonical] = {
+                            "crop_name": crop["crop_name"],
+                            "record": None,
+                            "monthly_calendar": []
+                        }
+                        add_alias(crop["crop_name"], canonical)
+                    crop_index[canonical]["monthly_calendar"].append({
+                        "month": month_data.get("month_name", month_key),
+                        "month_number": month,
+                        "category": category,
+                        "details": crop
+                    })
+            crops_by_month[month] = crops_by_category
+
+            # Track which months each pest/disease is on the watch list
+            watch = month_data.get("pest_disease_watch", {})
+            for pest_name in watch.get("major_pests", []) + watch.get("diseases", []):
+                entry = pests.setdefault(_normalize_name(pest_name), {
+                    "pest_name": pest_name,
+                    "affected_crops": [],
+                    "watch_months": []
+                })
+                entry["watch_months"].append(month)
+
+        for canonical, aliases in CROP_NAME_ALIASES.items():
+            if canonical in crop_index:
+                for alias in aliases:
+                    add_alias(alias, canonical)
+
+        for pest in data.get("pest_disease_database", []):
+            entry = pests.setdefault(_normalize_name(pest["pest_name"]), {
+                "pest_name": pest["pest_name"],
+                "affected_crops": [],
+                "watch_months": []
+            })
+            entry.update({k: v for k, v in pest.items() if k != "affected_crops"})
+            for crop_name in pest.get("affected_crops", []):
+                if crop_name not in entry["affected_crops"]:
+                    entry["affected_crops"].append(crop_name)
+
+        for entry in crop_index.values():
+            entry["monthly_calendar"].sort(key=lambda e: e["month_number"])
+        for entry in pests.values():
+            entry["watch_months"].sort()
+
+        self.months = months
+        self.crops_by_month = crops_by_month
+        self.crop_aliases = crop_aliases
+        self.crop_index = crop_index
+        self.pests = pests
+
+    def get_data(self) -> Dict[str, Any]:
+        """Return the full parsed dataset."""
+        self._ensure_loaded()
+        return self.data
+
+    def get_month(self, month: int) -> Optional[Dict[str, Any]]:
+        """Return the raw calendar entry for a month number (1-12)."""
+        self._ensure_loaded()
+        return self.months.get(month)
+
+    def get_crops_by_category(self, month: int) -> Dict[str, List[Dict[str, Any]]]:
+        """Return the crops grown in a month grouped by category."""
+        self._ensure_loaded()
+        return self.crops_by_month.get(month, {})
+
+    def resolve_crop(self, crop_name: str) -> Optional[str]:
+        """Resolve an English, Hindi, regional or transliterated crop name.
+
+        Returns:
+            Optional[str]: The canonical crop key, or None if unknown
+        """
+        self._ensure_loaded()
+        key = _normalize_name(crop_name)
+        canonical = self.crop_aliases.get(key)
+        if canonical is None and key.isascii():
+            # Tolerate simple English plurals ("tomatoes", "chillies")
+            for suffix in ("es", "s"):
+                if key.endswith(suffix):
+                    canonical = self.crop_aliases.get(key[:-len(suffix)])
+                    if canonical:
+                        break
+        return canonical
+
+    def lookup_crop(self, crop_name: str) -> Optional[Dict[str, Any]]:
+        """Return the index entry for a crop.
+
+        Returns:
+            Optional[Dict[str, Any]]: Entry with "crop_name" (canonical),
+            "record" (crop_database entry or None) and "monthly_calendar"
+            ((month, category, details) entries), or None if unknown
+        """
+        canonical = self.resolve_crop(crop_name)
+        return self.crop_index.get(canonical) if canonical else None
+
+    def get_crop_record(self, crop_name: str) -> Optional[Dict[str, Any]]:
+        """Return the crop_database entry for a crop, if present."""
+        entry = self.lookup_crop(crop_name)
+        return entry["record"] if entry else None
+
+    def get_crop_months(self, crop_name: str) -> List[Dict[str, Any]]:
+        """Return every (month, category, details) entry for a crop."""
+        entry = self.lookup_crop(crop_name)
+        return entry["monthly_calendar"] if entry else []
+
+    def get_pest(self, pest_name: str) -> Optional[Dict[str, Any]]:
+        """Return pest/disease details with affected crops and watch months."""
+        self._ensure_loaded()
+        return self.pests.get(_normalize_name(pest_name))
+
+
+_stores: Dict[str, FarmingCalendarStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_calendar_store(dataset_path: str = DEFAULT_DATASET_PATH) -> FarmingCalendarStore:
+    """Return the shared calendar store for a dataset path."""
+    key = os.path.abspath(dataset_path)
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.setdefault(key, FarmingCalendarStore(dataset_path))
+    return store
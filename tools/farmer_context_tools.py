@@ -6,36 +6,27 @@ All functions have NO parameters to be ADK LLM compatible.
 """
 
 import json
-import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime
 
-def load_farmer_profile() -> Dict[str, Any]:
-    """Load farmer profile from the default JSON file location.
+from google.adk.tools import ToolContext
+
+from .profile_store import DEFAULT_PROFILE_PATH, ProfileNotFoundError, load_profile_data
+
+def load_farmer_profile(tool_context: Optional[ToolContext] = None) -> Dict[str, Any]:
+    """Load the current farmer's profile.
     ADK Compatible - No parameters required.
     
+    The farmer is resolved from the ADK session's userId (WhatsApp phone
+    number). Farmers without a stored profile get an error, never the
+    default JSON file, which is only used outside an ADK call.
+    
     Returns:
         Dict[str, Any]: Farmer profile data or error message
     """
-    profile_path = "context/farmer_profile.json"
-    
     try:
-        if not os.path.exists(profile_path):
-            return {
-                "status": "error",
-                "error_message": f"Farmer profile file not found: {profile_path}. Please create farmer profile first."
-            }
-        
-        with open(profile_path, 'r', encoding='utf-8') as file:
-            profile_data = json.load(file)
-            
-        # Validate required fields
-        required_fields = ['farmer_details']
-        if not all(field in profile_data for field in required_fields):
-            return {
-                "status": "error",
-                "error_message": "Invalid farmer profile format. Missing required fields."
-            }
+        # Parsed and validated once per profile change, shared read-only
+        profile_data = load_profile_data(tool_context)
             
         return {
             "status": "success",
@@ -44,6 +35,21 @@ def load_farmer_profile() -> Dict[str, Any]:
             "loaded_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
         
+    except ProfileNotFoundError:
+        return {
+            "status": "error",
+            "error_message": "No farmer profile is registered for this number. Ask the farmer for their name, village, district and crops, and do not assume any details."
+        }
+    except FileNotFoundError:
+        return {
+            "status": "error",
+            "error_message": f"Farmer profile file not found: {DEFAULT_PROFILE_PATH}. Please create farmer profile first."
+        }
+    except KeyError:
+        return {
+            "status": "error",
+            "error_message": "Invalid farmer profile format. Missing required fields."
+        }
     except json.JSONDecodeError as e:
         return {
             "status": "error",
@@ -55,15 +61,15 @@ def load_farmer_profile() -> Dict[str, Any]:
             "error_message": f"Error loading farmer profile: {str(e)}"
         }
 
-def get_farmer_context_summary() -> Dict[str, Any]:
+def get_farmer_context_summary(tool_context: Optional[ToolContext] = None) -> Dict[str, Any]:
     """Get a summarized farmer context for quick reference.
     ADK Compatible - No parameters required.
-    Automatically loads from the default farmer profile location.
+    Automatically loads the current farmer's profile.
     
     Returns:
         Dict[str, Any]: Summarized farmer context with language preference
     """
-    profile_result = load_farmer_profile()
+    profile_result = load_farmer_profile(tool_context)
     
     if profile_result["status"] == "error":
         return profile_result
@@ -111,7 +117,7 @@ def get_farmer_context_summary() -> Dict[str, Any]:
     
     return summary
 
-def get_crop_specific_context(crop_name: str) -> Dict[str, Any]:
+def get_crop_specific_context(crop_name: str, tool_context: Optional[ToolContext] = None) -> Dict[str, Any]:
     """Get crop-specific context from farmer profile for a given crop.
     
     Args:
@@ -120,7 +126,7 @@ def get_crop_specific_context(crop_name: str) -> Dict[str, Any]:
     Returns:
         Dict[str, Any]: Crop-specific context and recommendations
     """
-    profile_result = load_farmer_profile()
+    profile_result = load_farmer_profile(tool_context)
     
     if profile_result["status"] == "error":
         return profile_result
@@ -198,14 +204,14 @@ def get_crop_specific_context(crop_name: str) -> Dict[str, Any]:
         }
     }
 
-def get_seasonal_recommendations() -> Dict[str, Any]:
+def get_seasonal_recommendations(tool_context: Optional[ToolContext] = None) -> Dict[str, Any]:
     """Get season-specific recommendations based on farmer profile and current date.
     ADK Compatible - No parameters required.
     
     Returns:
         Dict[str, Any]: Seasonal recommendations
     """
-    profile_result = load_farmer_profile()
+    profile_result = load_farmer_profile(tool_context)
     
     if profile_result["status"] == "error":
         return profile_result
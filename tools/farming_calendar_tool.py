@@ -5,13 +5,17 @@ Provides comprehensive seasonal farming calendar and crop guidance using extensi
 """
 
 import json
-import os
 from datetime import datetime
 from typing import Dict, Any, Optional
 
-def load_farming_calendar_data(dataset_path: str = "context/farming_calendar_dataset.json") -> Dict[str, Any]:
+from .calendar_store import DEFAULT_DATASET_PATH, get_calendar_store
+
+def load_farming_calendar_data(dataset_path: str = DEFAULT_DATASET_PATH) -> Dict[str, Any]:
     """Load the comprehensive farming calendar dataset.
     
+    The dataset is served from the shared in-memory calendar store and is only
+    re-parsed when the file changes on disk.
+    
     Args:
         dataset_path (str): Path to the farming calendar dataset JSON file
         
@@ -19,8 +23,7 @@ def load_farming_calendar_data(dataset_path: str = "context/farming_calendar_dat
         Dict[str, Any]: Complete farming calendar and crop database
     """
     try:
-        with open(dataset_path, 'r', encoding='utf-8') as file:
-            return json.load(file)
+        return get_calendar_store(dataset_path).get_data()
     except FileNotFoundError:
         return {
             "status": "error",
@@ -56,10 +59,13 @@ def get_farming_calendar_advice(location: str, month: Optional[int] = None) -> D
     if "status" in calendar_data and calendar_data["status"] == "error":
         return calendar_data
     
+    store = get_calendar_store()
+    
     try:
-        # Get month-specific data from the comprehensive dataset
-        month_key = f"month_{month}"
-        month_data = calendar_data["farming_calendar"][month_key]
+        # Get month-specific data from the indexed dataset
+        month_data = store.get_month(month)
+        if month_data is None:
+            raise KeyError(f"month_{month}")
         
         # Extract comprehensive information
         season_info = {
@@ -70,20 +76,8 @@ def get_farming_calendar_advice(location: str, month: Optional[int] = None) -> D
             "rainfall_pattern": month_data["rainfall_pattern"]
         }
         
-        # Extract crop information by category
-        crops_by_category = {}
-        for category, crops in month_data["crops"].items():
-            crops_by_category[category] = []
-            for crop in crops:
-                crop_info = {
-                    "crop_name": crop["crop_name"],
-                    "varieties": crop.get("varieties", []),
-                    "growth_stage": crop.get("growth_stage", ""),
-                    "activities": crop.get("activities", []),
-                    "fertilizer_schedule": crop.get("fertilizer_schedule", ""),
-                    "expected_yield": crop.get("expected_yield_per_acre", "")
-                }
-                crops_by_category[category].append(crop_info)
+        # Crop information by category is precomputed by the store
+        crops_by_category = store.get_crops_by_category(month)
         
         # Extract pest and disease information
         pest_disease_info = month_data.get("pest_disease_watch", {})
@@ -127,9 +121,12 @@ def get_farming_calendar_advice(location: str, month: Optional[int] = None) -> D
             "error_message": f"Error processing calendar data: {str(e)}"
         }
 
-def get_crop_specific_calendar(crop_name: str, dataset_path: str = "context/farming_calendar_dataset.json") -> Dict[str, Any]:
+def get_crop_specific_calendar(crop_name: str, dataset_path: str = DEFAULT_DATASET_PATH) -> Dict[str, Any]:
     """Get detailed information about a specific crop from the crop database.
     
+    Accepts English, Hindi, regional or transliterated crop names
+    (e.g. "Wheat", "गेहूं", "gehun", "धान", "makka").
+    
     Args:
         crop_name (str): Name of the crop to get information for
         dataset_path (str): Path to the farming calendar dataset JSON file
@@ -142,37 +139,37 @@ def get_crop_specific_calendar(crop_name: str, dataset_path: str = "context/farm
     if "status" in calendar_data and calendar_data["status"] == "error":
         return calendar_data
     
+    store = get_calendar_store(dataset_path)
+    
     try:
-        crop_database = calendar_data["crop_database"]
-        crop_key = crop_name.lower()
-        
-        if crop_key not in crop_database:
-            # Try to find crop in any category across all months
-            found_crops = []
-            for month_key, month_data in calendar_data["farming_calendar"].items():
-                for category, crops in month_data["crops"].items():
-                    for crop in crops:
-                        if crop["crop_name"].lower() == crop_key:
-                            found_crops.append({
-                                "month": month_data["month_name"],
-                                "category": category,
-                                "details": crop
-                            })
-            
-            if found_crops:
-                return {
-                    "status": "success",
-                    "crop_name": crop_name,
-                    "monthly_calendar": found_crops,
-                    "message": f"Found {crop_name} calendar across {len(found_crops)} months"
-                }
-            else:
-                return {
-                    "status": "error",
-                    "error_message": f"Crop '{crop_name}' not found in database. Available crops can be found in the monthly calendar data."
-                }
-        
-        crop_info = crop_database[crop_key]
+        # Resolves English, Hindi, regional and transliterated names in O(1)
+        crop_entry = store.lookup_crop(crop_name)
+        
+        if crop_entry is None:
+            return {
+                "status": "error",
+                "error_message": f"Crop '{crop_name}' not found in database. Available crops can be found in the monthly calendar data."
+            }
+        
+        found_crops = [
+            {
+                "month": entry["month"],
+                "category": entry["category"],
+                "details": entry["details"]
+            }
+            for entry in crop_entry["monthly_calendar"]
+        ]
+        crop_info = crop_entry["record"]
+        
+        if crop_info is None:
+            # Crop only appears in the monthly calendar
+            return {
+                "status": "success",
+                "crop_name": crop_name,
+                "matched_crop": crop_entry["crop_name"],
+                "monthly_calendar": found_crops,
+                "message": f"Found {crop_name} calendar across {len(found_crops)} months"
+            }
         
         return {
             "status": "success",
@@ -189,7 +186,9 @@ def get_crop_specific_calendar(crop_name: str, dataset_path: str = "context/farm
             "soil_requirements": crop_info.get("soil_requirements", {}),
             "water_requirements": crop_info.get("water_requirements", {}),
             "major_varieties": crop_info.get("major_varieties", []),
-            "fertilizer_recommendations": crop_info.get("fertilizer_recommendations", {})
+            "fertilizer_recommendations": crop_info.get("fertilizer_recommendations", {}),
+            "matched_crop": crop_entry["crop_name"],
+            "monthly_calendar": found_crops
         }
         
     except Exception as e:
@@ -0,0 +1,196 @@
+"""
+Forecast Analytics for Kisan Mitra
+
+Turns the full OpenWeatherMap 5-day / 3-hour forecast (40 slots) into farming
+indices with NumPy instead of sampling one slot per day:
+
+- spray suitability per slot (wind, rain now and in the next hours, rain
+  chance, temperature, humidity, daylight) and the best spray windows
+- cumulative rainfall (24 h, 72 h, 5 days)
+- growing degree days
+- leaf-wetness hours (disease pressure)
+- heat-stress hours
+
+All index computations work along the last axis, so stacked forecasts for
+many grid cells (shape cells x slots) are processed in one pass. A cached
+forecast may be hours old, so slots that have already ended are dropped
+before anything is computed.
+"""
+
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+SLOT_HOURS = 3
+
+# Spray thresholds: enough air movement to avoid inversions, not enough to drift
+SPRAY_MIN_WIND = 0.8           # m/s
+SPRAY_MAX_WIND = 4.0           # m/s (~15 km/h)
+SPRAY_MAX_GUST = 7.0           # m/s
+SPRAY_MIN_TEMP = 10.0          # °C
+SPRAY_MAX_TEMP = 30.0          # °C, evaporation and crop scorch above
+SPRAY_MIN_HUMIDITY = 40.0      # %, droplets evaporate below
+SPRAY_MAX_HUMIDITY = 85.0      # %, slow drying, run-off and poor uptake above
+SPRAY_MAX_POP = 0.3            # rain probability in the slot
+SPRAY_RAINFAST_SLOTS = 2       # no rain expected for 6 h after spraying
+SPRAY_RAINFAST_MAX_MM = 0.5
+DAYLIGHT_HOURS = (6, 18)       # whole slot must fall within these local hours
+
+LEAF_WETNESS_HUMIDITY = 90.0   # %, canopy assumed wet at or above
+HEAT_STRESS_TEMP = 35.0        # °C
+GDD_BASE_TEMP = 10.0           # °C, common base for wheat, maize, cotton…
+
+
+def forecast_arrays(forecast_data: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Load all forecast slots of one OpenWeatherMap /forecast response into arrays."""
+    slots = forecast_data.get("list") or []
+    tz_offset = int((forecast_data.get("city") or {}).get("timezone", 19800))  # IST default
+    return {
+        "dt": np.array([slot["dt"] for slot in slots], dtype=np.int64),
+        "temp": np.array([slot["main"]["temp"] for slot in slots], dtype=float),
+        "humidity": np.array([slot["main"].get("humidity", 0) for slot in slots], dtype=float),
+        "wind": np.array([(slot.get("wind") or {}).get("speed", 0.0) for slot in slots], dtype=float),
+        "gust": np.array([(slot.get("wind") or {}).get("gust", 0.0) for slot in slots], dtype=float),
+        "rain": np.array([(slot.get("rain") or {}).get("3h", 0.0) for slot in slots], dtype=float),
+        "pop": np.array([slot.get("pop", 0.0) for slot in slots], dtype=float),
+        "tz_offset": np.array(tz_offset, dtype=np.int64),
+        "descriptions": [slot["weather"][0]["description"] for slot in slots],
+    }
+
+
+def stack_forecast_arrays(arrays_list: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Stack per-cell forecast arrays (truncated to the shortest) into cells x slots arrays."""
+    n = min(arrays["dt"].shape[-1] for arrays in arrays_list)
+    stacked = {
+        key: np.stack([arrays[key][:n] for arrays in arrays_list])
+        for key in ("dt", "temp", "humidity", "wind", "gust", "rain", "pop")
+    }
+    stacked["tz_offset"] = np.array([arrays["tz_offset"] for arrays in arrays_list], dtype=np.int64)
+    return stacked
+
+
+def _rain_ahead(rain: np.ndarray, slots: int) -> np.ndarray:
+    """Rain over the following ``slots`` slots (excluding the current one), along the last axis."""
+    padded = np.concatenate([rain, np.zeros(rain.shape[:-1] + (slots,))], axis=-1)
+    cumulative = np.cumsum(padded, axis=-1)
+    n = rain.shape[-1]
+    return cumulative[..., slots:slots + n] - cumulative[..., :n]
+
+
+def spray_scores(arrays: Dict[str, np.ndarray]) -> np.ndarray:
+    """Per-slot spray suitability in [0, 1]; 0 means do not spray."""
+    wind, gust, temp = arrays["wind"], arrays["gust"], arrays["temp"]
+    humidity, rain, pop = arrays["humidity"], arrays["rain"], arrays["pop"]
+
+    local_hour = ((arrays["dt"] + arrays["tz_offset"][..., None]) // 3600) % 24
+    usable = (
+        (local_hour >= DAYLIGHT_HOURS[0]) & (local_hour + SLOT_HOURS <= DAYLIGHT_HOURS[1])
+        & (wind >= SPRAY_MIN_WIND) & (wind <= SPRAY_MAX_WIND) & (gust <= SPRAY_MAX_GUST)
+        & (temp >= SPRAY_MIN_TEMP) & (temp <= SPRAY_MAX_TEMP)
+        & (humidity >= SPRAY_MIN_HUMIDITY) & (humidity <= SPRAY_MAX_HUMIDITY)
+        & (rain == 0) & (pop <= SPRAY_MAX_POP)
+        & (_rain_ahead(rain, SPRAY_RAINFAST_SLOTS) <= SPRAY_RAINFAST_MAX_MM)
+    )
+    # Prefer calm-but-moving air, mild temperatures and dry skies
+    wind_score = 1 - np.abs(wind - 2.0) / 4.0
+    temp_score = 1 - np.abs(temp - 22.0) / 20.0
+    score = np.clip(wind_score, 0, 1) * np.clip(temp_score, 0, 1) * (1 - pop)
+    return np.where(usable, np.round(score, 3), 0.0)
+
+
+def forecast_indices(arrays: Dict[str, np.ndarray], gdd_base: float = GDD_BASE_TEMP) -> Dict[str, np.ndarray]:
+    """Vectorized indices along the last axis (works for one forecast or stacked forecasts)."""
+    temp, humidity, rain = arrays["temp"], arrays["humidity"], arrays["rain"]
+    cumulative_rain = np.cumsum(rain, axis=-1)
+    n = rain.shape[-1]
+    wet = (humidity >= LEAF_WETNESS_HUMIDITY) | (rain > 0)
+    return {
+        "spray_score": spray_scores(arrays),
+        "cumulative_rain_mm": cumulative_rain,
+        "rain_24h_mm": cumulative_rain[..., min(8, n) - 1] if n else np.zeros(rain.shape[:-1]),
+        "rain_72h_mm": cumulative_rain[..., min(24, n) - 1] if n else np.zeros(rain.shape[:-1]),
+        "rain_total_mm": cumulative_rain[..., -1] if n else np.zeros(rain.shape[:-1]),
+        # Each 3-hour slot contributes its share of a day's degree days
+        "growing_degree_days": np.sum(np.maximum(temp - gdd_base, 0) * SLOT_HOURS / 24, axis=-1),
+        "leaf_wetness_hours": np.sum(wet, axis=-1) * SLOT_HOURS,
+        "heat_stress_hours": np.sum(temp >= HEAT_STRESS_TEMP, axis=-1) * SLOT_HOURS,
+    }
+
+
+def _local_time(timestamp: int, tz_offset: int) -> datetime:
+    return datetime.fromtimestamp(int(timestamp), tz=timezone(timedelta(seconds=int(tz_offset))))
+
+
+def best_spray_windows(dt: np.ndarray, scores: np.ndarray, tz_offset: int, limit: int = 3) -> List[Dict[str, Any]]:
+    """Contiguous runs of sprayable slots, best average score first."""
+    usable = np.concatenate([[False], scores > 0, [False]])
+    edges = np.flatnonzero(np.diff(usable.astype(np.int8)))
+    runs = edges.reshape(-1, 2)  # [start, end) slot indices
+    windows = []
+    for start, end in runs:
+        start_time = _local_time(dt[start], tz_offset)
+        end_time = _local_time(dt[end - 1], tz_offset) + timedelta(hours=SLOT_HOURS)
+        windows.append({
+            "start": start_time.strftime("%Y-%m-%d %H:%M"),
+            "end": end_time.strftime("%Y-%m-%d %H:%M"),
+            "hours": int(end - start) * SLOT_HOURS,
+            "score": round(float(scores[start:end].mean()), 2),
+        })
+    windows.sort(key=lambda window: (-window["score"], window["start"]))
+    return windows[:limit]
+
+
+def daily_summary(arrays: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """Per-day min/max temperature, rain total and highest rain chance."""
+    tz_offset = int(arrays["tz_offset"])
+    days = (arrays["dt"] + tz_offset) // 86400
+    summary = []
+    for day in np.unique(days):
+        mask = days == day
+        descriptions = [d for d, m in zip(arrays["descriptions"], mask) if m]
+        summary.append({
+            "date": _local_time(arrays["dt"][mask][0], tz_offset).strftime("%Y-%m-%d"),
+            "temp_min": round(float(arrays["temp"][mask].min()), 1),
+            "temp_max": round(float(arrays["temp"][mask].max()), 1),
+            "rain_mm": round(float(arrays["rain"][mask].sum()), 1),
+            "rain_probability": round(float(arrays["pop"][mask].max()) * 100),
+            "description": Counter(descriptions).most_common(1)[0][0],
+        })
+    return summary
+
+
+def upcoming_slots(forecast_data: Dict[str, Any], now: Optional[float] = None) -> Dict[str, Any]:
+    """The response with only slots that have not ended yet (``now`` defaults to the current time)."""
+    now = time.time() if now is None else now
+    slots = [slot for slot in forecast_data.get("list") or [] if slot["dt"] + SLOT_HOURS * 3600 > now]
+    return {**forecast_data, "list": slots}
+
+
+def analyze_forecast(
+    forecast_data: Optional[Dict[str, Any]], gdd_base: float = GDD_BASE_TEMP, now: Optional[float] = None
+) -> Optional[Dict[str, Any]]:
+    """Farming indices for the remaining slots of one /forecast response, or None if none remain."""
+    if not forecast_data:
+        return None
+    forecast_data = upcoming_slots(forecast_data, now)
+    if not forecast_data["list"]:
+        return None
+    arrays = forecast_arrays(forecast_data)
+    indices = forecast_indices(arrays, gdd_base)
+    return {
+        "slots": int(arrays["dt"].shape[0]),
+        # Suitability of the current or next slot (0 = do not spray now)
+        "spray_score_now": float(indices["spray_score"][0]),
+        "rain_next_24h_mm": round(float(indices["rain_24h_mm"]), 1),
+        "rain_next_72h_mm": round(float(indices["rain_72h_mm"]), 1),
+        "rain_5_days_mm": round(float(indices["rain_total_mm"]), 1),
+        "growing_degree_days": round(float(indices["growing_degree_days"]), 1),
+        "gdd_base_temp": gdd_base,
+        "leaf_wetness_hours": int(indices["leaf_wetness_hours"]),
+        "heat_stress_hours": int(indices["heat_stress_hours"]),
+        "best_spray_windows": best_spray_windows(arrays["dt"], indices["spray_score"], int(arrays["tz_offset"])),
+        "daily": daily_summary(arrays),
+    }
@@ -0,0 +1,149 @@
+"""
+Geocode Cache for the Kisan Mitra Weather Tool
+
+District and village names do not move, so a place name is resolved to
+coordinates once and never again. Lookups go through:
+
+1. The bundled table of Indian district headquarters
+   (context/district_coordinates.json), including common old names.
+2. A persistent SQLite cache of earlier geocoding API results (no expiry).
+
+Only names found in neither need the OpenWeatherMap geocoding API; the
+caller stores those results back with ``put``.
+
+Configuration (environment variables):
+    KISAN_MITRA_GEOCODE_DB   SQLite cache file (default data/geocode_cache.db)
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DISTRICT_COORDINATES_PATH = "context/district_coordinates.json"
+DEFAULT_GEOCODE_DB_PATH = os.getenv("KISAN_MITRA_GEOCODE_DB", "data/geocode_cache.db")
+
+_SUFFIX_RE = re.compile(r"(,?\s*india|\s+district)$")
+
+
+def normalize_place_name(name: str) -> str:
+    """Normalize a place name for lookup ("Muzaffarnagar District, India" → "muzaffarnagar")."""
+    name = re.sub(r"\s+", " ", unicodedata.normalize("NFC", name or "")).strip().lower()
+    previous = None
+    while previous != name:
+        previous = name
+        name = _SUFFIX_RE.sub("", name).strip(" ,")
+    return name
+
+
+def _place(name: str, state: str, lat: float, lon: float, source: str, country: str = "IN") -> Dict[str, Any]:
+    return {"name": name, "state": state, "country": country, "lat": lat, "lon": lon, "source": source}
+
+
+class GeocodeCache:
+    """Place name → coordinates from the bundled table and a SQLite cache"""
+
+    def __init__(self, db_path: str = DEFAULT_GEOCODE_DB_PATH, table_path: str = DISTRICT_COORDINATES_PATH):
+        self.db_path = db_path
+        self.table_path = table_path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._districts: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        self._memory: Dict[str, Dict[str, Any]] = {}
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database lazily and make sure the schema exists (lock held)."""
+        if self._conn is None:
+            db_dir = os.path.dirname(self.db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS geocodes (
+                    query TEXT PRIMARY KEY,
+                    place_json TEXT NOT NULL,
+                    created_at TEXT NOT NULL
+                )
+                """
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _district_index(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Normalized district name or alias → bundled entries (lock held)."""
+        if self._districts is None:
+            index: Dict[str, List[Dict[str, Any]]] = {}
+            try:
+                with open(self.table_path, "r", encoding="utf-8") as table_file:
+                    entries = json.load(table_file)["districts"]
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"⚠️ District coordinate table unavailable: {e}")
+                entries = []
+            for entry in entries:
+                place = _place(entry["district"], entry["state"], entry["latitude"], entry["longitude"], "district_table")
+                for name in [entry["district"], *entry.get("aliases", [])]:
+                    index.setdefault(normalize_place_name(name), []).append(place)
+            self._districts = index
+        return self._districts
+
+    def _from_table(self, query: str) -> Optional[Dict[str, Any]]:
+        """Match "district" or "district, state"; names shared by several states need the state."""
+        name, _, state = query.partition(",")
+        candidates = self._district_index().get(name.strip(), [])
+        state = state.strip()
+        if state:
+            candidates = [place for place in candidates if place["state"].lower() == state]
+        return candidates[0] if len(candidates) == 1 else None
+
+    def canonical_district(self, name: str, state: str = "") -> Optional[str]:
+        """Current district name for a bundled name or alias ("Allahabad" → "Prayagraj")."""
+        query = normalize_place_name(name)
+        if state:
+            query = f"{query}, {state.strip().lower()}"
+        with self._lock:
+            place = self._from_table(query)
+        return place["name"] if place else None
+
+    def get(self, location: str) -> Optional[Dict[str, Any]]:
+        """Return {"name", "state", "country", "lat", "lon", "source"} or None if unknown."""
+        query = normalize_place_name(location)
+        if not query:
+            return None
+        with self._lock:
+            place = self._memory.get(query) or self._from_table(query)
+            if place is None:
+                row = self._connection().execute(
+                    "SELECT place_json FROM geocodes WHERE query = ?", (query,)
+                ).fetchone()
+                place = json.loads(row[0]) if row else None
+            if place is not None:
+                self._memory[query] = place
+            return place
+
+    def put(self, location: str, place: Dict[str, Any]) -> None:
+        """Store a geocoding API result permanently."""
+        query = normalize_place_name(location)
+        if not query:
+            return
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO geocodes (query, place_json, created_at) VALUES (?, ?, ?)",
+                (query, json.dumps(place, ensure_ascii=False), datetime.now().isoformat()),
+            )
+            conn.commit()
+            self._memory[query] = place
+
+
+# Global geocode cache instance
+geocode_cache = GeocodeCache()
@@ -0,0 +1,376 @@
+"""
+AgMarkNet Price Report Ingestion for Kisan Mitra
+
+Loads AgMarkNet daily price exports into the local mandi price history
+(tools.mandi_price_store), so the price tools serve recorded prices without
+scraping on the request path. Files are picked up from a drop directory and
+read as a stream, so multi-hundred-MB historical dumps load in bounded
+memory:
+
+- CSV (AgMarkNet / data.gov.in exports), read row by row
+- .xls exports from the AgMarkNet website, which are HTML tables, parsed in
+  1 MB chunks
+- XLSX, read with openpyxl in read-only mode (optional dependency)
+
+Column headers are matched by name ("Market Name", "Modal Price
+(Rs./Quintal)", "Arrival_Date", …). Commodity names are mapped to the names
+the price tools use ("Paddy(Dhan)(Common)" → "Paddy"), district names to
+their current names ("Allahabad" → "Prayagraj") and all names are
+whitespace- and case-normalized. Varieties are kept apart (the price store
+combines them when answering). A (commodity, variety, state, district,
+market, date) row appearing again, in the same file or a later one, replaces
+the earlier one.
+
+Loaded files move to processed/ inside the drop directory. Unreadable ones,
+and files without a recognizable price table header, move to failed/.
+
+Configuration (environment variables):
+    MANDI_DROP_DIR           Drop directory for exports (default data/mandi_drop)
+    MANDI_INGEST_CHUNK_ROWS  Rows per database transaction (default 50000)
+
+Usage:
+    python -m tools.mandi_ingest [FILE ...] [--drop-dir DIR] [--state STATE] [--watch SECONDS]
+"""
+
+import csv
+import itertools
+import logging
+import os
+import re
+import shutil
+import time
+from functools import lru_cache
+from html.parser import HTMLParser
+from typing import Any, Dict, Iterator, List, Optional
+
+from .geocode_cache import geocode_cache
+from .mandi_price_store import MandiPriceStore, mandi_price_store
+
+logger = logging.getLogger(__name__)
+
+MANDI_DROP_DIR = os.getenv("MANDI_DROP_DIR", "data/mandi_drop")
+MANDI_INGEST_CHUNK_ROWS = int(os.getenv("MANDI_INGEST_CHUNK_ROWS", "50000"))
+
+SUPPORTED_EXTENSIONS = (".csv", ".xls", ".xlsx", ".htm", ".html")
+
+_HTML_CHUNK_BYTES = 1024 * 1024
+
+# Normalized header → price row field
+HEADER_FIELDS = {
+    "state": "state", "state name": "state",
+    "district": "district", "district name": "district",
+    "market": "market", "market name": "market", "market center": "market",
+    "commodity": "commodity", "commodity name": "commodity",
+    "variety": "variety",
+    "min price": "min_price", "minimum price": "min_price",
+    "max price": "max_price", "maximum price": "max_price",
+    "modal price": "modal_price",
+    "price date": "date", "arrival date": "date", "reported date": "date", "date": "date",
+}
+
+# AgMarkNet commodity names → names used by the price tools
+COMMODITY_ALIASES = {
+    "paddy(dhan)(common)": "Paddy",
+    "paddy(dhan)(basmati)": "Paddy (Basmati)",
+    "rice": "Rice",
+    "wheat": "Wheat",
+    "wheat atta": "Wheat Atta",
+    "bengal gram(gram)(whole)": "Gram",
+    "bengal gram dal (chana dal)": "Gram Dal",
+    "mustard": "Mustard",
+    "rapeseed & mustard": "Mustard",
+    "soyabean": "Soyabean",
+    "soybean": "Soyabean",
+    "cotton": "Cotton",
+    "kapas": "Cotton",
+    "sugarcane": "Sugarcane",
+    "potato": "Potato",
+    "onion": "Onion",
+    "tomato": "Tomato",
+    "maize": "Maize",
+    "bajra(pearl millet/cumbu)": "Bajra",
+    "jowar(sorghum)": "Jowar",
+    "arhar (tur/red gram)(whole)": "Arhar",
+    "black gram (urd beans)(whole)": "Urad",
+    "green gram (moong)(whole)": "Moong",
+    "groundnut": "Groundnut",
+}
+
+
+def _normalize_header(header: Any) -> str:
+    text = str(header or "").replace("_x0020_", " ").replace("_", " ").lower()
+    text = re.sub(r"\(.*?\)", " ", text)  # "(Rs./Quintal)"
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _tidy(value: Any) -> str:
+    """Collapse whitespace; title-case names exported in all caps or all lowercase."""
+    text = re.sub(r"\s+", " ", str(value or "")).strip()
+    if text.isupper() or text.islower():
+        text = text.title()
+    return text
+
+
+@lru_cache(maxsize=4096)
+def normalize_commodity(name: Any) -> str:
+    """Commodity name as the price tools use it."""
+    text = re.sub(r"\s+", " ", str(name or "")).strip()
+    return COMMODITY_ALIASES.get(text.lower()) or _tidy(text)
+
+
+@lru_cache(maxsize=4096)
+def normalize_district(name: Any, state: str = "") -> str:
+    """Current district name, or the tidied export name if it is not in the district table."""
+    text = _tidy(name)
+    return geocode_cache.canonical_district(text, state) or text
+
+
+def _column_map(header: List[Any]) -> Optional[Dict[str, int]]:
+    """Field → column index, or None if this row is not a price table header."""
+    columns: Dict[str, int] = {}
+    for index, cell in enumerate(header):
+        field = HEADER_FIELDS.get(_normalize_header(cell))
+        if field and field not in columns:
+            columns[field] = index
+    required = {"market", "commodity", "date"}
+    if required <= columns.keys() and columns.keys() & {"min_price", "max_price", "modal_price"}:
+        return columns
+    return None
+
+
+def _rows_from_table(cells: Iterator[List[Any]], default_state: str = "", default_district: str = "") -> Iterator[Dict[str, Any]]:
+    """Turn raw table rows into price rows, starting after the first header row found.
+
+    Raises:
+        ValueError: If no row looks like a price table header
+    """
+    columns: Optional[Dict[str, int]] = None
+    header: List[Any] = []
+    for row in cells:
+        if columns is None:
+            columns = _column_map(row)
+            header = row
+            continue
+        if row == header:
+            continue  # header repeated on every page of a report
+        values = {field: row[index] if index < len(row) else None for field, index in columns.items()}
+        state = _tidy(values.get("state") or default_state)
+        yield {
+            "date": str(values.get("date") or "").strip(),
+            "state": state,
+            "district": normalize_district(values.get("district") or default_district, state),
+            "market": _tidy(values.get("market")),
+            "commodity": normalize_commodity(values.get("commodity")),
+            "variety": _tidy(values.get("variety")),
+            "min_price": values.get("min_price"),
+            "max_price": values.get("max_price"),
+            "modal_price": values.get("modal_price"),
+        }
+    if columns is None:
+        raise ValueError("No price table header found (need market, commodity, date and a price column)")
+
+
+class _HTMLTableRows(HTMLParser):
+    """Collects <tr> cell texts as they are parsed; drained after each fed chunk"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows: List[List[str]] = []
+        self._row: Optional[List[str]] = None
+        self._cell: Optional[List[str]] = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "tr":
+            self._row = []
+        elif tag in ("td", "th") and self._row is not None:
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        if tag in ("td", "th") and self._row is not None and self._cell is not None:
+            self._row.append(" ".join("".join(self._cell).split()))
+            self._cell = None
+        elif tag == "tr" and self._row is not None:
+            if self._row:
+                self.rows.append(self._row)
+            self._row = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+def _html_cells(path: str) -> Iterator[List[str]]:
+    parser = _HTMLTableRows()
+    with open(path, "r", encoding="utf-8", errors="replace") as report:
+        while True:
+            chunk = report.read(_HTML_CHUNK_BYTES)
+            if not chunk:
+                break
+            parser.feed(chunk)
+            yield from parser.rows
+            parser.rows.clear()
+    parser.close()
+    yield from parser.rows
+
+
+def rows_from_html(html: str, default_state: str = "", default_district: str = "") -> Iterator[Dict[str, Any]]:
+    """Normalized price rows from an AgMarkNet HTML price table (e.g. a scraped page)."""
+    parser = _HTMLTableRows()
+    parser.feed(html)
+    parser.close()
+    return _rows_from_table(iter(parser.rows), default_state, default_district)
+
+
+def _csv_cells(path: str) -> Iterator[List[str]]:
+    with open(path, "r", encoding="utf-8-sig", errors="replace", newline="") as report:
+        yield from csv.reader(report)
+
+
+def _xlsx_cells(path: str) -> Iterator[List[Any]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RuntimeError("Reading .xlsx files needs openpyxl (pip install openpyxl)")
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            for row in sheet.iter_rows(values_only=True):
+                yield [cell.strftime("%d/%m/%Y") if hasattr(cell, "strftime") else cell for cell in row]
+    finally:
+        workbook.close()
+
+
+def read_price_report(path: str, default_state: str = "", default_district: str = "") -> Iterator[Dict[str, Any]]:
+    """Stream normalized price rows from one AgMarkNet export.
+
+    Args:
+        path: CSV, XLS (HTML) or XLSX file
+        default_state: State for reports without a State column
+        default_district: District for reports without a District column
+
+    Raises:
+        ValueError: For binary (BIFF) .xls files and unsupported extensions
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        cells = _csv_cells(path)
+    elif extension == ".xlsx":
+        cells = _xlsx_cells(path)
+    elif extension in (".xls", ".htm", ".html"):
+        with open(path, "rb") as report:
+            if report.read(4) == b"\xd0\xcf\x11\xe0":
+                raise ValueError("Binary .xls workbooks are not supported; save the report as CSV or XLSX")
+        cells = _html_cells(path)
+    else:
+        raise ValueError(f"Unsupported price report type: {extension}")
+    return _rows_from_table(cells, default_state, default_district)
+
+
+def ingest_file(
+    path: str,
+    store: MandiPriceStore = mandi_price_store,
+    default_state: str = "",
+    default_district: str = "",
+    chunk_rows: int = MANDI_INGEST_CHUNK_ROWS,
+) -> int:
+    """Load one export into the price store, one transaction per chunk of rows.
+
+    Returns:
+        int: Rows stored (incomplete rows are skipped)
+
+    Raises:
+        ValueError: If the file has no recognizable price table
+    """
+    rows = read_price_report(path, default_state, default_district)
+    source = f"agmarknet:{os.path.basename(path)}"
+    written = 0
+    while True:
+        chunk = list(itertools.islice(rows, chunk_rows))
+        if not chunk:
+            break
+        written += store.append_prices(chunk, source=source)
+    return written
+
+
+def _move(path: str, drop_dir: str, subdir: str) -> None:
+    target_dir = os.path.join(drop_dir, subdir)
+    os.makedirs(target_dir, exist_ok=True)
+    target = os.path.join(target_dir, os.path.basename(path))
+    if os.path.exists(target):
+        stem, extension = os.path.splitext(target)
+        target = f"{stem}.{int(time.time())}{extension}"
+    shutil.move(path, target)
+
+
+def ingest_drop_dir(
+    drop_dir: str = MANDI_DROP_DIR,
+    store: MandiPriceStore = mandi_price_store,
+    default_state: str = "",
+    default_district: str = "",
+) -> Dict[str, Any]:
+    """Load every export waiting in the drop directory.
+
+    Returns:
+        Dict[str, Any]: Files loaded and failed, rows written and throughput
+    """
+    os.makedirs(drop_dir, exist_ok=True)
+    started = time.perf_counter()
+    paths = sorted(
+        os.path.join(drop_dir, name) for name in os.listdir(drop_dir)
+        if name.lower().endswith(SUPPORTED_EXTENSIONS) and os.path.isfile(os.path.join(drop_dir, name))
+    )
+    loaded: List[Dict[str, Any]] = []
+    failed: List[Dict[str, Any]] = []
+    for path in paths:
+        file_started = time.perf_counter()
+        try:
+            rows = ingest_file(path, store, default_state, default_district)
+        except Exception as e:
+            logger.error(f"❌ Could not load price report {path}: {e}")
+            failed.append({"file": os.path.basename(path), "error": str(e)})
+            _move(path, drop_dir, "failed")
+            continue
+        loaded.append({"file": os.path.basename(path), "rows": rows,
+                       "seconds": round(time.perf_counter() - file_started, 2)})
+        _move(path, drop_dir, "processed")
+
+    elapsed = time.perf_counter() - started
+    rows = sum(item["rows"] for item in loaded)
+    return {
+        "files_loaded": loaded,
+        "files_failed": failed,
+        "rows": rows,
+        "elapsed_seconds": round(elapsed, 2),
+        "rows_per_second": round(rows / elapsed) if elapsed else 0,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load AgMarkNet price exports into the local mandi price history")
+    parser.add_argument("files", nargs="*", help="exports to load (default: everything in the drop directory)")
+    parser.add_argument("--drop-dir", default=MANDI_DROP_DIR)
+    parser.add_argument("--state", default="", help="state for reports without a State column")
+    parser.add_argument("--district", default="", help="district for reports without a District column")
+    parser.add_argument("--watch", type=int, default=0, metavar="SECONDS",
+                        help="keep polling the drop directory at this interval")
+    args = parser.parse_args()
+
+    if args.files:
+        for file_path in args.files:
+            started = time.perf_counter()
+            count = ingest_file(file_path, default_state=args.state, default_district=args.district)
+            print(f"✅ {file_path}: {count} rows in {time.perf_counter() - started:.1f}s")
+    else:
+        while True:
+            result = ingest_drop_dir(args.drop_dir, default_state=args.state, default_district=args.district)
+            if result["files_loaded"] or result["files_failed"]:
+                print(f"✅ {len(result['files_loaded'])} files, {result['rows']} rows in "
+                      f"{result['elapsed_seconds']}s ({result['rows_per_second']} rows/s)")
+                for failure in result["files_failed"]:
+                    print(f"❌ {failure['file']}: {failure['error']}")
+            if not args.watch:
+                break
+            time.sleep(args.watch)
+    print(f"📊 Price history: {mandi_price_store.stats()}")
@@ -0,0 +1,264 @@
+"""
+Mandi Price History Store for Kisan Mitra
+
+Daily mandi prices (date, state, district, market, commodity, variety, min,
+max, modal) kept in an embedded SQLite database, so the price tools answer
+from local data instead of recomputing estimates on every call. Any source
+can append rows (bulk ingestion, scrapers, APIs); a row is identified by
+(commodity, state, district, market, variety, date), so re-importing a day
+replaces it instead of duplicating it.
+
+Queries return one row per commodity, market and day: the varieties a
+market reports (e.g. Dara and Lokwan wheat) are combined into the lowest
+minimum, the highest maximum and the average modal price.
+
+Both query shapes read only contiguous index ranges:
+
+- the table is clustered on (commodity, state, district, date, market,
+  variety) (WITHOUT ROWID), so "last 30 days of Wheat in Lucknow" is one
+  range scan over adjacent rows
+- a covering index on (state, district, date) that also carries the
+  commodity, market, variety and prices answers "all prices in a district on
+  a date" without touching the table
+
+Names compare case-insensitively; dates are stored as ISO YYYY-MM-DD.
+
+Configuration (environment variables):
+    KISAN_MITRA_MANDI_DB   SQLite file (default data/mandi_prices.db)
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MANDI_DB_PATH = os.getenv("KISAN_MITRA_MANDI_DB", "data/mandi_prices.db")
+
+# Rows per executemany() batch during appends
+APPEND_BATCH_SIZE = 5000
+
+# Date formats seen in tool calls and AgMarkNet exports
+_DATE_FORMATS = ("%Y-%m-%d", "%d-%b-%Y", "%d/%m/%Y", "%d-%m-%Y", "%d %b %Y", "%d-%B-%Y", "%d %B %Y")
+
+_PRICE_COLUMNS = ("min_price", "max_price", "modal_price")
+
+def parse_price_date(value: Union[str, date, datetime]) -> date:
+    """Parse a price date ("2025-01-15", "15-Jan-2025", "15/01/2025", …).
+
+    Raises:
+        ValueError: If the value is not a recognizable date
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized price date: {value!r}")
+
+
+def _clean_name(value: Any) -> str:
+    return re.sub(r"\s+", " ", str(value or "")).strip()
+
+
+def _price(value: Any) -> Optional[float]:
+    """Price in ₹/quintal, or None for blanks and placeholders like "-" or "NR"."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).replace(",", "").strip()
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+class MandiPriceStore:
+    """Append-only (with replace) daily price history in SQLite"""
+
+    def __init__(self, db_path: str = DEFAULT_MANDI_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database lazily and make sure the schema exists (lock held)."""
+        if self._conn is None:
+            db_dir = os.path.dirname(self.db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS mandi_prices (
+                    commodity TEXT NOT NULL COLLATE NOCASE,
+                    state TEXT NOT NULL COLLATE NOCASE,
+                    district TEXT NOT NULL COLLATE NOCASE,
+                    date TEXT NOT NULL,
+                    market TEXT NOT NULL COLLATE NOCASE,
+                    variety TEXT NOT NULL COLLATE NOCASE DEFAULT '',
+                    min_price REAL,
+                    max_price REAL,
+                    modal_price REAL,
+                    source TEXT,
+                    PRIMARY KEY (commodity, state, district, date, market, variety)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_mandi_prices_district_date
+                ON mandi_prices (state, district, date, commodity, market, variety, min_price, max_price, modal_price)
+                """
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def append_prices(self, rows: Iterable[Dict[str, Any]], source: str = "") -> int:
+        """Add or replace price rows in one transaction.
+
+        Each row needs date, state, district, market and commodity, plus any
+        of min_price, max_price and modal_price, and may name a variety.
+        Rows with a bad date, a missing name or no price at all are skipped.
+
+        Args:
+            rows: Price rows (any iterable; consumed in batches)
+            source: Where the rows came from, kept per row (row["source"] wins)
+
+        Returns:
+            int: Number of distinct rows stored (a row repeated in ``rows``
+            replaces its earlier copy and counts once)
+        """
+        stored_keys = set()
+        skipped = 0
+        batch: List[tuple] = []
+        with self._lock:
+            conn = self._connection()
+            try:
+                for row in rows:
+                    try:
+                        day = parse_price_date(row["date"]).isoformat()
+                    except (KeyError, ValueError):
+                        skipped += 1
+                        continue
+                    names = [_clean_name(row.get(key)) for key in ("commodity", "state", "district", "market")]
+                    prices = [_price(row.get(key)) for key in _PRICE_COLUMNS]
+                    if not all(names) or all(price is None for price in prices):
+                        skipped += 1
+                        continue
+                    commodity, state, district, market = names
+                    variety = _clean_name(row.get("variety"))
+                    batch.append((commodity, state, district, day, market, variety, *prices, row.get("source") or source))
+                    stored_keys.add((commodity.lower(), state.lower(), district.lower(), day, market.lower(), variety.lower()))
+                    if len(batch) >= APPEND_BATCH_SIZE:
+                        self._write_batch(conn, batch)
+                        batch = []
+                self._write_batch(conn, batch)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        if skipped:
+            logger.info(f"⚠️ Skipped {skipped} incomplete mandi price rows")
+        return len(stored_keys)
+
+    @staticmethod
+    def _write_batch(conn: sqlite3.Connection, batch: List[tuple]) -> None:
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO mandi_prices
+                (commodity, state, district, date, market, variety, min_price, max_price, modal_price, source)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            batch
+        )
+
+    def price_history(
+        self,
+        commodity: str,
+        district: str,
+        state: str,
+        days: int = 30,
+        end_date: Optional[Union[str, date]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Daily prices of one commodity in a district, oldest first.
+
+        Args:
+            commodity: Commodity name (case-insensitive)
+            district: District name
+            state: State name
+            days: Length of the window ending at end_date (inclusive)
+            end_date: Last day of the window (default today)
+
+        Returns:
+            List[Dict[str, Any]]: One row per market and day (varieties combined)
+        """
+        end = parse_price_date(end_date) if end_date is not None else date.today()
+        start = end - timedelta(days=max(days, 1) - 1)
+        with self._lock:
+            rows = self._connection().execute(
+                """
+                SELECT date, market, MIN(min_price), MAX(max_price), AVG(modal_price)
+                FROM mandi_prices
+                WHERE commodity = ? AND state = ? AND district = ? AND date BETWEEN ? AND ?
+                GROUP BY date, market
+                ORDER BY date, market
+                """,
+                (_clean_name(commodity), _clean_name(state), _clean_name(district), start.isoformat(), end.isoformat())
+            ).fetchall()
+        return [
+            {"date": day, "market": market, "min_price": low, "max_price": high, "modal_price": modal}
+            for day, market, low, high, modal in rows
+        ]
+
+    def prices_on(self, district: str, state: str, day: Union[str, date]) -> List[Dict[str, Any]]:
+        """All commodity prices in a district on one day, varieties combined (covering-index scan)."""
+        with self._lock:
+            rows = self._connection().execute(
+                """
+                SELECT commodity, market, MIN(min_price), MAX(max_price), AVG(modal_price)
+                FROM mandi_prices
+                WHERE state = ? AND district = ? AND date = ?
+                GROUP BY commodity, market
+                ORDER BY commodity, market
+                """,
+                (_clean_name(state), _clean_name(district), parse_price_date(day).isoformat())
+            ).fetchall()
+        return [
+            {"commodity": commodity, "market": market, "min_price": low, "max_price": high, "modal_price": modal}
+            for commodity, market, low, high, modal in rows
+        ]
+
+    def latest_date(self, district: str, state: str, on_or_before: Optional[Union[str, date]] = None) -> Optional[str]:
+        """Most recent ISO date with prices for a district (up to ``on_or_before``)."""
+        end = parse_price_date(on_or_before) if on_or_before is not None else date.max
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT MAX(date) FROM mandi_prices WHERE state = ? AND district = ? AND date <= ?",
+                (_clean_name(state), _clean_name(district), end.isoformat())
+            ).fetchone()
+        return row[0] if row else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rows, first, last = self._connection().execute(
+                "SELECT COUNT(*), MIN(date), MAX(date) FROM mandi_prices"
+            ).fetchone()
+        return {"rows": rows, "first_date": first, "last_date": last}
+
+
+# Global mandi price store instance
+mandi_price_store = MandiPriceStore()
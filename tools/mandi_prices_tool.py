@@ -1,40 +1,56 @@
 """
 Mandi Prices Tool for Kisan Mitra - ADK Compatible
 
-Fetches real-time agricultural market prices from AgMarkNet website.
+Serves agricultural market prices from AgMarkNet data recorded locally.
 Integrates with farmer profile for location-based price queries.
 All functions have NO parameters to be ADK LLM compatible.
 Includes robust timeout handling and fallback mechanisms.
+
+Prices recorded in the local price history (tools.mandi_price_store) are
+served first; regional estimates are only used when no recent data exists.
+AgMarkNet exports are loaded into the history by tools.mandi_ingest. Days
+missing from the history are queued for the background scraper
+(tools.mandi_scraper), so no website is scraped while a farmer waits.
+Each district's daily price table is built once and shared through
+tools.mandi_snapshot_cache.
+
+Configuration (environment variables):
+    MANDI_MAX_DATA_AGE_DAYS   Oldest recorded day served for a requested date (default 3)
 """
 
-import json
 import os
 import time
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 import requests
 from bs4 import BeautifulSoup
+from google.adk.tools import ToolContext
+
+from .geocode_cache import geocode_cache
+from .mandi_price_store import mandi_price_store, parse_price_date
+from .mandi_scraper import mandi_scraper
+from .mandi_snapshot_cache import mandi_snapshot_cache
+from .profile_store import load_profile_data
 
-def get_farmer_mandi_prices() -> Dict[str, Any]:
+MANDI_MAX_DATA_AGE_DAYS = int(os.getenv("MANDI_MAX_DATA_AGE_DAYS", "3"))
+
+def get_farmer_mandi_prices(tool_context: Optional[ToolContext] = None) -> Dict[str, Any]:
     """Get today's mandi prices for farmer's location from profile.
     ADK Compatible - No parameters required.
     
     Returns:
         Dict[str, Any]: Mandi price data for farmer's location
     """
-    profile_path = "context/farmer_profile.json"
-    
     try:
-        # Load farmer profile
-        if not os.path.exists(profile_path):
+        # Load the current farmer's profile
+        try:
+            farmer_data = load_profile_data(tool_context)
+        except FileNotFoundError:
             return {
                 "status": "error",
                 "error_message": "किसान प्रोफाइल नहीं मिली। कृपया पहले प्रोफाइल सेट करें।"
             }
         
-        with open(profile_path, 'r', encoding='utf-8') as f:
-            farmer_data = json.load(f)
-        
         farmer_profile = farmer_data.get('farmer_details', {})
         farmer_location = farmer_profile.get('location_details', {})
         district = farmer_location.get('district', '')
@@ -52,7 +68,7 @@ def get_farmer_mandi_prices() -> Dict[str, Any]:
         date_str = today.strftime("%d-%b-%Y")
         
         # Fetch mandi prices with proper error handling
-        price_data = _fetch_mandi_prices_robust(date_str, district, state)
+        price_data = _get_price_snapshot(date_str, district, state)
         
         # Add farmer context
         price_data["farmer_context"] = {
@@ -70,7 +86,7 @@ def get_farmer_mandi_prices() -> Dict[str, Any]:
             "error_message": f"मंडी भाव प्राप्त करने में त्रुटि: {str(e)}"
         }
 
-def get_mandi_prices_for_date(date: str) -> Dict[str, Any]:
+def get_mandi_prices_for_date(date: str, tool_context: Optional[ToolContext] = None) -> Dict[str, Any]:
     """Get mandi prices for farmer's location on specific date.
     
     Args:
@@ -79,8 +95,6 @@ def get_mandi_prices_for_date(date: str) -> Dict[str, Any]:
     Returns:
         Dict[str, Any]: Mandi price data for specified date
     """
-    profile_path = "context/farmer_profile.json"
-    
     try:
         # Validate date format
         if not _validate_date_format(date):
@@ -89,16 +103,15 @@ def get_mandi_prices_for_date(date: str) -> Dict[str, Any]:
                 "error_message": f"गलत दिनांक प्रारूप। कृपया DD-Mon-YYYY प्रारूप का उपयोग करें (जैसे '25-Dec-2024')। मिला: {date}"
             }
         
-        # Load farmer profile
-        if not os.path.exists(profile_path):
+        # Load the current farmer's profile
+        try:
+            farmer_data = load_profile_data(tool_context)
+        except FileNotFoundError:
             return {
                 "status": "error",
                 "error_message": "किसान प्रोफाइल नहीं मिली। कृपया पहले प्रोफाइल सेट करें।"
             }
         
-        with open(profile_path, 'r', encoding='utf-8') as f:
-            farmer_data = json.load(f)
-        
         farmer_profile = farmer_data.get('farmer_details', {})
         farmer_location = farmer_profile.get('location_details', {})
         district = farmer_location.get('district', '')
@@ -112,7 +125,7 @@ def get_mandi_prices_for_date(date: str) -> Dict[str, Any]:
             }
         
         # Fetch mandi prices for specified date
-        price_data = _fetch_mandi_prices_robust(date, district, state)
+        price_data = _get_price_snapshot(date, district, state)
         
         # Add farmer context
         price_data["farmer_context"] = {
@@ -130,7 +143,7 @@ def get_mandi_prices_for_date(date: str) -> Dict[str, Any]:
             "error_message": f"दिनांक {date} के मंडी भाव प्राप्त करने में त्रुटि: {str(e)}"
         }
 
-def get_commodity_price_info(commodity: str) -> Dict[str, Any]:
+def get_commodity_price_info(commodity: str, tool_context: Optional[ToolContext] = None) -> Dict[str, Any]:
     """Get specific commodity price information for farmer's location.
     
     Args:
@@ -139,19 +152,16 @@ def get_commodity_price_info(commodity: str) -> Dict[str, Any]:
     Returns:
         Dict[str, Any]: Commodity-specific price data
     """
-    profile_path = "context/farmer_profile.json"
-    
     try:
-        # Load farmer profile
-        if not os.path.exists(profile_path):
+        # Load the current farmer's profile
+        try:
+            farmer_data = load_profile_data(tool_context)
+        except FileNotFoundError:
             return {
                 "status": "error",
                 "error_message": "किसान प्रोफाइल नहीं मिली। कृपया पहले प्रोफाइल सेट करें।"
             }
         
-        with open(profile_path, 'r', encoding='utf-8') as f:
-            farmer_data = json.load(f)
-        
         farmer_profile = farmer_data.get('farmer_details', {})
         farmer_location = farmer_profile.get('location_details', {})
         district = farmer_location.get('district', '')
@@ -174,6 +184,82 @@ def get_commodity_price_info(commodity: str) -> Dict[str, Any]:
             "error_message": f"{commodity} की कीमत प्राप्त करने में त्रुटि: {str(e)}"
         }
 
+def get_commodity_price_history(commodity: str, days: int, tool_context: Optional[ToolContext] = None) -> Dict[str, Any]:
+    """Get the recorded price trend of a commodity in the farmer's district.
+    
+    Args:
+        commodity (str): Name of commodity (e.g., "Wheat", "Rice", "Potato")
+        days (int): Number of past days to cover (e.g., 30 for the last month)
+        
+    Returns:
+        Dict[str, Any]: Daily modal prices and the trend over the period
+    """
+    try:
+        try:
+            farmer_data = load_profile_data(tool_context)
+        except FileNotFoundError:
+            return {
+                "status": "error",
+                "error_message": "किसान प्रोफाइल नहीं मिली। कृपया पहले प्रोफाइल सेट करें।"
+            }
+        
+        farmer_location = farmer_data.get('farmer_details', {}).get('location_details', {})
+        district = farmer_location.get('district', '')
+        state = farmer_location.get('state', '')
+        if not district or not state:
+            return {
+                "status": "error",
+                "error_message": "किसान के स्थान की जानकारी प्रोफाइल में नहीं मिली।"
+            }
+        
+        days = max(1, min(int(days), 365))
+        history = mandi_price_store.price_history(commodity, _market_district(district, state), state, days)
+        if not history:
+            return {
+                "status": "error",
+                "error_message": f"{district}, {state} में पिछले {days} दिनों के {commodity} के भाव दर्ज नहीं हैं।"
+            }
+        
+        trend = _summarize_price_history(history)
+        return {
+            "status": "success",
+            "commodity": commodity,
+            "location": f"{district}, {state}",
+            "days": days,
+            **trend,
+            "data_source": "AgMarkNet (local price history)",
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+        
+    except Exception as e:
+        return {
+            "status": "error",
+            "error_message": f"{commodity} के भाव का इतिहास प्राप्त करने में त्रुटि: {str(e)}"
+        }
+
+def _summarize_price_history(history: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Average modal price per day across markets, and the change over the period."""
+    by_day: Dict[str, List[float]] = {}
+    for row in history:
+        if row["modal_price"] is not None:
+            by_day.setdefault(row["date"], []).append(row["modal_price"])
+    daily = [
+        {"date": day, "modal_price": int(round(sum(prices) / len(prices))), "markets": len(prices)}
+        for day, prices in sorted(by_day.items())
+    ]
+    result: Dict[str, Any] = {"daily_prices": daily, "days_with_data": len(daily)}
+    if daily:
+        first, last = daily[0]["modal_price"], daily[-1]["modal_price"]
+        modal_prices = [day["modal_price"] for day in daily]
+        result.update({
+            "first_price": first,
+            "latest_price": last,
+            "lowest_price": min(modal_prices),
+            "highest_price": max(modal_prices),
+            "change_percent": round((last - first) / first * 100, 1) if first else 0.0,
+        })
+    return result
+
 def _validate_date_format(date_str: str) -> bool:
     """Validate date format DD-Mon-YYYY."""
     try:
@@ -182,85 +268,118 @@ def _validate_date_format(date_str: str) -> bool:
     except ValueError:
         return False
 
+def _market_district(district: str, state: str) -> str:
+    """District name the price history is recorded under ("Allahabad" → "Prayagraj")."""
+    return geocode_cache.canonical_district(district, state) or district
+
+def _get_price_snapshot(date: str, district: str, state: str) -> Dict[str, Any]:
+    """Full price table for a district and day, shared through the snapshot cache."""
+    district = _market_district(district, state)
+    return mandi_snapshot_cache.get(
+        state, district, parse_price_date(date),
+        lambda: _fetch_mandi_prices_robust(date, district, state)
+    )
+
 def _fetch_mandi_prices_robust(date: str, district: str, state: str) -> Dict[str, Any]:
     """Robust mandi price fetching with multiple fallback strategies."""
     
-    # Strategy 1: Try API-based approach first (if available)
+    # Strategy 1: Recorded prices from the local price history
+    local_data = None
     try:
-        api_data = _try_api_approach(date, district, state)
-        if api_data and api_data.get("status") == "success":
-            return api_data
+        local_data = _try_local_store(date, district, state)
     except Exception as e:
-        print(f"API approach failed: {e}")
+        print(f"Local price store lookup failed: {e}")
     
-    # Strategy 2: Try web scraping with short timeout
+    # Prices for the date not recorded yet: scrape them in the background for later questions
     try:
-        scraping_data = _try_web_scraping_quick(date, district, state)
-        if scraping_data and scraping_data.get("status") == "success":
-            return scraping_data
+        requested = parse_price_date(date)
+        if requested <= datetime.now().date() and (
+            not local_data or parse_price_date(local_data["price_date"]) != requested
+        ):
+            mandi_scraper.request(state, requested)
     except Exception as e:
-        print(f"Web scraping failed: {e}")
+        print(f"Could not queue mandi scrape: {e}")
+    
+    if local_data and local_data.get("status") == "success":
+        return local_data
     
-    # Strategy 3: Return intelligent fallback data
+    # Strategy 2: Return intelligent fallback data
     return _get_intelligent_fallback_data(date, district, state)
 
-def _try_api_approach(date: str, district: str, state: str) -> Dict[str, Any]:
-    """Try to fetch data via API (placeholder for future API integration)."""
-    # This could be expanded to use government APIs if available
-    # For now, we'll return None to fall back to other methods
-    return None
-
-def _try_web_scraping_quick(date: str, district: str, state: str) -> Dict[str, Any]:
-    """Try web scraping with very short timeout."""
-    try:
-        # Check if playwright is available
-        try:
-            from playwright.sync_api import sync_playwright
-        except ImportError:
-            return None
-        
-        # Quick attempt with minimal timeout
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
-            
-            # Set very aggressive timeout - 3 seconds max
-            page.set_default_timeout(3000)
-            
-            try:
-                # Quick connectivity test
-                page.goto("https://agmarknet.gov.in", timeout=3000)
-                
-                # If we reach here, site is accessible
-                # For now, close browser and return None to use fallback
-                # In future, implement actual scraping logic here
-                browser.close()
-                return None
-                
-            except Exception as e:
-                browser.close()
-                return None
-                
-    except Exception as e:
+def _try_local_store(date: str, district: str, state: str) -> Optional[Dict[str, Any]]:
+    """Serve recorded prices for the date, or the latest day within MANDI_MAX_DATA_AGE_DAYS before it."""
+    requested = parse_price_date(date)
+    district = _market_district(district, state)
+    price_day = mandi_price_store.latest_date(district, state, requested)
+    if price_day is None or (requested - parse_price_date(price_day)).days > MANDI_MAX_DATA_AGE_DAYS:
+        return None
+    
+    price_data: Dict[str, Any] = {}
+    for row in mandi_price_store.prices_on(district, state, price_day):
+        entry = price_data.setdefault(row["commodity"], {
+            "commodity_name": row["commodity"],
+            "markets": [],
+            "price_range": {"min": None, "max": None}
+        })
+        entry["markets"].append({
+            "market_name": row["market"],
+            "min_price": _format_price(row["min_price"]),
+            "max_price": _format_price(row["max_price"]),
+            "modal_price": _format_price(row["modal_price"])
+        })
+        price_range = entry["price_range"]
+        # Every stored row has at least one of the three prices
+        low = next(p for p in (row["min_price"], row["modal_price"], row["max_price"]) if p is not None)
+        high = next(p for p in (row["max_price"], row["modal_price"], row["min_price"]) if p is not None)
+        price_range["min"] = int(low) if price_range["min"] is None else min(price_range["min"], int(low))
+        price_range["max"] = int(high) if price_range["max"] is None else max(price_range["max"], int(high))
+    if not price_data:
         return None
+    
+    price_date = parse_price_date(price_day).strftime("%d-%b-%Y")
+    result = {
+        "status": "success",
+        "date": date,
+        "price_date": price_date,
+        "location": f"{district}, {state}",
+        "price_data": price_data,
+        "summary": _generate_price_summary(price_data),
+        "insights": _generate_regional_insights(price_data, district, state),
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "data_source": "AgMarkNet (local price history)"
+    }
+    if price_date != date:
+        result["note"] = f"{date} के भाव अभी दर्ज नहीं हुए हैं। {price_date} के नवीनतम भाव दिखाए गए हैं।"
+    return result
+
+def _format_price(value: Optional[float]) -> str:
+    """Price as the string the tools return ("2275"), or "NA"."""
+    if value is None:
+        return "NA"
+    return str(int(value)) if float(value).is_integer() else f"{value:.2f}"
 
 def _fetch_commodity_price_robust(commodity: str, date: str, district: str, state: str) -> Dict[str, Any]:
     """Fetch specific commodity price with robust error handling."""
     
-    # Try main approach first
-    main_data = _fetch_mandi_prices_robust(date, district, state)
+    # Read the commodity out of the district's daily snapshot
+    main_data = _get_price_snapshot(date, district, state)
     
     if main_data.get("status") == "success":
         price_data = main_data.get("price_data", {})
-        if commodity in price_data:
-            return {
+        name = next((name for name in price_data if name.lower() == commodity.strip().lower()), None)
+        if name is not None:
+            result = {
                 "status": "success",
-                "commodity": commodity,
+                "commodity": name,
                 "date": date,
                 "location": f"{district}, {state}",
-                "price_info": price_data[commodity],
+                "price_info": price_data[name],
                 "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             }
+            for key in ("price_date", "data_source", "note"):
+                if key in main_data:
+                    result[key] = main_data[key]
+            return result
     
     # Fallback for specific commodity
     return _get_commodity_fallback_data(commodity, date, district, state)
@@ -0,0 +1,366 @@
+"""
+Background AgMarkNet Scraper for Kisan Mitra
+
+Fills gaps in the local mandi price history (tools.mandi_price_store) by
+scraping the AgMarkNet price report, without ever making a farmer wait for a
+browser. The price tools only queue a (state, date) request and answer from
+the data they already have; the scraped prices are there for the next
+question.
+
+One headless Chromium runs in a background thread with its own event loop
+and a fixed number of warm browser contexts, one per worker. Each worker
+takes requests from a bounded queue, so a scrape costs one page load, and
+memory stays bounded however many requests come in (excess requests are
+dropped, repeated ones are merged). A worker's context and page are
+recreated after MANDI_SCRAPER_PAGE_MAX_USES page loads or any failure. A
+health check relaunches the browser if it has crashed, disconnected or
+failed to launch at startup; requests queue up meanwhile. Requests still
+pending when the scraper stops fail instead of hanging, and the next request
+starts it again.
+One report page covers every district of a state, so requests are made per
+(state, date), and a (state, date) is not requested again within
+MANDI_SCRAPER_RETRY_SECONDS unless its last scrape failed. A day counts as
+having no prices only when the report page says so; a page that shows
+neither the table nor that message is a failure.
+
+Configuration (environment variables):
+    MANDI_SCRAPER_ENABLED           Set to "false" to disable (default true; needs playwright)
+    MANDI_SCRAPER_CONTEXTS          Warm browser contexts / workers (default 2)
+    MANDI_SCRAPER_PAGE_MAX_USES     Page loads before a context is recycled (default 50)
+    MANDI_SCRAPER_QUEUE_SIZE        Pending requests kept (default 100)
+    MANDI_SCRAPER_TIMEOUT_SECONDS   Page load timeout (default 30)
+    MANDI_SCRAPER_RETRY_SECONDS     Minimum interval between scrapes of a (state, date) (default 1800)
+    MANDI_SCRAPER_HEALTH_SECONDS    Browser health check interval (default 60)
+    AGMARKNET_BASE_URL              Override the AgMarkNet base URL (e.g. a local mirror)
+
+Usage:
+    python -m tools.mandi_scraper "Uttar Pradesh" 15-Jan-2025
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from datetime import date
+from typing import Any, Dict, Optional, Tuple, Union
+from urllib.parse import urlencode
+
+from .mandi_ingest import rows_from_html
+from .mandi_price_store import MandiPriceStore, mandi_price_store, parse_price_date
+
+logger = logging.getLogger(__name__)
+
+MANDI_SCRAPER_ENABLED = os.getenv("MANDI_SCRAPER_ENABLED", "true").lower() == "true"
+MANDI_SCRAPER_CONTEXTS = int(os.getenv("MANDI_SCRAPER_CONTEXTS", "2"))
+MANDI_SCRAPER_PAGE_MAX_USES = int(os.getenv("MANDI_SCRAPER_PAGE_MAX_USES", "50"))
+MANDI_SCRAPER_QUEUE_SIZE = int(os.getenv("MANDI_SCRAPER_QUEUE_SIZE", "100"))
+MANDI_SCRAPER_TIMEOUT_SECONDS = float(os.getenv("MANDI_SCRAPER_TIMEOUT_SECONDS", "30"))
+MANDI_SCRAPER_RETRY_SECONDS = int(os.getenv("MANDI_SCRAPER_RETRY_SECONDS", "1800"))
+MANDI_SCRAPER_HEALTH_SECONDS = int(os.getenv("MANDI_SCRAPER_HEALTH_SECONDS", "60"))
+AGMARKNET_BASE_URL = os.getenv("AGMARKNET_BASE_URL", "https://agmarknet.gov.in").rstrip("/")
+
+PRICE_TABLE_SELECTOR = "#cphBody_GridPriceData"
+# Shown by the report page instead of the table when nothing was reported
+NO_DATA_TEXT = "No Data Found"
+
+# AgMarkNet state codes used in report URLs
+AGMARKNET_STATE_CODES = {
+    "Andhra Pradesh": "AP", "Assam": "AS", "Bihar": "BI", "Chattisgarh": "CG", "Chhattisgarh": "CG",
+    "Gujarat": "GJ", "Haryana": "HR", "Himachal Pradesh": "HP", "Jammu and Kashmir": "JK",
+    "Jharkhand": "JR", "Karnataka": "KK", "Kerala": "KL", "Madhya Pradesh": "MP",
+    "Maharashtra": "MH", "Odisha": "OR", "Punjab": "PB", "Rajasthan": "RJ", "Tamil Nadu": "TN",
+    "Telangana": "TL", "Uttar Pradesh": "UP", "Uttarakhand": "UC", "West Bengal": "WB",
+}
+
+# Blocked while scraping: the report only needs the HTML
+_BLOCKED_RESOURCE_TYPES = {"image", "media", "font", "stylesheet"}
+
+_Job = Tuple[str, str]  # (state, ISO date)
+
+
+async def _skip_heavy_resources(route) -> None:
+    if route.request.resource_type in _BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def _close_quietly(context) -> None:
+    try:
+        await context.close()
+    except Exception:
+        pass
+
+
+def report_url(state: str, day: date) -> str:
+    """AgMarkNet price report URL for all commodities and markets of a state on one day."""
+    day_text = day.strftime("%d-%b-%Y")
+    query = {
+        "Tx_Commodity": "0", "Tx_State": AGMARKNET_STATE_CODES[state], "Tx_District": "0", "Tx_Market": "0",
+        "DateFrom": day_text, "DateTo": day_text, "Fr_Date": day_text, "To_Date": day_text,
+        "Tx_Trend": "0", "Tx_CommodityHead": "--Select--", "Tx_StateHead": state,
+        "Tx_DistrictHead": "--Select--", "Tx_MarketHead": "--Select--",
+    }
+    return f"{AGMARKNET_BASE_URL}/SearchCmmMkt.aspx?{urlencode(query)}"
+
+
+class MandiScraper:
+    """Pool of warm Playwright browser contexts fed from a bounded request queue"""
+
+    def __init__(
+        self,
+        store: MandiPriceStore = mandi_price_store,
+        contexts: int = MANDI_SCRAPER_CONTEXTS,
+        page_max_uses: int = MANDI_SCRAPER_PAGE_MAX_USES,
+        queue_size: int = MANDI_SCRAPER_QUEUE_SIZE,
+        timeout_seconds: float = MANDI_SCRAPER_TIMEOUT_SECONDS,
+        retry_seconds: int = MANDI_SCRAPER_RETRY_SECONDS,
+        health_seconds: int = MANDI_SCRAPER_HEALTH_SECONDS,
+        enabled: bool = MANDI_SCRAPER_ENABLED,
+    ):
+        self.store = store
+        self.contexts = max(1, contexts)
+        self.page_max_uses = page_max_uses
+        self.queue_size = queue_size
+        self.timeout_seconds = timeout_seconds
+        self.retry_seconds = retry_seconds
+        self.health_seconds = health_seconds
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._ready = threading.Event()
+        self._pending: Dict[_Job, Future] = {}
+        self._attempted: Dict[_Job, float] = {}
+        self._playwright = None
+        self._browser = None
+        self._browser_lock: Optional[asyncio.Lock] = None
+        self._generation = 0  # bumped on every browser launch; older contexts are recycled
+        self.browser_launches = 0
+        self.contexts_created = 0
+        self.pages_loaded = 0
+        self.rows_written = 0
+        self.failures = 0
+        self.dropped = 0
+
+    def _start(self) -> bool:
+        """Start the background thread if it is not running (lock held); False if scraping is unavailable."""
+        if self._thread is not None and self._thread.is_alive():
+            return self._loop is not None
+        try:
+            import playwright.async_api  # noqa: F401
+        except ImportError:
+            logger.warning("⚠️ playwright is not installed; mandi scraping disabled")
+            self.enabled = False
+            return False
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run_loop, name="mandi-scraper", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self._loop is not None
+
+    def _run_loop(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._loop = loop
+        self._ready.set()
+        try:
+            loop.run_until_complete(self._run())
+        except Exception as e:
+            logger.error(f"❌ Mandi scraper stopped: {e}")
+        finally:
+            with self._lock:
+                self._loop = None
+                self._queue = None
+                pending = list(self._pending.values())
+                self._pending.clear()
+                self._attempted.clear()
+            for future in pending:
+                if not future.done():
+                    future.set_exception(RuntimeError("mandi scraper stopped"))
+            loop.close()
+
+    async def _run(self) -> None:
+        from playwright.async_api import async_playwright
+
+        async with async_playwright() as playwright:
+            self._playwright = playwright
+            self._browser_lock = asyncio.Lock()
+            try:
+                await self._ensure_browser()
+            except Exception as e:
+                # Workers and the health check keep retrying; requests wait in the queue
+                logger.error(f"❌ Mandi scraper browser launch failed: {e}")
+            workers = [asyncio.ensure_future(self._worker(index)) for index in range(self.contexts)]
+            try:
+                await self._health_loop()
+            finally:
+                for worker in workers:
+                    worker.cancel()
+                if self._browser is not None:
+                    await _close_quietly(self._browser)
+                    self._browser = None
+
+    async def _ensure_browser(self):
+        """Return a connected browser, launching a new one if needed (one launch at a time)."""
+        async with self._browser_lock:
+            if self._browser is None or not self._browser.is_connected():
+                if self._browser is not None:
+                    logger.warning("⚠️ Mandi scraper browser disconnected; relaunching")
+                    await _close_quietly(self._browser)
+                    self._browser = None
+                self._browser = await self._playwright.chromium.launch(headless=True)
+                self._generation += 1
+                self.browser_launches += 1
+            return self._browser
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_seconds)
+            try:
+                await self._ensure_browser()
+            except Exception as e:
+                logger.error(f"❌ Mandi scraper browser launch failed: {e}")
+            cutoff = time.time() - self.retry_seconds
+            with self._lock:
+                for job in [job for job, attempted_at in self._attempted.items() if attempted_at < cutoff]:
+                    del self._attempted[job]
+
+    async def _new_page(self):
+        """Fresh context and page on the current browser."""
+        browser = await self._ensure_browser()
+        context = await browser.new_context(java_script_enabled=True)
+        await context.route("**/*", _skip_heavy_resources)
+        page = await context.new_page()
+        page.set_default_timeout(self.timeout_seconds * 1000)
+        self.contexts_created += 1
+        return context, page, self._generation
+
+    async def _worker(self, index: int) -> None:
+        context = page = None
+        generation = uses = 0
+        while True:
+            try:
+                if page is None:
+                    # Warm the context before the next request arrives
+                    context, page, generation = await self._new_page()
+                    uses = 0
+            except Exception as e:
+                logger.error(f"❌ Mandi scraper worker {index} could not open a page: {e}")
+                await asyncio.sleep(5)
+                continue
+
+            job = await self._queue.get()
+            state, day = job
+            future = self._pending.get(job)
+            try:
+                if generation != self._generation or page.is_closed():
+                    # The browser was relaunched while this page sat idle
+                    await _close_quietly(context)
+                    context, page, generation = await self._new_page()
+                    uses = 0
+                rows = await self._scrape(page, state, parse_price_date(day))
+                uses += 1
+                written = await asyncio.to_thread(self.store.append_prices, rows, "agmarknet:scraper")
+                self.rows_written += written
+                logger.info(f"✅ Scraped {written} mandi prices for {state} on {day}")
+                if future is not None:
+                    future.set_result(written)
+            except Exception as e:
+                self.failures += 1
+                logger.warning(f"⚠️ Mandi scrape failed for {state} on {day}: {e}")
+                if future is not None:
+                    future.set_exception(e)
+                with self._lock:
+                    self._attempted.pop(job, None)  # the next question may retry
+                uses = self.page_max_uses  # recycle after a failure
+            finally:
+                with self._lock:
+                    self._pending.pop(job, None)
+                self._queue.task_done()
+
+            if uses >= self.page_max_uses or generation != self._generation or page.is_closed():
+                await _close_quietly(context)
+                context = page = None
+
+    async def _scrape(self, page, state: str, day: date) -> list:
+        """Load the report page and parse its price table."""
+        await page.goto(report_url(state, day), wait_until="domcontentloaded")
+        self.pages_loaded += 1
+        # A timeout here (slow or broken page) propagates and counts as a failure
+        await page.wait_for_selector(f'{PRICE_TABLE_SELECTOR}, :text("{NO_DATA_TEXT}")')
+        if await page.query_selector(PRICE_TABLE_SELECTOR) is None:
+            return []  # the page says no prices were reported for that day
+        html = await page.eval_on_selector(PRICE_TABLE_SELECTOR, "table => table.outerHTML")
+        return list(rows_from_html(html, default_state=state))
+
+    def request(self, state: str, day: Union[str, date], force: bool = False) -> Optional[Future]:
+        """Queue a scrape of a state's prices for one day without waiting for it.
+
+        Returns:
+            Optional[Future]: Resolves to the number of rows written, or None
+            if scraping is disabled, the state is unknown, the (state, date)
+            was tried recently or the queue is full
+        """
+        if not self.enabled or state not in AGMARKNET_STATE_CODES:
+            return None
+        job = (state, parse_price_date(day).isoformat())
+        with self._lock:
+            if not self._start():
+                return None
+            if job in self._pending:
+                return self._pending[job]
+            if not force and time.time() - self._attempted.get(job, 0) < self.retry_seconds:
+                return None
+            future: Future = Future()
+            self._pending[job] = future
+            self._attempted[job] = time.time()
+            # Scheduled under the lock, so a stopping loop fails the future instead of dropping the job
+            self._loop.call_soon_threadsafe(self._enqueue, job, future)
+        return future
+
+    def _enqueue(self, job: _Job, future: Future) -> None:
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            with self._lock:
+                self._pending.pop(job, None)
+                self._attempted.pop(job, None)
+            future.set_exception(RuntimeError("mandi scrape queue is full"))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "running": self._loop is not None,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "pending": len(self._pending),
+            "browser_launches": self.browser_launches,
+            "contexts_created": self.contexts_created,
+            "pages_loaded": self.pages_loaded,
+            "rows_written": self.rows_written,
+            "failures": self.failures,
+            "dropped": self.dropped,
+        }
+
+
+# Global mandi scraper instance
+mandi_scraper = MandiScraper()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 3:
+        print('Usage: python -m tools.mandi_scraper "Uttar Pradesh" 15-Jan-2025')
+        sys.exit(1)
+    pending = mandi_scraper.request(sys.argv[1], sys.argv[2], force=True)
+    if pending is None:
+        print("❌ Scraping unavailable (playwright missing, disabled, or unknown state)")
+        sys.exit(1)
+    print(f"✅ {pending.result(timeout=MANDI_SCRAPER_TIMEOUT_SECONDS * 3)} rows written")
+    print(f"📊 {mandi_scraper.stats()}")
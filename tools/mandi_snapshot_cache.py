@@ -0,0 +1,123 @@
+"""
+Daily Mandi Price Snapshot Cache for Kisan Mitra
+
+Mandi prices for a district change at most a few times a day, so the
+complete price table built for a (state, district, date) is kept as a
+snapshot and shared by every farmer in that district. Concurrent requests
+for a snapshot that is being built wait for that one build instead of
+starting their own. Commodity questions read their commodity out of the
+snapshot.
+
+Snapshots of past days built from prices recorded for exactly that day
+never change and are kept until evicted. Everything else (today, and
+estimates or an earlier day standing in for a day not yet recorded) is
+rebuilt after MANDI_SNAPSHOT_TTL_SECONDS, so newly ingested or scraped
+prices show up.
+
+Configuration (environment variables):
+    MANDI_SNAPSHOT_TTL_SECONDS   Freshness of today's and stand-in snapshots (default 900)
+    MANDI_SNAPSHOT_MAX_ENTRIES   Snapshots kept in memory (default 5000)
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import date
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .mandi_price_store import parse_price_date
+
+logger = logging.getLogger(__name__)
+
+MANDI_SNAPSHOT_TTL_SECONDS = int(os.getenv("MANDI_SNAPSHOT_TTL_SECONDS", "900"))
+MANDI_SNAPSHOT_MAX_ENTRIES = int(os.getenv("MANDI_SNAPSHOT_MAX_ENTRIES", "5000"))
+
+SnapshotKey = Tuple[str, str, str]  # (state, district, ISO date), lowercased names
+
+
+class MandiSnapshotCache:
+    """LRU of per-district daily price snapshots with request coalescing"""
+
+    def __init__(self, ttl_seconds: int = MANDI_SNAPSHOT_TTL_SECONDS, max_entries: int = MANDI_SNAPSHOT_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # key → (snapshot, expires_at or None for never)
+        self._entries: "OrderedDict[SnapshotKey, Tuple[Dict[str, Any], Optional[float]]]" = OrderedDict()
+        self._in_flight: Dict[SnapshotKey, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def key_for(state: str, district: str, day: date) -> SnapshotKey:
+        return state.strip().lower(), district.strip().lower(), day.isoformat()
+
+    def _expires_at(self, day: date, snapshot: Dict[str, Any]) -> Optional[float]:
+        """None (keep) for a past day with prices recorded for that day, else now + TTL."""
+        price_date = snapshot.get("price_date")
+        recorded_for_day = price_date is not None and parse_price_date(price_date) == day
+        if day < date.today() and recorded_for_day:
+            return None
+        return time.time() + self.ttl_seconds
+
+    def get(self, state: str, district: str, day: date, build: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Return the snapshot for a district and day, building it at most once at a time.
+
+        Args:
+            state: State name
+            district: District name
+            day: Price date
+            build: Builds the full price table; raises on failure
+
+        Returns:
+            Dict[str, Any]: A shallow copy callers may add top-level keys to
+
+        Raises:
+            Whatever ``build`` raises
+        """
+        key = self.key_for(state, district, day)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > time.time()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry[0])
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if owner:
+            try:
+                snapshot = build()
+                expires_at = self._expires_at(day, snapshot)
+                with self._lock:
+                    if snapshot.get("status") == "success":
+                        self._entries[key] = (snapshot, expires_at)
+                        self._entries.move_to_end(key)
+                        while len(self._entries) > self.max_entries:
+                            self._entries.popitem(last=False)
+                future.set_result(snapshot)
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._in_flight.pop(key, None)
+        return dict(future.result())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = len(self._entries)
+        return {"entries": entries, "hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
+
+
+# Global mandi snapshot cache instance
+mandi_snapshot_cache = MandiSnapshotCache()
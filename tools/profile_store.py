@@ -0,0 +1,412 @@
+"""
+Farmer Profile Store for Kisan Mitra
+
+Multi-tenant farmer profiles keyed by WhatsApp phone number, which is the
+userId the WhatsApp gateway passes to the ADK API server. Profiles live in an
+embedded SQLite database with an in-memory LRU cache in front of it. A cache
+hit only checks SQLite's data_version, so profiles written by another process
+(the import CLI, the ADK server, the gateway) are picked up on the next read.
+A farmer without a stored profile gets ProfileNotFoundError, never someone
+else's profile.
+
+The single default profile file is used outside an ADK call (CLI, scripts)
+and for ADK users whose id is not a phone number ("user" in `adk web`). On
+first run it is also stored under its own mobile number, so a single-farmer
+WhatsApp install keeps working without an import.
+
+This module is the single profile-access layer for all tools: profiles are
+parsed and validated once (file profiles are memoized on file identity and
+mtime) and handed out as shared read-only views.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+DEFAULT_PROFILE_PATH = "context/farmer_profile.json"
+DEFAULT_PROFILE_DB_PATH = os.getenv("KISAN_MITRA_PROFILE_DB", "data/farmer_profiles.db")
+PROFILE_CACHE_SIZE = int(os.getenv("KISAN_MITRA_PROFILE_CACHE_SIZE", "10000"))
+
+
+class ProfileNotFoundError(FileNotFoundError):
+    """The farmer behind an ADK call has no stored profile"""
+
+    def __init__(self, farmer_id: Optional[str]):
+        super().__init__(f"No farmer profile stored for {farmer_id or 'this user'}")
+        self.farmer_id = farmer_id
+
+
+class _ReadOnlyDict(dict):
+    """Immutable dict view of a parsed profile (still JSON-serializable)"""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Farmer profile views are read-only; use copy() to modify")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+    __ior__ = _readonly
+
+    def copy(self) -> Dict[str, Any]:
+        """Return a mutable deep copy."""
+        return thaw_profile(self)
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> Dict[str, Any]:
+        return thaw_profile(self)
+
+    def __reduce__(self):
+        return (_ReadOnlyDict, (dict(self),))
+
+
+def freeze_profile(value: Any) -> Any:
+    """Recursively convert parsed JSON into read-only dicts and tuples."""
+    if isinstance(value, dict):
+        return _ReadOnlyDict((key, freeze_profile(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze_profile(item) for item in value)
+    return value
+
+
+def thaw_profile(value: Any) -> Any:
+    """Return a mutable deep copy of a (possibly frozen) profile."""
+    if isinstance(value, dict):
+        return {key: thaw_profile(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw_profile(item) for item in value]
+    return value
+
+
+def _validate_profile(profile_data: Any) -> None:
+    """Check the minimum structure every profile-reading tool relies on.
+
+    Raises:
+        KeyError: If 'farmer_details' is missing
+    """
+    if not isinstance(profile_data, dict) or 'farmer_details' not in profile_data:
+        raise KeyError("'farmer_details' not found in profile JSON.")
+
+
+def normalize_farmer_id(farmer_id: str) -> str:
+    """Normalize a phone number / ADK userId into a profile store key.
+
+    "whatsapp:+91 98765-43210" and "+91-9876543210" both become "+919876543210".
+    """
+    value = str(farmer_id).strip()
+    if value.lower().startswith("whatsapp:"):
+        value = value[len("whatsapp:"):]
+    digits = "".join(ch for ch in value if ch.isdigit())
+    if not digits:
+        return value
+    return f"+{digits}" if value.startswith("+") else digits
+
+
+class FarmerProfileStore:
+    """SQLite-backed farmer profile store with an LRU cache in front"""
+
+    def __init__(self, db_path: str = DEFAULT_PROFILE_DB_PATH, cache_size: int = PROFILE_CACHE_SIZE):
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._data_version: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database lazily and make sure the schema exists."""
+        if self._conn is None:
+            db_dir = os.path.dirname(self.db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS farmer_profiles (
+                    farmer_id TEXT PRIMARY KEY,
+                    profile_json TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+                """
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _sync_cache(self) -> None:
+        """Drop cached profiles once another connection has committed to the database."""
+        version = self._connection().execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._cache.clear()
+            self._data_version = version
+
+    def _cache_put(self, key: str, value: Dict[str, Any]) -> None:
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def get(self, farmer_id: str) -> Optional[Dict[str, Any]]:
+        """Return the stored profile (read-only view) for a farmer, or None if unknown."""
+        key = normalize_farmer_id(farmer_id)
+        with self._lock:
+            self._sync_cache()
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+            row = self._connection().execute(
+                "SELECT profile_json FROM farmer_profiles WHERE farmer_id = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            profile = freeze_profile(json.loads(row[0]))
+            self._cache_put(key, profile)
+            return profile
+
+    def put(self, farmer_id: str, profile_data: Dict[str, Any]) -> None:
+        """Insert or replace a farmer's profile.
+
+        Raises:
+            KeyError: If the profile has no 'farmer_details'
+        """
+        _validate_profile(profile_data)
+        key = normalize_farmer_id(farmer_id)
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO farmer_profiles (farmer_id, profile_json, updated_at) VALUES (?, ?, ?)",
+                (key, json.dumps(profile_data, ensure_ascii=False), datetime.now().isoformat())
+            )
+            conn.commit()
+            self._cache_put(key, freeze_profile(profile_data))
+
+    def delete(self, farmer_id: str) -> bool:
+        """Delete a farmer's profile. Returns True if a profile was removed."""
+        key = normalize_farmer_id(farmer_id)
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute("DELETE FROM farmer_profiles WHERE farmer_id = ?", (key,))
+            conn.commit()
+            self._cache.pop(key, None)
+            return cursor.rowcount > 0
+
+    def count(self) -> int:
+        """Return the number of stored profiles."""
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM farmer_profiles").fetchone()[0]
+
+    def iter_locations(self, batch_size: int = 1000) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (farmer_id, location) for every stored profile.
+
+        Only the location fields are extracted, inside SQLite, so large stores
+        are scanned without parsing whole profiles. location has the keys
+        latitude, longitude, district and state (any may be None).
+        """
+        last_id = ""
+        while True:
+            with self._lock:
+                rows = self._connection().execute(
+                    """
+                    SELECT farmer_id,
+                           json_extract(profile_json, '$.farmer_details.location_details.coordinates.latitude'),
+                           json_extract(profile_json, '$.farmer_details.location_details.coordinates.longitude'),
+                           json_extract(profile_json, '$.farmer_details.location_details.district'),
+                           json_extract(profile_json, '$.farmer_details.location_details.state')
+                    FROM farmer_profiles WHERE farmer_id > ? ORDER BY farmer_id LIMIT ?
+                    """,
+                    (last_id, batch_size)
+                ).fetchall()
+            for farmer_id, latitude, longitude, district, state in rows:
+                yield farmer_id, {"latitude": latitude, "longitude": longitude, "district": district, "state": state}
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][0]
+
+    def import_directory(self, directory: str) -> Dict[str, Any]:
+        """Bulk import every *.json profile in a directory in one transaction.
+
+        Each profile is keyed by farmer_details.personal_info.mobile_number,
+        falling back to the file name (without extension).
+
+        Args:
+            directory (str): Directory containing farmer profile JSON files
+
+        Returns:
+            Dict[str, Any]: Import summary with imported count and per-file errors
+        """
+        rows = []
+        errors = []
+        now = datetime.now().isoformat()
+
+        for file_name in sorted(os.listdir(directory)):
+            if not file_name.endswith(".json"):
+                continue
+            file_path = os.path.join(directory, file_name)
+            try:
+                with open(file_path, 'r', encoding='utf-8') as file:
+                    profile_data = json.load(file)
+                _validate_profile(profile_data)
+                mobile = profile_data['farmer_details'].get('personal_info', {}).get('mobile_number')
+                key = normalize_farmer_id(mobile or os.path.splitext(file_name)[0])
+                rows.append((key, json.dumps(profile_data, ensure_ascii=False), now))
+            except Exception as e:
+                errors.append({"file": file_name, "error": str(e)})
+
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO farmer_profiles (farmer_id, profile_json, updated_at) VALUES (?, ?, ?)",
+                    rows
+                )
+            # Drop any stale cached entries for the imported farmers
+            for key, _, _ in rows:
+                self._cache.pop(key, None)
+
+        return {
+            "status": "success" if not errors else "partial",
+            "imported": len(rows),
+            "errors": errors
+        }
+
+
+_profile_store: Optional[FarmerProfileStore] = None
+_profile_store_lock = threading.Lock()
+
+
+def get_profile_store() -> FarmerProfileStore:
+    """Return the process-wide farmer profile store."""
+    global _profile_store
+    if _profile_store is None:
+        with _profile_store_lock:
+            if _profile_store is None:
+                store = FarmerProfileStore()
+                _seed_default_profile(store)
+                _profile_store = store
+    return _profile_store
+
+
+def _seed_default_profile(store: FarmerProfileStore, profile_path: str = DEFAULT_PROFILE_PATH) -> None:
+    """Store the default profile under its mobile number if the store is still empty."""
+    if store.count() or not os.path.exists(profile_path):
+        return
+    try:
+        profile_data = _load_profile_file(profile_path)
+    except (OSError, ValueError, KeyError):
+        return
+    mobile = profile_data['farmer_details'].get('personal_info', {}).get('mobile_number')
+    if mobile:
+        store.put(mobile, thaw_profile(profile_data))
+
+
+def is_phone_farmer_id(farmer_id: str) -> bool:
+    """True for ids the WhatsApp gateway sends (phone numbers), False for local ADK users like "user"."""
+    return any(ch.isdigit() for ch in str(farmer_id))
+
+
+def resolve_farmer_id(tool_context: Any = None) -> Optional[str]:
+    """Resolve the current farmer's id (ADK userId) from an ADK ToolContext."""
+    if tool_context is None:
+        return None
+    user_id = getattr(tool_context, "user_id", None)
+    if not user_id:
+        invocation_context = getattr(tool_context, "_invocation_context", None)
+        user_id = getattr(invocation_context, "user_id", None)
+    return user_id or None
+
+
+_file_profiles: Dict[str, Any] = {}
+_file_profiles_lock = threading.Lock()
+
+
+def _load_profile_file(profile_path: str) -> Dict[str, Any]:
+    """Parse and validate a profile file, memoized on file identity and mtime.
+
+    Raises:
+        FileNotFoundError: If the profile file is missing
+        json.JSONDecodeError: If the profile file is not valid JSON
+        KeyError: If the profile has no 'farmer_details'
+    """
+    stat = os.stat(profile_path)
+    identity = (stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    key = os.path.abspath(profile_path)
+
+    cached = _file_profiles.get(key)
+    if cached is not None and cached[0] == identity:
+        return cached[1]
+
+    with _file_profiles_lock:
+        cached = _file_profiles.get(key)
+        if cached is not None and cached[0] == identity:
+            return cached[1]
+
+        with open(profile_path, 'r', encoding='utf-8') as file:
+            profile_data = json.load(file)
+        _validate_profile(profile_data)
+
+        profile = freeze_profile(profile_data)
+        _file_profiles[key] = (identity, profile)
+        return profile
+
+
+def load_profile_for_farmer(farmer_id: Optional[str], profile_path: str = DEFAULT_PROFILE_PATH) -> Dict[str, Any]:
+    """Load the profile JSON for a farmer id (phone number).
+
+    Without a farmer id (CLI, scripts) the default profile file is loaded. The
+    result is a shared read-only view; use thaw_profile() for a mutable copy.
+
+    Raises:
+        ProfileNotFoundError: If the farmer has no stored profile
+        FileNotFoundError: If no farmer id is given and the file is missing
+        json.JSONDecodeError: If the default profile file is not valid JSON
+        KeyError: If the profile has no 'farmer_details'
+    """
+    if farmer_id:
+        profile_data = get_profile_store().get(farmer_id)
+        if profile_data is None:
+            raise ProfileNotFoundError(farmer_id)
+        return profile_data
+
+    return _load_profile_file(profile_path)
+
+
+def load_profile_data(tool_context: Any = None, profile_path: str = DEFAULT_PROFILE_PATH) -> Dict[str, Any]:
+    """Load the profile JSON for the farmer behind the current ADK call.
+
+    Looks the farmer up in the profile store by ADK userId. The default
+    profile file is used when there is no tool context (CLI, tests) or the
+    userId is not a phone number (`adk web`); an unknown phone number never
+    gets another farmer's profile.
+
+    Raises:
+        ProfileNotFoundError: If the farmer has no stored profile
+        FileNotFoundError: If the default profile file is used and missing
+        json.JSONDecodeError: If the default profile file is not valid JSON
+        KeyError: If the profile has no 'farmer_details'
+    """
+    if tool_context is None:
+        return load_profile_for_farmer(None, profile_path)
+    farmer_id = resolve_farmer_id(tool_context)
+    if not farmer_id:
+        raise ProfileNotFoundError(None)
+    if not is_phone_farmer_id(farmer_id):
+        return load_profile_for_farmer(None, profile_path)
+    return load_profile_for_farmer(farmer_id, profile_path)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 2:
+        print("Usage: python -m tools.profile_store <profiles_directory>")
+        sys.exit(1)
+
+    result = get_profile_store().import_directory(sys.argv[1])
+    print(f"✅ Imported {result['imported']} farmer profiles into {DEFAULT_PROFILE_DB_PATH}")
+    for error in result["errors"]:
+        print(f"❌ {error['file']}: {error['error']}")
@@ -0,0 +1,207 @@
+"""
+Text-to-Speech Audio Cache for Kisan Mitra
+
+Content-addressed on-disk cache of synthesized speech. Entries are keyed by a
+SHA-256 of (normalized text, voice id, model id, voice settings) and stored as
+raw MP3 bytes, so repeated phrases (error messages, common advisories) are
+served without an ElevenLabs call. The cache is bounded in size and evicts
+least recently used files, using file mtime as the access time.
+
+Configuration (environment variables):
+    KISAN_MITRA_TTS_CACHE_DIR     Cache directory (default data/tts_cache)
+    KISAN_MITRA_TTS_CACHE_MAX_MB  Size limit in MB (default 512)
+
+Usage:
+    python -m tools.tts_cache warm <phrases.txt> [language ...]
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import unicodedata
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+TTS_CACHE_DIR = os.getenv("KISAN_MITRA_TTS_CACHE_DIR", "data/tts_cache")
+TTS_CACHE_MAX_BYTES = int(float(os.getenv("KISAN_MITRA_TTS_CACHE_MAX_MB", "512")) * 1024 * 1024)
+
+# Evict down to this fraction of the limit so eviction does not run on every put
+_EVICT_TARGET_RATIO = 0.9
+_AUDIO_SUFFIX = ".mp3"
+
+
+def normalize_tts_text(text: str) -> str:
+    """Normalize text so trivially different strings share a cache entry."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text or "")).strip()
+
+
+def tts_cache_key(text: str, voice_id: str, model_id: str, voice_settings: Optional[Dict[str, Any]] = None) -> str:
+    """Return the content address for a synthesis request."""
+    payload = json.dumps(
+        {
+            "text": normalize_tts_text(text),
+            "voice_id": voice_id,
+            "model_id": model_id,
+            "voice_settings": voice_settings or {},
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TtsAudioCache:
+    """Size-bounded LRU cache of MP3 audio on disk"""
+
+    def __init__(self, cache_dir: str = TTS_CACHE_DIR, max_bytes: int = TTS_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + _AUDIO_SUFFIX)
+
+    def _scan(self):
+        """Yield (path, size, mtime) for every cached file."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for root, _, files in os.walk(self.cache_dir):
+            for file_name in files:
+                if not file_name.endswith(_AUDIO_SUFFIX):
+                    continue
+                path = os.path.join(root, file_name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return cached audio bytes and mark the entry as recently used."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as file:
+                audio = file.read()
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return audio
+
+    def put(self, key: str, audio: bytes) -> None:
+        """Store audio bytes atomically, evicting old entries if over the limit."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(audio)
+            try:
+                previous_size = os.path.getsize(path)
+            except FileNotFoundError:
+                previous_size = 0
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._scan())
+            else:
+                self._total_bytes += len(audio) - previous_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Delete least recently used files until under the target size (lock held)."""
+        entries = sorted(self._scan(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * _EVICT_TARGET_RATIO)
+        removed = 0
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except FileNotFoundError:
+                total -= size
+        self._total_bytes = total
+        logger.info(f"🧹 TTS cache evicted {removed} files, {total / 1024 / 1024:.1f} MB left")
+
+    def warm_up(self, phrases: Iterable[str], synthesize: Callable[[str], Optional[bytes]],
+                key_for: Callable[[str], str]) -> Dict[str, int]:
+        """Pre-synthesize canned phrases that are not cached yet.
+
+        Args:
+            phrases: Phrases to cache
+            synthesize: Returns MP3 bytes for a phrase (calls the TTS API directly)
+            key_for: Returns the cache key for a phrase
+
+        Returns:
+            Dict[str, int]: Counts of phrases already cached, synthesized and failed
+        """
+        summary = {"cached": 0, "synthesized": 0, "failed": 0}
+        for phrase in phrases:
+            phrase = normalize_tts_text(phrase)
+            if not phrase:
+                continue
+            key = key_for(phrase)
+            if os.path.exists(self._path(key)):
+                summary["cached"] += 1
+                continue
+            audio = synthesize(phrase)
+            if audio:
+                self.put(key, audio)
+                summary["synthesized"] += 1
+            else:
+                summary["failed"] += 1
+        return summary
+
+    def stats(self) -> Dict[str, Any]:
+        entries = list(self._scan())
+        return {
+            "directory": self.cache_dir,
+            "entries": len(entries),
+            "size_mb": round(sum(size for _, size, _ in entries) / 1024 / 1024, 2),
+            "max_mb": round(self.max_bytes / 1024 / 1024, 2),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Global TTS cache instance
+tts_cache = TtsAudioCache()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 3 or sys.argv[1] != "warm":
+        print("Usage: python -m tools.tts_cache warm <phrases.txt> [language ...]")
+        sys.exit(1)
+
+    from tools.voice_processing_tool import warm_voice_cache
+
+    with open(sys.argv[2], "r", encoding="utf-8") as phrase_file:
+        canned_phrases = [line.strip() for line in phrase_file if line.strip()]
+    languages = sys.argv[3:] or ["hindi"]
+
+    started = time.perf_counter()
+    for language in languages:
+        result = warm_voice_cache(canned_phrases, language)
+        print(f"✅ {language}: {result['synthesized']} synthesized, {result['cached']} already cached, {result['failed']} failed")
+    print(f"⏱️ Done in {time.perf_counter() - started:.1f}s — {tts_cache.stats()}")
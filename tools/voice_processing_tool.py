@@ -8,15 +8,84 @@ Enhanced with better error handling and logging
 
 import os
 import logging
+import re
 import tempfile
 import requests
 import json
-from typing import Tuple, Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Tuple, Optional, Dict, Any, List, Iterator
 from google.cloud import speech  # For STT (Speech-to-Text)
 import base64
 
+from .audio_format import sniff_audio_format, order_candidates, concat_mp3
+from .tts_cache import normalize_tts_text, tts_cache, tts_cache_key
+
 logger = logging.getLogger(__name__)
 
+# Largest voice note downloaded for transcription (WhatsApp allows 16 MB)
+MAX_VOICE_DOWNLOAD_BYTES = int(os.getenv("MEDIA_MAX_AUDIO_BYTES", str(16 * 1024 * 1024)))
+# Minimum confidence for accepting a transcript
+STT_MIN_CONFIDENCE = 0.3
+# Concurrent recognize() calls when the audio format is ambiguous
+STT_MAX_PARALLEL_ATTEMPTS = int(os.getenv("STT_MAX_PARALLEL_ATTEMPTS", "6"))
+
+_stt_executor = ThreadPoolExecutor(max_workers=STT_MAX_PARALLEL_ATTEMPTS, thread_name_prefix="stt")
+
+# Chunked TTS: a short first chunk so playback starts quickly, larger ones after
+TTS_FIRST_CHUNK_CHARS = int(os.getenv("TTS_FIRST_CHUNK_CHARS", "120"))
+TTS_CHUNK_CHARS = int(os.getenv("TTS_CHUNK_CHARS", "400"))
+# Concurrent ElevenLabs requests across all replies
+TTS_MAX_PARALLEL_CHUNKS = int(os.getenv("TTS_MAX_PARALLEL_CHUNKS", "4"))
+
+_tts_executor = ThreadPoolExecutor(max_workers=TTS_MAX_PARALLEL_CHUNKS, thread_name_prefix="tts")
+
+# Sentence ends: danda/double danda, ? and ! (any spacing), a period followed
+# by whitespace (so "2.5" stays intact), and line breaks
+_SENTENCE_BOUNDARY_RE = re.compile(r"(?<=[।॥?!])\s*|(?<=\.)\s+|\n+")
+
+
+def _wrap_long_sentence(sentence: str, limit: int) -> List[str]:
+    """Split a sentence longer than the limit at word boundaries"""
+    pieces = []
+    while len(sentence) > limit:
+        cut = sentence.rfind(" ", 0, limit)
+        if cut <= 0:
+            cut = limit
+        pieces.append(sentence[:cut].strip())
+        sentence = sentence[cut:].strip()
+    if sentence:
+        pieces.append(sentence)
+    return pieces
+
+
+def split_tts_sentences(
+    text: str, 
+    first_chunk_chars: int = TTS_FIRST_CHUNK_CHARS, 
+    chunk_chars: int = TTS_CHUNK_CHARS
+) -> List[str]:
+    """
+    Split a response into TTS chunks on Devanagari and Latin sentence boundaries
+    
+    Sentences are packed into chunks of up to ``chunk_chars`` characters; the
+    first chunk is kept to ``first_chunk_chars`` so its audio is ready fast.
+    """
+    chunks: List[str] = []
+    current = ""
+    for sentence in _SENTENCE_BOUNDARY_RE.split(text or ""):
+        sentence = " ".join(sentence.split())
+        if not sentence:
+            continue
+        for piece in _wrap_long_sentence(sentence, chunk_chars):
+            limit = chunk_chars if chunks else first_chunk_chars
+            if current and len(current) + 1 + len(piece) > limit:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current} {piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
 class EnhancedVoiceProcessor:
     """Enhanced voice processor with better error handling and logging"""
     
@@ -26,6 +95,9 @@ class EnhancedVoiceProcessor:
         self.elevenlabs_api_key = os.getenv("ELEVENLABS_API_KEY", "sk_371629025b120c623098bf5c61eaa8d2bf0242e8f1177187")
         self.elevenlabs_base_url = "https://api.elevenlabs.io/v1"
         
+        # Keep-alive connection pool shared by media downloads and ElevenLabs calls
+        self.http_session = requests.Session()
+        
         # Google Cloud Speech-to-Text (for voice recognition)
         try:
             self.speech_client = speech.SpeechClient()
@@ -74,6 +146,25 @@ class EnhancedVoiceProcessor:
         "ml-IN": "pNInz6obpgDQGcFmaJgB",  # Adam (works for Malayalam)
     }
     
+    # Use ElevenLabs Turbo v2.5 for better Indian language support and speed
+    ELEVENLABS_MODEL_ID = "eleven_turbo_v2_5"  # Good balance of quality and speed
+    ELEVENLABS_VOICE_SETTINGS = {
+        "stability": 0.5,
+        "similarity_boost": 0.75,
+        "style": 0.5,
+        "use_speaker_boost": True
+    }
+    
+    # Candidate configs when the audio header does not identify the format
+    FALLBACK_AUDIO_CONFIGS = [
+        {"encoding": "OGG_OPUS", "sample_rate_hertz": 16000},
+        {"encoding": "OGG_OPUS", "sample_rate_hertz": 8000},
+        {"encoding": "WEBM_OPUS", "sample_rate_hertz": 16000},
+        {"encoding": "WEBM_OPUS", "sample_rate_hertz": 48000},
+        {"encoding": "MP3", "sample_rate_hertz": 16000},
+        {"encoding": "LINEAR16", "sample_rate_hertz": 16000}
+    ]
+    
     def detect_language_from_context(self, farmer_language: str = "hindi") -> str:
         """Detect language code from farmer context"""
         farmer_lang = farmer_language.lower()
@@ -99,112 +190,185 @@ class EnhancedVoiceProcessor:
                 'Accept': 'audio/*,*/*'
             }
             
-            response = requests.get(media_url, auth=auth_tuple, timeout=30, headers=headers)
-            print(f"   📥 Download Status: {response.status_code}")
-            print(f"   📊 Audio Size: {len(response.content)} bytes")
-            print(f"   📋 Content-Type: {response.headers.get('content-type', 'unknown')}")
+            # Stream the download so oversized media is rejected without buffering it all
+            with self.http_session.get(media_url, auth=auth_tuple, timeout=30, headers=headers, stream=True) as response:
+                content_type = response.headers.get('content-type')
+                print(f"   📥 Download Status: {response.status_code}")
+                print(f"   📋 Content-Type: {content_type or 'unknown'}")
+                
+                if response.status_code != 200:
+                    print(f"   ❌ Download failed: {response.status_code}")
+                    logger.error(f"❌ Failed to download audio: {response.status_code}")
+                    return None
+                
+                audio_buffer = bytearray()
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    audio_buffer += chunk
+                    if len(audio_buffer) > MAX_VOICE_DOWNLOAD_BYTES:
+                        print(f"   ❌ Audio larger than {MAX_VOICE_DOWNLOAD_BYTES} bytes")
+                        logger.error(f"❌ Voice message exceeds {MAX_VOICE_DOWNLOAD_BYTES} bytes")
+                        return None
             
-            if response.status_code != 200:
-                print(f"   ❌ Download failed: {response.status_code}")
-                logger.error(f"❌ Failed to download audio: {response.status_code}")
-                return None
+            print(f"   📊 Audio Size: {len(audio_buffer)} bytes")
+            return self.enhanced_speech_to_text(bytes(audio_buffer), language_code, content_type)
                 
-            audio_data = response.content
+        except Exception as e:
+            print(f"   ❌ Speech recognition error: {e}")
+            logger.error(f"❌ Error in enhanced speech recognition from URL: {e}")
+            return None
+    
+    def enhanced_speech_to_text(
+        self, audio_data: bytes, language_code: str = "hi-IN", content_type: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        ENHANCED speech-to-text for already downloaded audio bytes
+        
+        The encoding and sample rate are read from the audio header, so the
+        common case is a single recognize() call. Unrecognized formats fall
+        back to trying the candidate configs concurrently.
+        """
+        if not self.speech_client:
+            print("❌ Speech client not initialized")
+            logger.error("❌ Speech client not initialized")
+            return None
             
+        try:
             if len(audio_data) == 0:
                 print("   ❌ Audio data is empty")
                 logger.error("❌ Audio data is empty")
                 return None
             
-            # Multiple audio configuration attempts
-            audio_configs = [
-                {
-                    "encoding": speech.RecognitionConfig.AudioEncoding.OGG_OPUS,
-                    "sample_rate_hertz": 16000,
-                    "name": "OGG_OPUS_16kHz"
-                },
-                {
-                    "encoding": speech.RecognitionConfig.AudioEncoding.OGG_OPUS,
-                    "sample_rate_hertz": 8000,
-                    "name": "OGG_OPUS_8kHz"
-                },
-                {
-                    "encoding": speech.RecognitionConfig.AudioEncoding.WEBM_OPUS,
-                    "sample_rate_hertz": 16000,
-                    "name": "WEBM_OPUS_16kHz"
-                },
-                {
-                    "encoding": speech.RecognitionConfig.AudioEncoding.WEBM_OPUS,
-                    "sample_rate_hertz": 48000,
-                    "name": "WEBM_OPUS_48kHz"
-                },
-                {
-                    "encoding": speech.RecognitionConfig.AudioEncoding.MP3,
-                    "sample_rate_hertz": 16000,
-                    "name": "MP3_16kHz"
-                },
-                {
-                    "encoding": speech.RecognitionConfig.AudioEncoding.LINEAR16,
-                    "sample_rate_hertz": 16000,
-                    "name": "LINEAR16_16kHz"
-                }
-            ]
-            
-            print(f"   🧪 Trying {len(audio_configs)} different audio configurations...")
-            
-            for i, config_data in enumerate(audio_configs, 1):
+            # Pick the config from the audio header (one STT call for WhatsApp OGG/Opus)
+            audio_format = sniff_audio_format(audio_data, content_type)
+            if audio_format:
+                print(f"   🔍 Detected format: {audio_format['encoding']} @ {audio_format['sample_rate_hertz']} Hz")
                 try:
-                    print(f"   🔄 Attempt {i}/{len(audio_configs)}: {config_data['name']}")
-                    
-                    config = speech.RecognitionConfig(
-                        encoding=config_data["encoding"],
-                        sample_rate_hertz=config_data["sample_rate_hertz"],
-                        language_code=language_code,
-                        enable_automatic_punctuation=True,
-                        model="latest_short",  # Changed from latest_long for better voice message handling
-                        use_enhanced=True,
-                        # Add alternative language codes for better recognition
-                        alternative_language_codes=["en-IN", "hi-IN"] if language_code not in ["en-IN", "hi-IN"] else []
-                    )
-                    
-                    audio = speech.RecognitionAudio(content=audio_data)
-                    
-                    # Perform speech recognition
-                    recognition_response = self.speech_client.recognize(config=config, audio=audio)
-                    
-                    if recognition_response.results:
-                        transcript = recognition_response.results[0].alternatives[0].transcript
-                        confidence = recognition_response.results[0].alternatives[0].confidence
-                        
-                        print(f"   ✅ SUCCESS with {config_data['name']}!")
-                        print(f"   📝 Transcript: {transcript}")
-                        print(f"   🎯 Confidence: {confidence:.2f}")
-                        
-                        if confidence > 0.3:  # Accept if confidence is reasonable
-                            logger.info(f"✅ Speech recognized with {config_data['name']} (confidence: {confidence:.2f}): {transcript[:50]}...")
-                            return transcript
-                        else:
-                            print(f"   ⚠️ Low confidence ({confidence:.2f}), trying next config...")
-                    else:
-                        print(f"   ❌ No results with {config_data['name']}")
-                        
+                    result = self._recognize_with_config(audio_data, language_code, audio_format)
+                    if result:
+                        return result[0] if result[1] > STT_MIN_CONFIDENCE else None
+                    print(f"   ❌ No speech recognized")
+                    return None
                 except Exception as config_error:
-                    print(f"   ❌ Config {config_data['name']} failed: {config_error}")
-                    logger.warning(f"Config {config_data['name']} failed: {config_error}")
-                    continue
+                    print(f"   ❌ Detected format failed: {config_error}")
+                    logger.warning(f"Detected format {audio_format['encoding']} failed: {config_error}")
             
-            print("   ❌ All audio configurations failed")
-            logger.error("❌ All audio configurations failed")
-            return None
+            # Ambiguous format: try the remaining candidates concurrently
+            candidates = [
+                candidate for candidate in order_candidates(self.FALLBACK_AUDIO_CONFIGS, content_type)
+                if not audio_format or candidate["encoding"] != audio_format["encoding"]
+            ]
+            return self._recognize_first_confident(audio_data, language_code, candidates)
                 
         except Exception as e:
             print(f"   ❌ Speech recognition error: {e}")
-            logger.error(f"❌ Error in enhanced speech recognition from URL: {e}")
+            logger.error(f"❌ Error in enhanced speech recognition: {e}")
             return None
     
-    def text_to_speech_elevenlabs(self, text: str, language_code: str = "hi-IN") -> Optional[str]:
+    def _recognize_with_config(
+        self, audio_data: bytes, language_code: str, audio_format: Dict[str, Any]
+    ) -> Optional[Tuple[str, float]]:
+        """Run one recognize() call; returns (transcript, confidence) or None if nothing was heard"""
+        name = f"{audio_format['encoding']}_{audio_format['sample_rate_hertz'] or 'auto'}Hz"
+        config_kwargs = {
+            "encoding": getattr(speech.RecognitionConfig.AudioEncoding, audio_format["encoding"]),
+            "language_code": language_code,
+            "enable_automatic_punctuation": True,
+            "model": "latest_short",  # Changed from latest_long for better voice message handling
+            "use_enhanced": True,
+            # Add alternative language codes for better recognition
+            "alternative_language_codes": ["en-IN", "hi-IN"] if language_code not in ["en-IN", "hi-IN"] else []
+        }
+        if audio_format.get("sample_rate_hertz"):
+            config_kwargs["sample_rate_hertz"] = audio_format["sample_rate_hertz"]
+        if audio_format.get("channels") and audio_format["channels"] > 1:
+            config_kwargs["audio_channel_count"] = audio_format["channels"]
+        
+        recognition_response = self.speech_client.recognize(
+            config=speech.RecognitionConfig(**config_kwargs),
+            audio=speech.RecognitionAudio(content=audio_data)
+        )
+        
+        if not recognition_response.results:
+            print(f"   ❌ No results with {name}")
+            return None
+        
+        transcript = recognition_response.results[0].alternatives[0].transcript
+        confidence = recognition_response.results[0].alternatives[0].confidence
+        print(f"   ✅ {name}: {transcript} (confidence {confidence:.2f})")
+        if confidence > STT_MIN_CONFIDENCE:
+            logger.info(f"✅ Speech recognized with {name} (confidence: {confidence:.2f}): {transcript[:50]}...")
+        return transcript, confidence
+    
+    def _recognize_first_confident(
+        self, audio_data: bytes, language_code: str, candidates: List[Dict[str, Any]]
+    ) -> Optional[str]:
+        """Run candidate configs concurrently and return the first confident transcript"""
+        print(f"   🧪 Trying {len(candidates)} audio configurations concurrently...")
+        futures = [
+            _stt_executor.submit(self._recognize_with_config, audio_data, language_code, candidate)
+            for candidate in candidates
+        ]
+        try:
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as config_error:
+                    logger.warning(f"STT config failed: {config_error}")
+                    continue
+                if result and result[1] > STT_MIN_CONFIDENCE:
+                    return result[0]
+        finally:
+            # Drop attempts that have not started yet
+            for future in futures:
+                future.cancel()
+        
+        print("   ❌ All audio configurations failed")
+        logger.error("❌ All audio configurations failed")
+        return None
+    
+    def _voice_id_for(self, language_code: str) -> str:
+        return self.ELEVENLABS_VOICES.get(language_code, self.ELEVENLABS_VOICES["hi-IN"])
+    
+    def tts_cache_key(self, text: str, language_code: str = "hi-IN") -> str:
+        """Cache key for a phrase with this processor's voice, model and settings"""
+        return tts_cache_key(
+            text, self._voice_id_for(language_code), self.ELEVENLABS_MODEL_ID, self.ELEVENLABS_VOICE_SETTINGS
+        )
+    
+    def _request_elevenlabs_audio(self, text: str, voice_id: str) -> Optional[bytes]:
+        """POST one synthesis request to ElevenLabs and return the MP3 bytes"""
+        url = f"{self.elevenlabs_base_url}/text-to-speech/{voice_id}"
+        
+        headers = {
+            "Accept": "audio/mpeg",
+            "Content-Type": "application/json",
+            "xi-api-key": self.elevenlabs_api_key
+        }
+        
+        data = {
+            "text": text,
+            "model_id": self.ELEVENLABS_MODEL_ID,
+            "voice_settings": self.ELEVENLABS_VOICE_SETTINGS
+        }
+        
+        print(f"   🌐 Making request to ElevenLabs...")
+        
+        # Make request to ElevenLabs
+        response = self.http_session.post(url, json=data, headers=headers, timeout=30)
+        
+        print(f"   📊 ElevenLabs Response: {response.status_code}")
+        
+        if response.status_code == 200:
+            return response.content
+        
+        print(f"   ❌ ElevenLabs error: {response.status_code} - {response.text}")
+        logger.error(f"❌ ElevenLabs API error: {response.status_code} - {response.text}")
+        return None
+    
+    def text_to_speech_bytes(self, text: str, language_code: str = "hi-IN") -> Optional[bytes]:
         """
-        Convert text to speech using ElevenLabs API with enhanced error handling
+        Convert text to MP3 bytes, served from the TTS cache when the same
+        phrase was synthesized before with the same voice and settings
         """
         if not self.elevenlabs_api_key:
             print("❌ ElevenLabs API key not configured")
@@ -219,52 +383,77 @@ class EnhancedVoiceProcessor:
             logger.info(f"🔊 Converting text to speech with ElevenLabs (language: {language_code})")
             
             # Get appropriate voice ID
-            voice_id = self.ELEVENLABS_VOICES.get(language_code, self.ELEVENLABS_VOICES["hi-IN"])
+            voice_id = self._voice_id_for(language_code)
             print(f"   🎭 Voice ID: {voice_id}")
             
-            # Prepare the request
-            url = f"{self.elevenlabs_base_url}/text-to-speech/{voice_id}"
-            
-            headers = {
-                "Accept": "audio/mpeg",
-                "Content-Type": "application/json",
-                "xi-api-key": self.elevenlabs_api_key
-            }
-            
-            # Use ElevenLabs Turbo v2.5 for better Indian language support and speed
-            data = {
-                "text": text,
-                "model_id": "eleven_turbo_v2_5",  # Good balance of quality and speed
-                "voice_settings": {
-                    "stability": 0.5,
-                    "similarity_boost": 0.75,
-                    "style": 0.5,
-                    "use_speaker_boost": True
-                }
-            }
-            
-            print(f"   🌐 Making request to ElevenLabs...")
+            cache_key = self.tts_cache_key(text, language_code)
+            audio = tts_cache.get(cache_key)
+            if audio is not None:
+                print(f"   ♻️ Voice served from cache: {len(audio)} bytes")
+                logger.info(f"♻️ TTS cache hit: {cache_key[:12]}")
+                return audio
             
-            # Make request to ElevenLabs
-            response = requests.post(url, json=data, headers=headers, timeout=30)
-            
-            print(f"   📊 ElevenLabs Response: {response.status_code}")
-            
-            if response.status_code == 200:
-                # Convert to base64 for transmission
-                audio_base64 = base64.b64encode(response.content).decode('utf-8')
-                print(f"   ✅ Voice generated: {len(audio_base64)} chars")
-                logger.info(f"✅ Text converted to speech: {len(audio_base64)} chars")
-                return audio_base64
-            else:
-                print(f"   ❌ ElevenLabs error: {response.status_code} - {response.text}")
-                logger.error(f"❌ ElevenLabs API error: {response.status_code} - {response.text}")
-                return None
+            audio = self._request_elevenlabs_audio(normalize_tts_text(text), voice_id)
+            if audio:
+                try:
+                    tts_cache.put(cache_key, audio)
+                except OSError as e:
+                    logger.warning(f"⚠️ Could not cache TTS audio: {e}")
+                print(f"   ✅ Voice generated: {len(audio)} bytes")
+                logger.info(f"✅ Text converted to speech: {len(audio)} bytes")
+            return audio
                 
         except Exception as e:
             print(f"   ❌ Voice generation error: {e}")
             logger.error(f"❌ Error in ElevenLabs text-to-speech: {e}")
             return None
+    
+    def text_to_speech_stream(self, text: str, language_code: str = "hi-IN") -> Iterator[bytes]:
+        """
+        Yield MP3 audio for each sentence chunk, in order, as soon as it is ready
+        
+        Chunks are synthesized concurrently (bounded by TTS_MAX_PARALLEL_CHUNKS)
+        and cached individually. Stops early if a chunk cannot be synthesized.
+        """
+        chunks = split_tts_sentences(text)
+        if len(chunks) > 1:
+            print(f"   ✂️ Synthesizing {len(chunks)} chunks (up to {TTS_MAX_PARALLEL_CHUNKS} in parallel)")
+        futures = [_tts_executor.submit(self.text_to_speech_bytes, chunk, language_code) for chunk in chunks]
+        try:
+            for index, future in enumerate(futures):
+                audio = future.result()
+                if not audio:
+                    logger.error(f"❌ TTS chunk {index + 1}/{len(chunks)} failed")
+                    return
+                yield audio
+        finally:
+            # Don't spend API calls on chunks nobody will play
+            for future in futures:
+                future.cancel()
+    
+    def text_to_speech_chunked(self, text: str, language_code: str = "hi-IN") -> Optional[bytes]:
+        """
+        Synthesize a response chunk by chunk and join it into one MP3
+        
+        Returns None if any chunk fails, so callers can fall back to text.
+        """
+        chunks = split_tts_sentences(text)
+        audio_chunks = list(self.text_to_speech_stream(text, language_code))
+        if not audio_chunks or len(audio_chunks) != len(chunks):
+            return None
+        if len(audio_chunks) == 1:
+            return audio_chunks[0]
+        return concat_mp3(audio_chunks)
+    
+    def text_to_speech_elevenlabs(self, text: str, language_code: str = "hi-IN") -> Optional[str]:
+        """
+        Convert text to speech using ElevenLabs API, returned as base64 MP3
+        """
+        audio = self.text_to_speech_chunked(text, language_code)
+        if audio is None:
+            return None
+        # Convert to base64 for transmission
+        return base64.b64encode(audio).decode('utf-8')
 
 # Global enhanced voice processor instance
 enhanced_voice_processor = EnhancedVoiceProcessor()
@@ -345,6 +534,53 @@ def process_voice_message_from_whatsapp_enhanced(
     language_code = enhanced_voice_processor.detect_language_from_context(farmer_language)
     return enhanced_voice_processor.enhanced_speech_to_text_from_url(media_url, auth_tuple, language_code)
 
+def process_voice_audio_from_whatsapp(
+    audio_data: bytes, 
+    farmer_language: str = "hindi", 
+    content_type: Optional[str] = None
+) -> Optional[str]:
+    """
+    Process an already downloaded WhatsApp voice message
+    
+    Args:
+        audio_data: Raw audio bytes (downloaded by the gateway's pooled HTTP client)
+        farmer_language: Farmer's preferred language
+        content_type: Content-Type of the media download (format hint)
+        
+    Returns:
+        Transcribed text or None if failed
+    """
+    language_code = enhanced_voice_processor.detect_language_from_context(farmer_language)
+    return enhanced_voice_processor.enhanced_speech_to_text(audio_data, language_code, content_type)
+
+def create_voice_audio_for_farmer(text: str, farmer_language: str = "hindi") -> Optional[bytes]:
+    """
+    Create a voice response as raw MP3 bytes (sentence-chunked, cached per chunk)
+    
+    Args:
+        text: Text to convert to speech
+        farmer_language: Farmer's preferred language
+        
+    Returns:
+        MP3 bytes or None if failed
+    """
+    language_code = enhanced_voice_processor.detect_language_from_context(farmer_language)
+    return enhanced_voice_processor.text_to_speech_chunked(text, language_code)
+
+def stream_voice_response_for_farmer(text: str, farmer_language: str = "hindi") -> Iterator[bytes]:
+    """
+    Stream a voice response as MP3 chunks in playback order
+    
+    Args:
+        text: Text to convert to speech
+        farmer_language: Farmer's preferred language
+        
+    Yields:
+        MP3 bytes for each sentence chunk, as soon as it is ready
+    """
+    language_code = enhanced_voice_processor.detect_language_from_context(farmer_language)
+    return enhanced_voice_processor.text_to_speech_stream(text, language_code)
+
 def create_voice_response_for_farmer_enhanced(text: str, farmer_language: str = "hindi") -> Optional[str]:
     """
     ENHANCED: Create voice response in farmer's language using ElevenLabs
@@ -359,6 +595,26 @@ def create_voice_response_for_farmer_enhanced(text: str, farmer_language: str =
     language_code = enhanced_voice_processor.detect_language_from_context(farmer_language)
     return enhanced_voice_processor.text_to_speech_elevenlabs(text, language_code)
 
+def warm_voice_cache(phrases: List[str], farmer_language: str = "hindi") -> Dict[str, int]:
+    """
+    Pre-synthesize canned phrases (error messages, common advisories) into the TTS cache
+    
+    Args:
+        phrases: Phrases to cache
+        farmer_language: Language whose voice should be used
+        
+    Returns:
+        Counts of phrases already cached, synthesized and failed
+    """
+    language_code = enhanced_voice_processor.detect_language_from_context(farmer_language)
+    return tts_cache.warm_up(
+        phrases,
+        synthesize=lambda phrase: enhanced_voice_processor._request_elevenlabs_audio(
+            phrase, enhanced_voice_processor._voice_id_for(language_code)
+        ),
+        key_for=lambda phrase: enhanced_voice_processor.tts_cache_key(phrase, language_code)
+    )
+
 def check_voice_service_status_enhanced() -> Dict[str, Any]:
     """
     Enhanced status check for voice services
@@ -368,13 +624,15 @@ def check_voice_service_status_enhanced() -> Dict[str, Any]:
             "provider": "Google Cloud Speech (Enhanced)",
             "status": "available" if enhanced_voice_processor.speech_client else "unavailable",
             "languages": list(enhanced_voice_processor.LANGUAGE_CODES.keys()),
-            "configurations": 6  # Number of audio config attempts
+            "format_detection": "header sniffing (OGG/Opus, WebM, MP3, WAV, AMR, FLAC)",
+            "configurations": len(enhanced_voice_processor.FALLBACK_AUDIO_CONFIGS)  # Fallback attempts (run concurrently)
         },
         "text_to_speech": {
             "provider": "ElevenLabs (Enhanced)",
             "status": "available" if enhanced_voice_processor.elevenlabs_api_key else "unavailable",
-            "model": "eleven_turbo_v2_5",
-            "languages": list(enhanced_voice_processor.ELEVENLABS_VOICES.keys())
+            "model": enhanced_voice_processor.ELEVENLABS_MODEL_ID,
+            "languages": list(enhanced_voice_processor.ELEVENLABS_VOICES.keys()),
+            "cache": tts_cache.stats()
         }
     }
     
@@ -0,0 +1,289 @@
+"""
+Grid-Cell Weather Cache for Kisan Mitra
+
+Farmers in the same village or district get the same weather, so weather
+is cached per lat/lon grid cell (WEATHER_GRID_DEGREES, about 11 km at 0.1°)
+and always requested for the cell centre. Upstream calls then scale with the
+number of cells, not the number of messages.
+
+Current conditions and forecasts have separate TTLs. Stale entries are
+served immediately while one background refresh per cell runs
+(stale-while-revalidate). Concurrent misses for the same cell share one
+upstream request. Entries older than WEATHER_CACHE_MAX_STALE_SECONDS are
+not served and are fetched in the foreground. If that fetch fails, an entry
+up to WEATHER_CACHE_MAX_FALLBACK_SECONDS old is served instead; get_entry()
+returns its fetch time so callers can say how old the data is.
+
+Entries are written through to SQLite, so the batch prefetch job
+(tools.weather_prefetch) and the agent server share one cache, and it
+survives restarts.
+
+Configuration (environment variables):
+    WEATHER_GRID_DEGREES             Grid cell size in degrees (default 0.1)
+    WEATHER_CURRENT_TTL_SECONDS      Freshness of current conditions (default 600)
+    WEATHER_FORECAST_TTL_SECONDS     Freshness of forecasts (default 3600)
+    WEATHER_CACHE_MAX_STALE_SECONDS  Oldest entry still served while refreshing (default 10800)
+    WEATHER_CACHE_MAX_FALLBACK_SECONDS  Oldest entry served when upstream fails (default 86400)
+    WEATHER_CACHE_MAX_ENTRIES        Cached (kind, cell) entries in memory (default 20000)
+    WEATHER_CACHE_DB                 SQLite file shared between processes (default data/weather_cache.db)
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+WEATHER_GRID_DEGREES = float(os.getenv("WEATHER_GRID_DEGREES", "0.1"))
+WEATHER_CURRENT_TTL_SECONDS = int(os.getenv("WEATHER_CURRENT_TTL_SECONDS", "600"))
+WEATHER_FORECAST_TTL_SECONDS = int(os.getenv("WEATHER_FORECAST_TTL_SECONDS", "3600"))
+WEATHER_CACHE_MAX_STALE_SECONDS = int(os.getenv("WEATHER_CACHE_MAX_STALE_SECONDS", "10800"))
+WEATHER_CACHE_MAX_FALLBACK_SECONDS = int(os.getenv("WEATHER_CACHE_MAX_FALLBACK_SECONDS", "86400"))
+WEATHER_CACHE_MAX_ENTRIES = int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "20000"))
+WEATHER_CACHE_DB = os.getenv("WEATHER_CACHE_DB", "data/weather_cache.db")
+
+WEATHER_KIND_CURRENT = "current"
+WEATHER_KIND_FORECAST = "forecast"
+
+Cell = Tuple[int, int]
+
+
+class WeatherCellCache:
+    """TTL cache of weather JSON per (kind, grid cell) with stale-while-revalidate"""
+
+    def __init__(
+        self,
+        grid_degrees: float = WEATHER_GRID_DEGREES,
+        ttl_seconds: Optional[Dict[str, int]] = None,
+        max_stale_seconds: int = WEATHER_CACHE_MAX_STALE_SECONDS,
+        max_fallback_seconds: int = WEATHER_CACHE_MAX_FALLBACK_SECONDS,
+        max_entries: int = WEATHER_CACHE_MAX_ENTRIES,
+        refresh_workers: int = 4,
+        db_path: Optional[str] = WEATHER_CACHE_DB,
+    ):
+        self.grid_degrees = grid_degrees
+        self.ttl_seconds = ttl_seconds or {
+            WEATHER_KIND_CURRENT: WEATHER_CURRENT_TTL_SECONDS,
+            WEATHER_KIND_FORECAST: WEATHER_FORECAST_TTL_SECONDS,
+        }
+        self.max_stale_seconds = max_stale_seconds
+        self.max_fallback_seconds = max_fallback_seconds
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._entries: "OrderedDict[Tuple[str, Cell], Tuple[Any, float]]" = OrderedDict()
+        self._in_flight: Dict[Tuple[str, Cell], Future] = {}
+        self._lock = threading.Lock()
+        # Serializes the shared SQLite connection; never held together with _lock
+        self._db_lock = threading.Lock()
+        self._refresh_executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="weather-refresh")
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.upstream_calls = 0
+
+    def cell_for(self, lat: float, lon: float) -> Cell:
+        """Grid cell containing a coordinate."""
+        return round(lat / self.grid_degrees), round(lon / self.grid_degrees)
+
+    def cell_center(self, cell: Cell) -> Tuple[float, float]:
+        """Coordinate requested upstream for every farmer in the cell."""
+        return round(cell[0] * self.grid_degrees, 4), round(cell[1] * self.grid_degrees, 4)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database lazily and make sure the schema exists (_db_lock held)."""
+        if self._conn is None:
+            db_dir = os.path.dirname(self.db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS weather_cells (
+                    kind TEXT NOT NULL,
+                    cell_lat INTEGER NOT NULL,
+                    cell_lon INTEGER NOT NULL,
+                    data_json TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (kind, cell_lat, cell_lon)
+                )
+                """
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, key: Tuple[str, Cell], entry: Tuple[Any, float]) -> None:
+        """Put an entry in memory, evicting the least recently used (lock held)."""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _stored_entry(self, key: Tuple[str, Cell]) -> Optional[Tuple[Any, float]]:
+        """Entry written by this or another process (_lock not held)."""
+        if not self.db_path:
+            return None
+        kind, (cell_lat, cell_lon) = key
+        with self._db_lock:
+            row = self._connection().execute(
+                "SELECT data_json, fetched_at FROM weather_cells WHERE kind = ? AND cell_lat = ? AND cell_lon = ?",
+                (kind, cell_lat, cell_lon)
+            ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def _store(self, key: Tuple[str, Cell], entry: Tuple[Any, float]) -> None:
+        """Write an entry through to memory and SQLite (_lock not held)."""
+        with self._lock:
+            self._remember(key, entry)
+        if not self.db_path:
+            return
+        kind, (cell_lat, cell_lon) = key
+        data_json = json.dumps(entry[0])
+        with self._db_lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO weather_cells (kind, cell_lat, cell_lon, data_json, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (kind, cell_lat, cell_lon, data_json, entry[1])
+            )
+            conn.commit()
+
+    def _fetch(self, key: Tuple[str, Cell], fetch: Callable[[], Any], requested_at: Optional[float] = None) -> Future:
+        """Start or join the single upstream fetch for a key.
+
+        Returns the shared future of the (data, fetched_at) entry and runs
+        the fetch in the calling thread if no fetch was in flight. An entry
+        stored after ``requested_at`` (a fetch that finished just before this
+        call) is returned as-is.
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                return future
+            future = Future()
+            entry = self._entries.get(key)
+            if requested_at is not None and entry is not None and entry[1] >= requested_at:
+                future.set_result(entry)
+                return future
+            self._in_flight[key] = future
+            self.upstream_calls += 1
+
+        try:
+            entry = (fetch(), time.time())
+            self._store(key, entry)
+            future.set_result(entry)
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+        return future
+
+    def get(self, kind: str, cell: Cell, fetch: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Return weather JSON for a cell, calling ``fetch`` only when needed (see get_entry)."""
+        return self.get_entry(kind, cell, fetch, timeout)[0]
+
+    def get_entry(
+        self, kind: str, cell: Cell, fetch: Callable[[], Any], timeout: Optional[float] = None
+    ) -> Tuple[Any, float]:
+        """Return (weather JSON, fetched_at epoch seconds) for a cell.
+
+        Args:
+            kind: WEATHER_KIND_CURRENT or WEATHER_KIND_FORECAST
+            cell: Grid cell from cell_for()
+            fetch: Fetches the JSON for the cell centre; raises on failure
+            timeout: Longest wait when joining another caller's fetch
+
+        Raises:
+            Whatever ``fetch`` raises when there is no cached entry younger
+            than max_fallback_seconds
+        """
+        key = (kind, cell)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None or now - entry[1] > self.ttl_seconds[kind]:
+            # Another process (e.g. the prefetch job) may have a newer copy
+            stored = self._stored_entry(key)
+            if stored is not None and (entry is None or stored[1] > entry[1]):
+                entry = stored
+                with self._lock:
+                    current = self._entries.get(key)
+                    if current is None or current[1] < stored[1]:
+                        self._remember(key, stored)
+        if entry is not None:
+            data, fetched_at = entry
+            age = now - fetched_at
+            if age <= self.ttl_seconds[kind]:
+                self.hits += 1
+                return entry
+            if age <= self.max_stale_seconds:
+                self.stale_hits += 1
+                self._refresh_in_background(key, fetch)
+                return entry
+
+        self.misses += 1
+        try:
+            return self._fetch(key, fetch, requested_at=now).result(timeout)
+        except Exception:
+            if entry is not None and now - entry[1] <= self.max_fallback_seconds:
+                # Upstream failed; an old reading (marked with its age) beats none
+                logger.warning(f"⚠️ Serving {kind} weather for cell {cell} from {int(now - entry[1])}s ago")
+                return entry
+            raise
+
+    def is_fresh(self, kind: str, cell: Cell, min_remaining_seconds: float = 0) -> bool:
+        """Whether a cell has an entry that stays fresh for at least the given time."""
+        key = (kind, cell)
+        with self._lock:
+            entry = self._entries.get(key)
+        stored = self._stored_entry(key)
+        fetched_at = max(e[1] for e in (entry, stored) if e is not None) if (entry or stored) else None
+        return fetched_at is not None and time.time() - fetched_at + min_remaining_seconds <= self.ttl_seconds[kind]
+
+    def refresh(self, kind: str, cell: Cell, fetch: Callable[[], Any]) -> Any:
+        """Fetch a cell now and store it (joins a fetch already in flight).
+
+        Raises:
+            Whatever ``fetch`` raises
+        """
+        return self._fetch((kind, cell), fetch).result()[0]
+
+    def _refresh_in_background(self, key: Tuple[str, Cell], fetch: Callable[[], Any]) -> None:
+        with self._lock:
+            if key in self._in_flight:
+                return
+        future = self._refresh_executor.submit(self._fetch, key, fetch)
+        future.add_done_callback(_log_refresh_failure)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "upstream_calls": self.upstream_calls,
+        }
+
+
+def _log_refresh_failure(outer: Future) -> None:
+    try:
+        outer.result().result()
+    except Exception as e:
+        logger.warning(f"⚠️ Background weather refresh failed: {e}")
+
+
+# Global weather cache instance
+weather_cache = WeatherCellCache()
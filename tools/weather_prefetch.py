@@ -0,0 +1,199 @@
+"""
+Batch Weather Prefetch for Kisan Mitra
+
+Warms the grid-cell weather cache for every registered farmer ahead of the
+morning advisory peak, so the agent answers weather questions from the cache.
+Farmer locations are read from the profile store (and the default profile
+file), reduced to their distinct grid cells, and fetched with a bounded worker
+pool under a per-minute request budget that matches the OpenWeatherMap plan.
+A cell is skipped only if its cached entry will still be fresh
+WEATHER_PREFETCH_FRESH_FOR_SECONDS from now, i.e. when the advisory window
+starts; set it to the gap between the cron run and the peak.
+
+Configuration (environment variables):
+    WEATHER_PREFETCH_WORKERS          Concurrent upstream requests (default 8)
+    WEATHER_PREFETCH_RATE_PER_MINUTE  Upstream request budget (default 60)
+    WEATHER_PREFETCH_FRESH_FOR_SECONDS  How long a skipped entry must stay fresh (default 1800)
+
+Usage:
+    python -m tools.weather_prefetch [--workers N] [--rate-per-minute N] [--fresh-for SECONDS] [--current-only] [--force]
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List, Tuple
+
+from .geocode_cache import geocode_cache
+from .profile_store import DEFAULT_PROFILE_PATH, get_profile_store, load_profile_for_farmer
+from .weather_cache import WEATHER_KIND_CURRENT, WEATHER_KIND_FORECAST, Cell, weather_cache
+from .weather_tool import fetch_openweather_json
+
+logger = logging.getLogger(__name__)
+
+WEATHER_PREFETCH_WORKERS = int(os.getenv("WEATHER_PREFETCH_WORKERS", "8"))
+WEATHER_PREFETCH_RATE_PER_MINUTE = int(os.getenv("WEATHER_PREFETCH_RATE_PER_MINUTE", "60"))
+WEATHER_PREFETCH_FRESH_FOR_SECONDS = int(os.getenv("WEATHER_PREFETCH_FRESH_FOR_SECONDS", "1800"))
+
+
+class RateLimiter:
+    """Spaces calls evenly so no more than ``per_minute`` start in any minute"""
+
+    def __init__(self, per_minute: int):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until this caller's slot comes up."""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _location_coordinates(location: Dict[str, Any]) -> Tuple[float, float]:
+    """Profile coordinates, else the district's coordinates (table or geocode cache).
+
+    Raises:
+        LookupError: If the location cannot be placed without a geocoding call
+    """
+    if location.get("latitude") is not None and location.get("longitude") is not None:
+        return float(location["latitude"]), float(location["longitude"])
+    if location.get("district"):
+        query = location["district"] + (f", {location['state']}" if location.get("state") else "")
+        place = geocode_cache.get(query) or geocode_cache.get(location["district"])
+        if place is not None:
+            return place["lat"], place["lon"]
+    raise LookupError(location.get("district") or "no location")
+
+
+def _farmer_locations(profile_path: str) -> Iterable[Dict[str, Any]]:
+    """Locations of all stored farmers plus the default profile."""
+    for _, location in get_profile_store().iter_locations():
+        yield location
+    try:
+        details = load_profile_for_farmer(None, profile_path)["farmer_details"]["location_details"]
+        yield {
+            "latitude": (details.get("coordinates") or {}).get("latitude"),
+            "longitude": (details.get("coordinates") or {}).get("longitude"),
+            "district": details.get("district"),
+            "state": details.get("state"),
+        }
+    except (OSError, ValueError, KeyError):
+        pass
+
+
+def collect_weather_cells(profile_path: str = DEFAULT_PROFILE_PATH) -> Dict[str, Any]:
+    """Distinct grid cells across all farmers.
+
+    Returns:
+        Dict[str, Any]: {"cells": {cell: farmer count}, "farmers": int,
+        "unlocated": [district names that could not be placed]}
+    """
+    cells: Dict[Cell, int] = {}
+    farmers = 0
+    unlocated: List[str] = []
+    for location in _farmer_locations(profile_path):
+        farmers += 1
+        try:
+            lat, lon = _location_coordinates(location)
+        except LookupError as e:
+            unlocated.append(str(e))
+            continue
+        cell = weather_cache.cell_for(lat, lon)
+        cells[cell] = cells.get(cell, 0) + 1
+    return {"cells": cells, "farmers": farmers, "unlocated": unlocated}
+
+
+def prefetch_weather(
+    workers: int = WEATHER_PREFETCH_WORKERS,
+    rate_per_minute: int = WEATHER_PREFETCH_RATE_PER_MINUTE,
+    include_forecast: bool = True,
+    force: bool = False,
+    profile_path: str = DEFAULT_PROFILE_PATH,
+    fresh_for_seconds: int = WEATHER_PREFETCH_FRESH_FOR_SECONDS,
+) -> Dict[str, Any]:
+    """Fetch weather for every farmer grid cell into the weather cache.
+
+    Args:
+        workers: Concurrent upstream requests
+        rate_per_minute: Upstream request budget per minute
+        include_forecast: Also fetch the 5-day forecast for each cell
+        force: Refetch cells whose cached entry is still fresh
+        profile_path: Default profile file included in the scan
+        fresh_for_seconds: Skip a cell only if its entry stays fresh this long
+            (the time until the advisory window)
+
+    Returns:
+        Dict[str, Any]: Counts, failures and throughput of the run
+    """
+    started = time.perf_counter()
+    collected = collect_weather_cells(profile_path)
+    kinds = [WEATHER_KIND_CURRENT] + ([WEATHER_KIND_FORECAST] if include_forecast else [])
+    jobs = [
+        (kind, cell)
+        for cell in collected["cells"]
+        for kind in kinds
+        if force or not weather_cache.is_fresh(kind, cell, min_remaining_seconds=fresh_for_seconds)
+    ]
+
+    limiter = RateLimiter(rate_per_minute)
+
+    def fetch_cell(kind: str, cell: Cell) -> None:
+        limiter.acquire()
+        lat, lon = weather_cache.cell_center(cell)
+        weather_cache.refresh(kind, cell, lambda: fetch_openweather_json(kind, lat, lon))
+
+    failures: List[Dict[str, Any]] = []
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="weather-prefetch") as executor:
+        futures = {executor.submit(fetch_cell, kind, cell): (kind, cell) for kind, cell in jobs}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                kind, cell = futures[future]
+                failures.append({"kind": kind, "cell": list(weather_cache.cell_center(cell)), "error": str(e)})
+
+    elapsed = time.perf_counter() - started
+    fetched = len(jobs) - len(failures)
+    return {
+        "farmers": collected["farmers"],
+        "cells": len(collected["cells"]),
+        "unlocated_farmers": len(collected["unlocated"]),
+        "requests": len(jobs),
+        "skipped_fresh": len(collected["cells"]) * len(kinds) - len(jobs),
+        "fetched": fetched,
+        "failed": len(failures),
+        "failures": failures,
+        "elapsed_seconds": round(elapsed, 2),
+        "requests_per_second": round(len(jobs) / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Prefetch weather for all farmer locations into the weather cache")
+    parser.add_argument("--workers", type=int, default=WEATHER_PREFETCH_WORKERS)
+    parser.add_argument("--rate-per-minute", type=int, default=WEATHER_PREFETCH_RATE_PER_MINUTE)
+    parser.add_argument("--fresh-for", type=int, default=WEATHER_PREFETCH_FRESH_FOR_SECONDS,
+                        help="seconds until the advisory window; entries that expire sooner are refetched")
+    parser.add_argument("--current-only", action="store_true", help="skip the 5-day forecast")
+    parser.add_argument("--force", action="store_true", help="refetch cells that are still fresh")
+    args = parser.parse_args()
+
+    result = prefetch_weather(
+        args.workers, args.rate_per_minute, not args.current_only, args.force, fresh_for_seconds=args.fresh_for
+    )
+    print(f"🌦️ {result['farmers']} farmers → {result['cells']} grid cells ({result['unlocated_farmers']} without a location)")
+    print(f"✅ {result['fetched']}/{result['requests']} requests fetched, {result['skipped_fresh']} already fresh, "
+          f"{result['failed']} failed in {result['elapsed_seconds']}s ({result['requests_per_second']} req/s)")
+    for failure in result["failures"][:20]:
+        print(f"❌ {failure['kind']} {failure['cell']}: {failure['error']}")
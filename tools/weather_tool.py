@@ -4,24 +4,64 @@ Weather Tool for Kisan Mitra
 Provides real-time weather information and agricultural insights for farmers.
 """
 
+import os
 import requests
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 
-def get_farmer_weather(profile_path: str = "context/farmer_profile.json") -> Dict[str, Any]:
+from requests.adapters import HTTPAdapter
+
+from google.adk.tools import ToolContext
+
+from .forecast_analytics import SPRAY_MAX_HUMIDITY, SPRAY_MAX_WIND, analyze_forecast
+from .geocode_cache import geocode_cache
+from .weather_cache import WEATHER_KIND_CURRENT, WEATHER_KIND_FORECAST, weather_cache
+from .profile_store import DEFAULT_PROFILE_PATH, load_profile_data
+
+OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY", "be1aacd35c28c14b6c62ad0fa78ac6ec")
+# Timeout for each OpenWeatherMap request
+WEATHER_REQUEST_TIMEOUT = float(os.getenv("WEATHER_REQUEST_TIMEOUT_SECONDS", "10"))
+# How long to keep waiting for the forecast once current conditions are in
+WEATHER_FORECAST_GRACE = float(os.getenv("WEATHER_FORECAST_GRACE_SECONDS", "2"))
+WEATHER_MAX_PARALLEL_REQUESTS = int(os.getenv("WEATHER_MAX_PARALLEL_REQUESTS", "8"))
+
+# Keep-alive connections to OpenWeatherMap shared by all tool calls
+_weather_session = requests.Session()
+_weather_session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=WEATHER_MAX_PARALLEL_REQUESTS))
+_weather_session.mount("http://", HTTPAdapter(pool_connections=2, pool_maxsize=WEATHER_MAX_PARALLEL_REQUESTS))
+_weather_executor = ThreadPoolExecutor(max_workers=WEATHER_MAX_PARALLEL_REQUESTS, thread_name_prefix="weather")
+
+_OPENWEATHER_ENDPOINTS = {WEATHER_KIND_CURRENT: "weather", WEATHER_KIND_FORECAST: "forecast"}
+
+def fetch_openweather_json(kind: str, lat: float, lon: float) -> Dict[str, Any]:
+    """Fetch current weather or forecast JSON; raises requests exceptions on failure."""
+    url = f"https://api.openweathermap.org/data/2.5/{_OPENWEATHER_ENDPOINTS[kind]}?lat={lat}&lon={lon}&appid={OPENWEATHER_API_KEY}&units=metric"
+    response = _weather_session.get(url, timeout=WEATHER_REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+def _cached_weather_json(kind: str, lat: float, lon: float) -> Tuple[Dict[str, Any], float]:
+    """(Weather JSON, fetched_at) for the grid cell containing (lat, lon), shared by all farmers in it."""
+    cell = weather_cache.cell_for(lat, lon)
+    cell_lat, cell_lon = weather_cache.cell_center(cell)
+    return weather_cache.get_entry(kind, cell, lambda: fetch_openweather_json(kind, cell_lat, cell_lon))
+
+def get_farmer_weather(profile_path: str = DEFAULT_PROFILE_PATH, tool_context: Optional[ToolContext] = None) -> Dict[str, Any]:
     """Get weather information automatically for farmer's location from profile.
     
     Args:
-        profile_path (str): Path to farmer profile JSON file
+        profile_path (str): Path to farmer profile JSON file, used when the
+            tool is called outside an ADK call
         
     Returns:
         Dict[str, Any]: Weather data for farmer's specific location
     """
     try:
-        # Load farmer profile to get location
-        with open(profile_path, 'r', encoding='utf-8') as file:
-            profile_data = json.load(file)
+        # Load the current farmer's profile to get location
+        profile_data = load_profile_data(tool_context, profile_path)
         
         farmer_details = profile_data['farmer_details']
         location_details = farmer_details['location_details']
@@ -31,8 +71,19 @@ def get_farmer_weather(profile_path: str = "context/farmer_profile.json") -> Dic
         farmer_name = farmer_details['personal_info']['name']
         farmer_state = location_details['state']
         
-        # Use the existing weather function with farmer's location
-        weather_result = get_agricultural_weather(farmer_location)
+        # Profile coordinates skip geocoding; otherwise resolve the district name
+        coordinates = location_details.get('coordinates') or {}
+        if coordinates.get('latitude') is not None and coordinates.get('longitude') is not None:
+            place = {
+                "name": farmer_location,
+                "state": farmer_state,
+                "country": "IN",
+                "lat": float(coordinates['latitude']),
+                "lon": float(coordinates['longitude'])
+            }
+            weather_result = _weather_for_coordinates(place)
+        else:
+            weather_result = get_agricultural_weather(farmer_location)
         
         # Add farmer context to the result
         if weather_result['status'] == 'success':
@@ -71,48 +122,94 @@ def get_agricultural_weather(location: str, language: str = "en") -> Dict[str, A
     Returns:
         Dict[str, Any]: Comprehensive weather data for farming decisions
     """
-    api_key = "be1aacd35c28c14b6c62ad0fa78ac6ec"
-    
     try:
-        # First get coordinates from location name
-        geocoding_url = f"http://api.openweathermap.org/geo/1.0/direct?q={location}&limit=1&appid={api_key}"
-        geo_response = requests.get(geocoding_url, timeout=10)
-        
-        if geo_response.status_code != 200:
-            return {
-                "status": "error",
-                "error_message": f"Could not find location: {location}. Please provide a valid city or district name."
-            }
-        
-        geo_data = geo_response.json()
-        if not geo_data:
-            return {
-                "status": "error", 
-                "error_message": f"Location '{location}' not found. Please check spelling or try nearby major city."
+        # Coordinates from the district table or earlier lookups; the geocoding API only for new names
+        place = geocode_cache.get(location)
+        if place is None:
+            geocoding_url = f"http://api.openweathermap.org/geo/1.0/direct?q={location}&limit=1&appid={OPENWEATHER_API_KEY}"
+            geo_response = _weather_session.get(geocoding_url, timeout=WEATHER_REQUEST_TIMEOUT)
+            
+            if geo_response.status_code != 200:
+                return {
+                    "status": "error",
+                    "error_message": f"Could not find location: {location}. Please provide a valid city or district name."
+                }
+            
+            geo_data = geo_response.json()
+            if not geo_data:
+                return {
+                    "status": "error", 
+                    "error_message": f"Location '{location}' not found. Please check spelling or try nearby major city."
+                }
+            
+            place = {
+                "name": geo_data[0]['name'],
+                "state": geo_data[0].get('state', ''),
+                "country": geo_data[0].get('country', ''),
+                "lat": geo_data[0]['lat'],
+                "lon": geo_data[0]['lon'],
+                "source": "openweathermap_geocoding"
             }
+            geocode_cache.put(location, place)
+    except requests.exceptions.Timeout:
+        return {
+            "status": "error",
+            "error_message": "Weather service request timed out. Please check your internet connection and try again."
+        }
+    except requests.exceptions.ConnectionError:
+        return {
+            "status": "error", 
+            "error_message": "Cannot connect to weather service. Please check your internet connection."
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "error_message": f"Weather service error: {str(e)}"
+        }
+    
+    return _weather_for_coordinates(place)
+
+def _weather_for_coordinates(place: Dict[str, Any]) -> Dict[str, Any]:
+    """Fetch current weather and forecast for a resolved place and derive farming advice.
+    
+    Args:
+        place (Dict[str, Any]): Resolved location with name, state, country, lat and lon
+    
+    Returns:
+        Dict[str, Any]: Comprehensive weather data for farming decisions
+    """
+    lat = place['lat']
+    lon = place['lon']
+    found_location = place['name']
+    country = place.get('country', '')
+    state = place.get('state', '')
+    
+    try:
+        # Current weather and the 5-day forecast for the farmer's grid cell, fetched
+        # concurrently; cached cells return immediately
+        weather_future = _weather_executor.submit(_cached_weather_json, WEATHER_KIND_CURRENT, lat, lon)
+        forecast_future = _weather_executor.submit(_cached_weather_json, WEATHER_KIND_FORECAST, lat, lon)
         
-        lat = geo_data[0]['lat']
-        lon = geo_data[0]['lon']
-        found_location = geo_data[0]['name']
-        country = geo_data[0].get('country', '')
-        state = geo_data[0].get('state', '')
-        
-        # Get current weather
-        weather_url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={api_key}&units=metric"
-        weather_response = requests.get(weather_url, timeout=10)
-        
-        if weather_response.status_code != 200:
+        try:
+            weather_data, weather_fetched_at = weather_future.result()
+        except requests.exceptions.HTTPError:
             return {
                 "status": "error",
                 "error_message": "Weather service temporarily unavailable. Please try again later."
             }
         
-        weather_data = weather_response.json()
+        # A slow or failed forecast must not hold back current conditions
+        forecast_data = None
+        forecast_note = None
+        try:
+            forecast_data, _ = forecast_future.result(timeout=WEATHER_FORECAST_GRACE)
+        except FutureTimeoutError:
+            forecast_note = "Forecast is taking too long; showing current conditions only"
+        except requests.exceptions.RequestException:
+            forecast_note = "Forecast temporarily unavailable"
         
-        # Get 5-day forecast
-        forecast_url = f"https://api.openweathermap.org/data/2.5/forecast?lat={lat}&lon={lon}&appid={api_key}&units=metric"
-        forecast_response = requests.get(forecast_url, timeout=10)
-        forecast_data = forecast_response.json() if forecast_response.status_code == 200 else None
+        # Past its TTL only when upstream failed or a refresh is still running
+        stale = time.time() - weather_fetched_at > weather_cache.ttl_seconds[WEATHER_KIND_CURRENT]
         
         # Process current weather
         current = weather_data['main']
@@ -137,11 +234,12 @@ def get_agricultural_weather(location: str, language: str = "en") -> Dict[str, A
         # Weather-based agricultural advice
         if humidity > 80:
             agricultural_insights.append("High humidity - Monitor for fungal diseases")
-            spray_conditions = "Poor - High humidity may reduce effectiveness"
         elif humidity < 30:
             agricultural_insights.append("Low humidity - Increase irrigation frequency")
+        if humidity > SPRAY_MAX_HUMIDITY:
+            spray_conditions = "Poor - High humidity may reduce effectiveness"
             
-        if wind.get('speed', 0) > 5:  # > 18 km/h
+        if wind.get('speed', 0) > SPRAY_MAX_WIND:  # > ~15 km/h
             spray_conditions = "Poor - High wind may cause drift"
             agricultural_insights.append("High wind - Avoid spraying operations")
             
@@ -156,24 +254,50 @@ def get_agricultural_weather(location: str, language: str = "en") -> Dict[str, A
             agricultural_insights.append("Rainfall expected - Postpone spraying operations")
             irrigation_advice = "Reduce or skip irrigation"
             
-        # Process forecast for next 3 days
+        # Indices over all forecast slots (spray windows, rain, GDD, disease and heat pressure)
+        forecast_analytics = analyze_forecast(forecast_data)
         forecast_summary = []
-        if forecast_data and 'list' in forecast_data:
-            for i in range(0, min(24, len(forecast_data['list'])), 8):  # Every 24 hours
-                forecast_item = forecast_data['list'][i]
-                date = datetime.fromtimestamp(forecast_item['dt']).strftime('%Y-%m-%d')
-                temp = forecast_item['main']['temp']
-                desc = forecast_item['weather'][0]['description']
-                rain_chance = forecast_item.get('pop', 0) * 100  # Probability of precipitation
-                
+        if forecast_analytics:
+            for day in forecast_analytics['daily']:
                 forecast_summary.append({
-                    "date": date,
-                    "temperature": f"{temp:.1f}°C",
-                    "description": desc,
-                    "rain_probability": f"{rain_chance:.0f}%"
+                    "date": day['date'],
+                    "temperature": f"{day['temp_min']:.1f}-{day['temp_max']:.1f}°C",
+                    "description": day['description'],
+                    "rain_probability": f"{day['rain_probability']}%",
+                    "rainfall": f"{day['rain_mm']:.1f} mm"
                 })
+            
+            windows = forecast_analytics['best_spray_windows']
+            if windows:
+                agricultural_insights.append(f"Best spray window: {windows[0]['start']} to {windows[0]['end']}")
+            else:
+                agricultural_insights.append("No suitable spray window in the next 5 days")
+            if forecast_analytics['rain_next_72h_mm'] >= 10:
+                agricultural_insights.append(f"{forecast_analytics['rain_next_72h_mm']:.0f} mm rain expected in 3 days - Skip irrigation")
+            if forecast_analytics['leaf_wetness_hours'] >= 24:
+                agricultural_insights.append(f"Leaves wet for ~{forecast_analytics['leaf_wetness_hours']} hours - High fungal disease risk")
+            if forecast_analytics['heat_stress_hours'] > 0:
+                agricultural_insights.append(f"{forecast_analytics['heat_stress_hours']} hours above 35°C ahead - Plan irrigation for heat stress")
+            
+            # Headline advice follows the forecast indices; current observations (same
+            # thresholds) still rule out spraying right now
+            if spray_conditions == "Good" and forecast_analytics['spray_score_now'] == 0:
+                spray_conditions = "Poor - Conditions in the next hours are unsuitable"
+            if spray_conditions != "Good":
+                if windows:
+                    next_window = min(windows, key=lambda window: window['start'])
+                    spray_conditions += f"; next window {next_window['start']} to {next_window['end']}"
+                else:
+                    spray_conditions += "; no suitable window in the next 5 days"
+            
+            if forecast_analytics['rain_next_72h_mm'] >= 10:
+                irrigation_advice = f"Skip irrigation - {forecast_analytics['rain_next_72h_mm']:.0f} mm rain expected in 3 days"
+            elif forecast_analytics['rain_next_24h_mm'] >= 5:
+                irrigation_advice = "Reduce irrigation - Rain expected within 24 hours"
+            elif forecast_analytics['heat_stress_hours'] > 0:
+                irrigation_advice = "Increase frequency, prefer early morning irrigation"
         
-        return {
+        weather_result = {
             "status": "success",
             "location": {
                 "name": found_location,
@@ -200,9 +324,19 @@ def get_agricultural_weather(location: str, language: str = "en") -> Dict[str, A
             },
             "insights": agricultural_insights,
             "forecast_3_days": forecast_summary[:3],
+            "forecast_analytics": forecast_analytics,
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "data_as_of": datetime.fromtimestamp(weather_fetched_at).strftime("%Y-%m-%d %H:%M:%S"),
+            "stale": stale,
             "data_source": "OpenWeatherMap"
         }
+        if stale:
+            weather_result["stale_note"] = (
+                f"Latest available reading; current conditions were last updated at {weather_result['data_as_of']}"
+            )
+        if forecast_note:
+            weather_result["forecast_note"] = forecast_note
+        return weather_result
         
     except requests.exceptions.Timeout:
         return {
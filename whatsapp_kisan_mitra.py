@@ -5,21 +5,45 @@ This server handles WhatsApp messages via Twilio and forwards them to the ADK AP
 """
 
 import asyncio
+import json
 import logging
 import os
-import requests
-import base64
 from datetime import datetime
+import aiohttp
 from dotenv import load_dotenv
 from fastapi import FastAPI, Form, Request, HTTPException
 from fastapi.responses import Response
 from urllib.parse import quote_plus
-from typing import Optional
+from typing import Optional, Tuple, Union
+
+# Shared pooled HTTP client for ADK, Twilio and voice providers
+from gateway.http_client import http_client
+# Phone number → ADK session id (reused across turns)
+from gateway.sessions import adk_sessions
+# Farmer reply language from profile / message script
+from gateway.language import farmer_languages
+# Durable inbound queue (MessageSid dedupe, per-farmer ordering)
+from gateway.inbound_queue import STATUS_DONE, STATUS_PROCESSING, inbound_queue
+# Streaming, size-capped Twilio media downloads
+from gateway.media_fetch import MediaFetchError, fetch_media
+# Near-duplicate crop photo diagnoses (dHash)
+from gateway.image_cache import already_analyzed_reply, detect_question_intent, image_cache
+# Crop photo downscaling/recompression in a process pool
+from gateway.image_preprocess import image_preprocessor
+# Generated voice replies served to Twilio as <Media>
+from gateway.media_store import media_router, media_store, media_url
+# Async reply mode: background workers + Twilio REST delivery
+from gateway.replies import (
+    ASYNC_REPLIES_ENABLED,
+    EMPTY_TWIML,
+    TwilioReplySender,
+    reply_workers
+)
 
 # Voice processing imports
 from tools.voice_processing_tool import (
-    process_voice_message_from_whatsapp,
-    create_voice_response_for_farmer
+    process_voice_audio_from_whatsapp,
+    create_voice_audio_for_farmer
 )
 
 # Load environment variables
@@ -30,6 +54,7 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = FastAPI(title="WhatsApp Kisan Mitra", version="1.0.0")
+app.include_router(media_router)
 
 # Configuration
 ADK_API_URL = "http://localhost:8001"
@@ -37,21 +62,59 @@ TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
 
+TECHNICAL_ERROR_MESSAGE = "माफ करें, तकनीकी समस्या के कारण मैं अभी आपकी मदद नहीं कर सकता।"
+SESSION_ERROR_MESSAGE = "माफ करें, सत्र बनाने में समस्या है।"
+EMPTY_RESPONSE_MESSAGE = "माफ करें, सर्वर से कोई उत्तर नहीं मिला।"
+SERVER_ERROR_MESSAGE = "माफ करें, सर्वर से संपर्क में समस्या है।"
+TIMEOUT_ERROR_MESSAGE = "माफ करें, प्रतिक्रिया में देरी हो रही है। कृपया फिर से कोशिश करें।"
+# Replies that are not agent answers (never cached)
+ADK_FAILURE_MESSAGES = frozenset({
+    TECHNICAL_ERROR_MESSAGE, SESSION_ERROR_MESSAGE, EMPTY_RESPONSE_MESSAGE,
+    SERVER_ERROR_MESSAGE, TIMEOUT_ERROR_MESSAGE,
+})
+
+twilio_sender = TwilioReplySender(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER)
+
+# Background expiry sweep for generated media and pruning of finished inbound messages
+media_cleanup_task: Optional[asyncio.Task] = None
+inbound_prune_task: Optional[asyncio.Task] = None
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize the WhatsApp server"""
     logger.info("📱 Starting WhatsApp Kisan Mitra Server...")
     logger.info(f"🔗 ADK API URL: {ADK_API_URL}")
     
+    await http_client.start()
+    
     # Check ADK API connectivity
     try:
-        response = requests.get(f"{ADK_API_URL}/health", timeout=5)
-        if response.status_code == 200:
-            logger.info("✅ ADK API server is reachable")
-        else:
-            logger.warning(f"⚠️ ADK API server returned status: {response.status_code}")
+        async with http_client.request("GET", f"{ADK_API_URL}/health", timeout=5) as response:
+            if response.status == 200:
+                logger.info("✅ ADK API server is reachable")
+            else:
+                logger.warning(f"⚠️ ADK API server returned status: {response.status}")
     except Exception as e:
         logger.error(f"❌ Cannot reach ADK API server: {e}")
+    
+    if ASYNC_REPLIES_ENABLED:
+        await reply_workers.start(deliver_whatsapp_reply)
+    
+    global media_cleanup_task, inbound_prune_task
+    media_cleanup_task = asyncio.create_task(media_store.periodic_cleanup())
+    inbound_prune_task = asyncio.create_task(inbound_queue.periodic_prune())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop reply workers and background tasks, release pooled connections"""
+    for task in (media_cleanup_task, inbound_prune_task):
+        if task is not None:
+            task.cancel()
+    if ASYNC_REPLIES_ENABLED:
+        await reply_workers.stop()
+    await twilio_sender.close()
+    await http_client.close()
+    image_preprocessor.shutdown()
 
 @app.get("/")
 async def root():
@@ -67,8 +130,8 @@ async def health_check():
     """Detailed health check"""
     adk_status = "unknown"
     try:
-        response = requests.get(f"{ADK_API_URL}/health", timeout=5)
-        adk_status = "healthy" if response.status_code == 200 else "unhealthy"
+        async with http_client.request("GET", f"{ADK_API_URL}/health", timeout=5) as response:
+            adk_status = "healthy" if response.status == 200 else "unhealthy"
     except:
         adk_status = "unreachable"
     
@@ -77,36 +140,78 @@ async def health_check():
         "service": "WhatsApp Kisan Mitra",
         "version": "1.0.0",
         "adk_api_status": adk_status,
+        "active_adk_sessions": len(adk_sessions),
+        "async_replies": ASYNC_REPLIES_ENABLED,
+        "queued_replies": reply_workers.qsize(),
+        "image_cache": image_cache.stats(),
         "twilio_configured": bool(TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN)
     }
 
-async def call_adk_api(message: str, phone_number: str = None, image_data: str = None, image_mime_type: str = None):
-    """Call the ADK API server"""
+async def _create_adk_session(app_name: str, user_id: str) -> Optional[str]:
+    """Create a new ADK session for a user and return its id"""
+    logger.info(f"🔄 Creating session for user: {user_id}")
+    session_status, session_data = await http_client.post_json(
+        f"{ADK_API_URL}/apps/{app_name}/users/{user_id}/sessions",
+        {},
+        timeout=10
+    )
+    
+    if session_status not in [200, 201]:
+        logger.warning(f"⚠️ Session creation failed: {session_status}")
+        return None
+    
+    # Get the actual session ID from the response
+    session_id = (session_data or {}).get("id")
+    
+    if not session_id:
+        logger.error("❌ No session ID returned from session creation")
+        return None
+    
+    logger.info(f"✅ Session created: {session_id}")
+    return session_id
+
+# Stands in for base64 image data while the rest of the payload is serialized
+INLINE_DATA_PLACEHOLDER = "__kisan_mitra_inline_data__"
+
+async def _json_body_with_inline_data(payload: dict, inline_data: Union[bytes, bytearray]):
+    """Yield the JSON body with the base64 image written in place, without copying it"""
+    prefix, suffix = json.dumps(payload, ensure_ascii=False).split(INLINE_DATA_PLACEHOLDER, 1)
+    yield prefix.encode("utf-8")
+    yield inline_data
+    yield suffix.encode("utf-8")
+
+async def _post_adk_run(payload: dict, inline_data: Optional[Union[bytes, bytearray]] = None):
+    """POST a turn to the ADK /run endpoint and return (status, result, error_text)"""
+    if inline_data is None:
+        body = {"json": payload}
+    else:
+        body = {
+            "data": _json_body_with_inline_data(payload, inline_data),
+            "headers": {"Content-Type": "application/json"},
+        }
+    async with http_client.request("POST", f"{ADK_API_URL}/run", timeout=30, **body) as response:
+        if response.status == 200:
+            return response.status, await response.json(content_type=None), None
+        return response.status, None, await response.text()
+
+async def call_adk_api(message: str, phone_number: str = None, image_data: Union[str, bytes, bytearray] = None, image_mime_type: str = None):
+    """Call the ADK API server
+
+    image_data may be a base64 string or base64 ASCII bytes; bytes are
+    streamed into the request body as-is instead of being decoded and
+    re-serialized.
+    """
     try:
         app_name = "kisan_mitra"
         user_id = phone_number or "default_user"
         
-        # First, create or ensure session exists
-        logger.info(f"🔄 Creating session for user: {user_id}")
-        session_response = requests.post(
-            f"{ADK_API_URL}/apps/{app_name}/users/{user_id}/sessions",
-            json={},
-            timeout=10
+        # Reuse the farmer's live session; create one only on first contact or expiry
+        session_id = await adk_sessions.get_or_create(
+            user_id, lambda: _create_adk_session(app_name, user_id)
         )
         
-        if session_response.status_code not in [200, 201]:
-            logger.warning(f"⚠️ Session creation failed: {session_response.status_code}")
-            return "माफ करें, सत्र बनाने में समस्या है।"
-        
-        # Get the actual session ID from the response
-        session_data = session_response.json()
-        session_id = session_data.get("id")
-        
         if not session_id:
-            logger.error("❌ No session ID returned from session creation")
-            return "माफ करें, सत्र की पहचान नहीं मिली।"
-        
-        logger.info(f"✅ Session created: {session_id}")
+            return SESSION_ERROR_MESSAGE
         
         # Format the payload for ADK API
         payload = {
@@ -124,8 +229,11 @@ async def call_adk_api(message: str, phone_number: str = None, image_data: str =
         }
         
         # Add image data if present
+        inline_data = None
         if image_data and image_mime_type:
             logger.info(f"📸 Adding image to payload: {image_mime_type}")
+            if isinstance(image_data, (bytes, bytearray)):
+                inline_data, image_data = image_data, INLINE_DATA_PLACEHOLDER
             payload["newMessage"]["parts"].append({
                 "inlineData": {
                     "mimeType": image_mime_type,
@@ -141,15 +249,21 @@ async def call_adk_api(message: str, phone_number: str = None, image_data: str =
         
         logger.info(f"🔄 Calling ADK API for message: {message[:50]}...")
         
-        response = requests.post(
-            f"{ADK_API_URL}/run",
-            json=payload,
-            timeout=30
-        )
+        status, result, error_text = await _post_adk_run(payload, inline_data)
         
-        if response.status_code == 200:
-            result = response.json()
-            
+        if status == 404:
+            # ADK server no longer knows this session (restart or expiry) - recreate once
+            logger.info(f"♻️ Session {session_id} not found on ADK server, recreating")
+            adk_sessions.invalidate(user_id, session_id)
+            session_id = await adk_sessions.get_or_create(
+                user_id, lambda: _create_adk_session(app_name, user_id)
+            )
+            if not session_id:
+                return SESSION_ERROR_MESSAGE
+            payload["sessionId"] = session_id
+            status, result, error_text = await _post_adk_run(payload, inline_data)
+        
+        if status == 200:
             # ADK API returns a list of events, we need the last event with text
             if isinstance(result, list) and len(result) > 0:
                 # Look through events in reverse order to find the last text response
@@ -184,17 +298,17 @@ async def call_adk_api(message: str, phone_number: str = None, image_data: str =
                             return part["text"]
             
             logger.error(f"❌ No text found in ADK API response")
-            return "माफ करें, सर्वर से कोई उत्तर नहीं मिला।"
+            return EMPTY_RESPONSE_MESSAGE
         else:
-            logger.error(f"❌ ADK API HTTP error: {response.status_code} - {response.text}")
-            return "माफ करें, सर्वर से संपर्क में समस्या है।"
+            logger.error(f"❌ ADK API HTTP error: {status} - {error_text}")
+            return SERVER_ERROR_MESSAGE
             
-    except requests.exceptions.Timeout:
+    except asyncio.TimeoutError:
         logger.error("⏰ ADK API timeout")
-        return "माफ करें, प्रतिक्रिया में देरी हो रही है। कृपया फिर से कोशिश करें।"
+        return TIMEOUT_ERROR_MESSAGE
     except Exception as e:
         logger.error(f"❌ Error calling ADK API: {e}")
-        return "माफ करें, तकनीकी समस्या के कारण मैं अभी आपकी मदद नहीं कर सकता।"
+        return TECHNICAL_ERROR_MESSAGE
 
 def format_whatsapp_response(text: str) -> str:
     """Format response for WhatsApp (handle length limits)"""
@@ -224,10 +338,185 @@ def format_whatsapp_response(text: str) -> str:
     
     return parts[0] if parts else text[:1500]
 
+def _twilio_auth() -> aiohttp.BasicAuth:
+    """Basic auth for downloading Twilio media"""
+    return aiohttp.BasicAuth(TWILIO_ACCOUNT_SID or "", TWILIO_AUTH_TOKEN or "")
+
+def _twiml_message(text: str, voice_url: Optional[str] = None) -> str:
+    """Wrap a reply in a TwiML <Message>, plus a voice note <Media> message if given"""
+    voice_message = f"""
+    <Message><Media>{voice_url}</Media></Message>""" if voice_url else ""
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<Response>
+    <Message>{text}</Message>{voice_message}
+</Response>"""
+
+async def process_whatsapp_message(
+    Body: str,
+    From: str,
+    NumMedia: Optional[str] = "0",
+    MediaUrl0: Optional[str] = None,
+    MediaContentType0: Optional[str] = None,
+    public_base_url: Optional[str] = None
+) -> Tuple[str, Optional[str]]:
+    """Run one inbound WhatsApp message through media handling, the agent and TTS.
+    
+    Returns the reply text and, for voice messages, the public URL of the
+    generated voice reply (None if there is none).
+    """
+    # Extract phone number
+    phone_number = From.replace("whatsapp:", "")
+    
+    # Initialize variables
+    image_data = None
+    image_mime_type = None
+    voice_transcript = None
+    image_hash = None
+    question_intent = None
+    
+    # Reply language from the farmer's profile (or the message script),
+    # resolved locally so the agent is reached once per message
+    farmer_language = farmer_languages.resolve(phone_number, Body)
+    logger.info(f"🗣️ Farmer language: {farmer_language}")
+    
+    # Handle media (images and voice messages)
+    if NumMedia and int(NumMedia) > 0 and MediaUrl0:
+        try:
+            logger.info(f"📎 Processing media: {MediaContentType0}")
+            logger.info(f"📎 Media URL: {MediaUrl0}")
+            
+            # Check if it's a voice message
+            if MediaContentType0 and ("audio" in MediaContentType0.lower() or "voice" in MediaContentType0.lower()):
+                logger.info("🎤 Processing voice message...")
+                
+                # Stream the download (size-capped), then run blocking STT off the event loop
+                try:
+                    voice_media = await fetch_media(MediaUrl0, MediaContentType0, timeout=30, auth=_twilio_auth())
+                    voice_transcript = await asyncio.to_thread(
+                        process_voice_audio_from_whatsapp,
+                        voice_media.to_bytes(),
+                        farmer_language,
+                        voice_media.content_type
+                    )
+                except MediaFetchError as e:
+                    logger.warning(f"⚠️ Failed to download voice message: {e}")
+                
+                if voice_transcript:
+                    logger.info(f"✅ Voice transcribed: {voice_transcript[:50]}...")
+                    # Use transcribed text as the message body
+                    Body = voice_transcript
+                else:
+                    logger.error("❌ Failed to transcribe voice message")
+                    if farmer_language == "english":
+                        return "Sorry, I couldn't understand your voice message. Please try again.", None
+                    return "माफ करें, मैं आपका voice message समझ नहीं पाया। कृपया फिर से भेजें।", None
+            
+            # Handle image messages (existing logic)
+            elif MediaContentType0 and "image" in MediaContentType0.lower():
+                logger.info(f"📸 Processing image: {MediaContentType0}")
+                
+                # Stream the image with Twilio authentication, shrink it, and base64 it once for the ADK payload
+                try:
+                    image_media = await fetch_media(MediaUrl0, MediaContentType0, timeout=10, auth=_twilio_auth())
+                    image_media = await image_preprocessor.process(image_media)
+                    
+                    # Same photo (resent or forwarded) with the same question: reuse the diagnosis
+                    image_hash = await image_cache.hash_media(image_media)
+                    question_intent = detect_question_intent(Body)
+                    cached_diagnosis = image_cache.lookup(image_hash, question_intent, farmer_language, phone_number)
+                    if cached_diagnosis:
+                        return format_whatsapp_response(already_analyzed_reply(cached_diagnosis, farmer_language)), None
+                    
+                    image_mime_type = image_media.content_type
+                    image_data = image_media.to_base64()
+                    logger.info(f"✅ Image processed successfully - {len(image_data)} chars, type: {image_mime_type}")
+                except MediaFetchError as e:
+                    logger.warning(f"⚠️ Failed to download media: {e}")
+            
+        except Exception as e:
+            logger.error(f"❌ Error processing media: {e}")
+    else:
+        logger.info(f"📝 No media detected - NumMedia: {NumMedia}")
+    
+    # 🎯 REAL-TIME LOGGING: ADK API Call
+    print(f"🔄 CALLING ADK API...")
+    print(f"   📝 Message: {Body[:50]}{'...' if len(Body) > 50 else ''}")
+    print(f"   📞 Phone: {phone_number}")
+    print(f"   📸 Has Image: {'Yes' if image_data else 'No'}")
+    print(f"   🎤 Has Voice: {'Yes' if voice_transcript else 'No'}")
+    
+    # Get response from ADK API
+    agent_response = await call_adk_api(
+        message=Body,
+        phone_number=phone_number,
+        image_data=image_data,
+        image_mime_type=image_mime_type
+    )
+    
+    if image_hash is not None and agent_response not in ADK_FAILURE_MESSAGES:
+        image_cache.add(image_hash, question_intent, farmer_language, agent_response, phone_number)
+    
+    # 🎯 REAL-TIME LOGGING: ADK API Response
+    print(f"✅ ADK API RESPONSE RECEIVED")
+    print(f"   📊 Response Length: {len(agent_response)} characters")
+    print(f"   📝 Preview: {agent_response[:100]}{'...' if len(agent_response) > 100 else ''}")
+    
+    # Format response for WhatsApp
+    formatted_response = format_whatsapp_response(agent_response)
+    voice_url = None
+    
+    # If original message was voice, create voice response and publish it via the media store
+    if voice_transcript:
+        logger.info("🔊 Creating voice response...")
+        voice_audio = await asyncio.to_thread(
+            create_voice_audio_for_farmer, formatted_response, farmer_language
+        )
+        
+        if voice_audio:
+            media_id = await asyncio.to_thread(media_store.put, voice_audio, "audio/mpeg")
+            voice_url = media_url(media_id, public_base_url)
+    
+    # 🎯 REAL-TIME LOGGING: Sending Response
+    print(f"📤 SENDING WHATSAPP RESPONSE")
+    print(f"   📊 Response Length: {len(formatted_response)} characters")
+    print(f"   🎤 Voice Response: {voice_url or 'No'}")
+    print(f"   📝 Preview: {formatted_response[:100]}{'...' if len(formatted_response) > 100 else ''}")
+    print("="*80 + "\n")
+    
+    logger.info(f"📤 Sending response: {len(formatted_response)} characters")
+    return formatted_response, voice_url
+
+async def deliver_whatsapp_reply(message: dict):
+    """Reply worker: process a queued message and send the reply via Twilio REST"""
+    voice_url = None
+    try:
+        reply_text, voice_url = await process_whatsapp_message(
+            Body=message["Body"],
+            From=message["From"],
+            NumMedia=message.get("NumMedia"),
+            MediaUrl0=message.get("MediaUrl0"),
+            MediaContentType0=message.get("MediaContentType0"),
+            public_base_url=message.get("PublicBaseUrl")
+        )
+    except Exception as e:
+        logger.error(f"❌ Error processing queued message {message.get('MessageSid')}: {e}")
+        reply_text = TECHNICAL_ERROR_MESSAGE
+    
+    reply_sid = await twilio_sender.send(to=message["From"], body=reply_text)
+    logger.info(f"📤 Reply {reply_sid} sent to {message['From']} for {message.get('MessageSid')}")
+    if voice_url:
+        # The text reply is already delivered; a failed voice note must not
+        # fail the job, or the retry would send the text a second time.
+        try:
+            voice_sid = await twilio_sender.send(to=message["From"], media_url=voice_url)
+            logger.info(f"🎤 Voice reply {voice_sid} sent to {message['From']}")
+        except Exception as e:
+            logger.warning(f"⚠️ Voice reply to {message['From']} failed, text reply was sent: {e}")
+
 @app.post("/webhook/whatsapp")
 async def whatsapp_webhook(
     request: Request,
-    Body: str = Form(...),
+    Body: str = Form(""),  # Empty for voice notes and media-only messages
     From: str = Form(...),
     MessageSid: Optional[str] = Form(None),
     NumMedia: Optional[str] = Form("0"),
@@ -253,151 +542,70 @@ async def whatsapp_webhook(
         logger.info(f"📱 Received WhatsApp message from {From}: {Body[:50]}...")
         logger.info(f"🔍 DEBUG: NumMedia={NumMedia}, MediaUrl0={MediaUrl0}, MediaContentType0={MediaContentType0}")
         
-        # Extract phone number
-        phone_number = From.replace("whatsapp:", "")
+        inbound_message = {
+            "Body": Body,
+            "From": From,
+            "MessageSid": MessageSid,
+            "NumMedia": NumMedia,
+            "MediaUrl0": MediaUrl0,
+            "MediaContentType0": MediaContentType0,
+            "PublicBaseUrl": str(request.base_url)
+        }
         
-        # Initialize variables
-        image_data = None
-        image_mime_type = None
-        voice_transcript = None
-        farmer_language = "hindi"  # Default language
+        # Async reply mode: persist now, reply later via the Twilio REST API.
+        # Twilio retries of a known MessageSid are acknowledged and dropped.
+        inline_id = None
+        try:
+            if ASYNC_REPLIES_ENABLED and reply_workers.running:
+                if reply_workers.enqueue(inbound_message):
+                    logger.info(f"📥 Queued {MessageSid}")
+                else:
+                    logger.info(f"🔁 Duplicate delivery of {MessageSid} ignored")
+                return Response(content=EMPTY_TWIML, media_type="application/xml", status_code=200)
+            
+            # Sync mode: Twilio only retries when it never got our response,
+            # so a retry gets the stored reply, or a fresh answer if the first
+            # attempt has not produced one
+            if MessageSid:
+                is_new = inbound_queue.enqueue(inbound_message, status=STATUS_PROCESSING)
+                inline_id, status, stored_reply = inbound_queue.find(MessageSid)
+                if not is_new:
+                    if status == STATUS_DONE and stored_reply:
+                        logger.info(f"🔁 Retry of {MessageSid}: resending the stored reply")
+                        return Response(
+                            content=_twiml_message(stored_reply["text"], stored_reply.get("voice_url")),
+                            media_type="application/xml",
+                            status_code=200
+                        )
+                    if status == STATUS_DONE:
+                        logger.info(f"🔁 Duplicate delivery of {MessageSid} ignored")
+                        return Response(content=EMPTY_TWIML, media_type="application/xml", status_code=200)
+                    logger.info(f"🔁 Retry of unfinished {MessageSid}: answering it again")
+        except Exception as e:
+            logger.error(f"❌ Inbound queue unavailable, answering inline: {e}")
         
-        # Get farmer context for language preference
         try:
-            farmer_context_response = await call_adk_api(
-                message="get_farmer_context_summary",
-                phone_number=phone_number
+            reply_text, voice_url = await process_whatsapp_message(
+                Body=Body,
+                From=From,
+                NumMedia=NumMedia,
+                MediaUrl0=MediaUrl0,
+                MediaContentType0=MediaContentType0,
+                public_base_url=str(request.base_url)
             )
-            # Extract language from context if available
-            if "primary_language" in farmer_context_response.lower():
-                if "english" in farmer_context_response.lower():
-                    farmer_language = "english"
-                elif "punjabi" in farmer_context_response.lower():
-                    farmer_language = "punjabi"
-                # Add more language detection logic as needed
-        except:
-            logger.info("📝 Using default language (Hindi)")
+        except Exception as e:
+            if inline_id is not None:
+                inbound_queue.fail(inline_id, str(e), retry=False)
+            raise
         
-        # Handle media (images and voice messages)
-        if NumMedia and int(NumMedia) > 0 and MediaUrl0:
+        if inline_id is not None:
             try:
-                logger.info(f"📎 Processing media: {MediaContentType0}")
-                logger.info(f"📎 Media URL: {MediaUrl0}")
-                
-                # Check if it's a voice message
-                if MediaContentType0 and ("audio" in MediaContentType0.lower() or "voice" in MediaContentType0.lower()):
-                    logger.info("🎤 Processing voice message...")
-                    
-                    # Process voice message
-                    auth_tuple = (TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-                    voice_transcript = process_voice_message_from_whatsapp(
-                        MediaUrl0, 
-                        auth_tuple, 
-                        farmer_language
-                    )
-                    
-                    if voice_transcript:
-                        logger.info(f"✅ Voice transcribed: {voice_transcript[:50]}...")
-                        # Use transcribed text as the message body
-                        Body = voice_transcript
-                    else:
-                        logger.error("❌ Failed to transcribe voice message")
-                        error_msg = "माफ करें, मैं आपका voice message समझ नहीं पाया। कृपया फिर से भेजें।"
-                        if farmer_language == "english":
-                            error_msg = "Sorry, I couldn't understand your voice message. Please try again."
-                        
-                        twiml_response = f"""<?xml version="1.0" encoding="UTF-8"?>
-<Response>
-    <Message>{error_msg}</Message>
-</Response>"""
-                        return Response(content=twiml_response, media_type="application/xml", status_code=200)
-                
-                # Handle image messages (existing logic)
-                elif MediaContentType0 and "image" in MediaContentType0.lower():
-                    logger.info(f"📸 Processing image: {MediaContentType0}")
-                    
-                    # Download the image with Twilio authentication
-                    auth = (TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-                    media_response = requests.get(MediaUrl0, auth=auth, timeout=10)
-                    if media_response.status_code == 200:
-                        # Convert to base64
-                        image_data = base64.b64encode(media_response.content).decode('utf-8')
-                        image_mime_type = MediaContentType0
-                        logger.info(f"✅ Image processed successfully - {len(image_data)} chars, type: {image_mime_type}")
-                    else:
-                        logger.warning(f"⚠️ Failed to download media: {media_response.status_code} - {media_response.text}")
-                
+                inbound_queue.complete(inline_id, reply={"text": reply_text, "voice_url": voice_url})
             except Exception as e:
-                logger.error(f"❌ Error processing media: {e}")
-        else:
-            logger.info(f"📝 No media detected - NumMedia: {NumMedia}")
-        
-        # 🎯 REAL-TIME LOGGING: ADK API Call
-        print(f"🔄 CALLING ADK API...")
-        print(f"   📝 Message: {Body[:50]}{'...' if len(Body) > 50 else ''}")
-        print(f"   📞 Phone: {phone_number}")
-        print(f"   📸 Has Image: {'Yes' if image_data else 'No'}")
-        print(f"   🎤 Has Voice: {'Yes' if voice_transcript else 'No'}")
-        
-        # Get response from ADK API
-        agent_response = await call_adk_api(
-            message=Body,
-            phone_number=phone_number,
-            image_data=image_data,
-            image_mime_type=image_mime_type
-        )
-        
-        # 🎯 REAL-TIME LOGGING: ADK API Response
-        print(f"✅ ADK API RESPONSE RECEIVED")
-        print(f"   📊 Response Length: {len(agent_response)} characters")
-        print(f"   📝 Preview: {agent_response[:100]}{'...' if len(agent_response) > 100 else ''}")
-        
-        # Format response for WhatsApp
-        formatted_response = format_whatsapp_response(agent_response)
-        
-        # If original message was voice, create voice response
-        if voice_transcript:
-            logger.info("🔊 Creating voice response...")
-            voice_response = create_voice_response_for_farmer(formatted_response, farmer_language)
-            
-            if voice_response:
-                # Create TwiML response with voice message
-                # Note: You'll need to upload the voice file to a public URL first
-                # For now, sending text response with voice indication
-                voice_indication = ""
-                if farmer_language == "hindi":
-                    voice_indication = "\n\n🎤 Voice response भी available है।"
-                elif farmer_language == "english":
-                    voice_indication = "\n\n🎤 Voice response is also available."
-                
-                twiml_response = f"""<?xml version="1.0" encoding="UTF-8"?>
-<Response>
-    <Message>{formatted_response}{voice_indication}</Message>
-</Response>"""
-            else:
-                # Fallback to text response
-                twiml_response = f"""<?xml version="1.0" encoding="UTF-8"?>
-<Response>
-    <Message>{formatted_response}</Message>
-</Response>"""
-        else:
-            # Regular text response
-            twiml_response = f"""<?xml version="1.0" encoding="UTF-8"?>
-<Response>
-    <Message>{formatted_response}</Message>
-</Response>"""
-        
-        # 🎯 REAL-TIME LOGGING: Sending Response
-        print(f"📤 SENDING WHATSAPP RESPONSE")
-        print(f"   📊 Response Length: {len(formatted_response)} characters")
-        print(f"   🎤 Voice Response: {'Yes' if voice_transcript else 'No'}")
-        print(f"   📝 Preview: {formatted_response[:100]}{'...' if len(formatted_response) > 100 else ''}")
-        print("="*80 + "\n")
-        
-        logger.info(f"📤 Sending response: {len(formatted_response)} characters")
+                logger.error(f"❌ Could not record reply for {MessageSid}: {e}")
         
         return Response(
-            content=twiml_response,
+            content=_twiml_message(reply_text, voice_url),
             media_type="application/xml",
             status_code=200
         )
@@ -406,13 +614,8 @@ async def whatsapp_webhook(
         logger.error(f"❌ Error in webhook: {e}")
         
         # Return error message in TwiML format
-        error_twiml = """<?xml version="1.0" encoding="UTF-8"?>
-<Response>
-    <Message>माफ करें, तकनीकी समस्या के कारण मैं अभी आपकी मदद नहीं कर सकता।</Message>
-</Response>"""
-        
         return Response(
-            content=error_twiml,
+            content=_twiml_message(TECHNICAL_ERROR_MESSAGE),
             media_type="application/xml",
             status_code=200
         )